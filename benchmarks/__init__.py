@@ -0,0 +1,8 @@
+"""Performance benchmarks for h2serve.
+
+Each module is a runnable script, e.g. `python -m benchmarks.write_coalescing`.
+Like the tests, they expect a "localhost.pem" certificate in the workspace root.
+
+`python -m benchmarks.suite` runs a fixed set of throughput and latency
+scenarios and can write its results as JSON for comparing runs.
+"""
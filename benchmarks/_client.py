@@ -0,0 +1,189 @@
+"""A minimal multiplexing HTTP/2 client for load generation."""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import ssl
+import time
+from collections.abc import AsyncIterator, Iterable
+
+import h2.connection
+import h2.events
+import h2.settings
+import trio
+
+# Large windows so that the client never limits server throughput.
+_CLIENT_WINDOW = 2**24
+
+
+@dataclasses.dataclass
+class Response:
+    """A complete HTTP/2 response."""
+
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    latency: float
+    """Seconds from sending the request headers to receiving END_STREAM."""
+
+
+@dataclasses.dataclass
+class _PendingResponse:
+    start: float
+    done: trio.Event = dataclasses.field(default_factory=trio.Event)
+    headers: list[tuple[bytes, bytes]] = dataclasses.field(default_factory=list)
+    body: list[bytes] = dataclasses.field(default_factory=list)
+    reset: bool = False
+
+
+class BenchClient:
+    """An HTTP/2 client that multiplexes concurrent requests on one connection."""
+
+    def __init__(self, stream: trio.abc.Stream, *, scheme: str = "https") -> None:
+        self._stream = stream
+        self._scheme = scheme
+        self._conn = h2.connection.H2Connection()
+        self._send_lock = trio.StrictFIFOLock()
+        self._pending: dict[int, _PendingResponse] = {}
+        self._window_changed = trio.Event()
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def connect(
+        cls,
+        port: int,
+        ssl_context: ssl.SSLContext | None,
+    ) -> AsyncIterator[BenchClient]:
+        """Connect to a server on localhost.
+
+        Args:
+            port: The server's port.
+            ssl_context: The client TLS context, or None for cleartext.
+        """
+        stream: trio.abc.Stream
+        if ssl_context:
+            stream = await trio.open_ssl_over_tcp_stream(
+                "localhost",
+                port,
+                ssl_context=ssl_context,
+            )
+        else:
+            stream = await trio.open_tcp_stream("localhost", port)
+
+        async with stream, trio.open_nursery() as nursery:
+            client = cls(stream, scheme="https" if ssl_context else "http")
+            await client._initiate()
+            nursery.start_soon(client._loop_read)
+
+            yield client
+
+            nursery.cancel_scope.cancel()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        headers: Iterable[tuple[str, str]] = (),
+        body: bytes = b"",
+    ) -> Response:
+        """Send a request and wait for the full response."""
+        async with self._send_lock:
+            stream_id = self._conn.get_next_available_stream_id()
+            pending = _PendingResponse(start=time.perf_counter())
+            self._pending[stream_id] = pending
+
+            self._conn.send_headers(
+                stream_id,
+                [
+                    (":method", method),
+                    (":path", path),
+                    (":authority", "localhost"),
+                    (":scheme", self._scheme),
+                    *headers,
+                ],
+                end_stream=not body,
+            )
+            await self._flush()
+
+        if body:
+            await self._send_body(stream_id, memoryview(body))
+
+        await pending.done.wait()
+        del self._pending[stream_id]
+
+        if pending.reset:
+            raise RuntimeError(f"Stream {stream_id} was reset.")
+
+        status = next(int(v) for k, v in pending.headers if k == b":status")
+        return Response(
+            status=status,
+            headers=pending.headers,
+            body=b"".join(pending.body),
+            latency=time.perf_counter() - pending.start,
+        )
+
+    async def _initiate(self) -> None:
+        self._conn.initiate_connection()
+        self._conn.update_settings(
+            {h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: _CLIENT_WINDOW}
+        )
+        self._conn.increment_flow_control_window(_CLIENT_WINDOW)
+        await self._flush()
+
+    async def _send_body(self, stream_id: int, data: memoryview) -> None:
+        while data:
+            async with self._send_lock:
+                window = min(
+                    self._conn.local_flow_control_window(stream_id),
+                    self._conn.max_outbound_frame_size,
+                )
+                if window > 0:
+                    self._conn.send_data(
+                        stream_id,
+                        data[:window],
+                        end_stream=window >= len(data),
+                    )
+                    data = data[window:]
+                    await self._flush()
+                    continue
+
+            await self._window_changed.wait()
+
+    async def _flush(self) -> None:
+        if data := self._conn.data_to_send():
+            await self._stream.send_all(data)
+
+    async def _loop_read(self) -> None:
+        while data := await self._stream.receive_some():
+            async with self._send_lock:
+                for event in self._conn.receive_data(data):
+                    self._process_event(event)
+                await self._flush()
+
+    def _process_event(self, event: h2.events.Event) -> None:
+        if isinstance(event, h2.events.ResponseReceived):
+            self._pending[event.stream_id].headers.extend(event.headers)
+
+        elif isinstance(event, h2.events.DataReceived):
+            self._pending[event.stream_id].body.append(event.data)
+            self._conn.acknowledge_received_data(
+                event.flow_controlled_length,
+                event.stream_id,
+            )
+
+        elif isinstance(event, h2.events.StreamEnded):
+            self._pending[event.stream_id].done.set()
+
+        elif isinstance(event, h2.events.StreamReset):
+            if pending := self._pending.get(event.stream_id):
+                pending.reset = True
+                pending.done.set()
+
+        elif isinstance(
+            event,
+            (h2.events.WindowUpdated, h2.events.RemoteSettingsChanged),
+        ):
+            self._window_changed.set()
+            self._window_changed = trio.Event()
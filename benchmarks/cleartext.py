@@ -0,0 +1,141 @@
+"""Compare server CPU cost per request with and without TLS.
+
+Runs the server in a separate process, sends requests to it over several
+connections with TLS and with cleartext HTTP/2 (h2c), and reports the number
+of requests served per second of server CPU time, i.e. per core.
+
+Expects a localhost.pem file in the workspace root. Run with:
+
+  python -m benchmarks.cleartext
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import multiprocessing
+import ssl
+import time
+from multiprocessing.connection import Connection
+
+import trio
+
+import h2serve
+
+from ._client import BenchClient
+
+_BODY = b"x" * 4096
+
+
+async def _app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+
+    await resp.headers(200, [])
+    await resp.body(_BODY, end_stream=True)
+
+
+async def _serve_until_stopped(pipe: Connection, tls: bool) -> None:
+    ssl_context = None
+    if tls:
+        ssl_context = ssl.create_default_context(purpose=ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain("localhost.pem")
+        ssl_context.set_alpn_protocols(["h2"])
+
+    async with trio.open_nursery() as nursery:
+        server = await h2serve.serve(
+            nursery,
+            _app,
+            host="localhost",
+            port=0,
+            ssl_context=ssl_context,
+        )
+
+        start = time.process_time()
+        pipe.send(server.localhost_port)
+        await trio.to_thread.run_sync(pipe.recv)
+        pipe.send(time.process_time() - start)
+
+        server.stop()
+
+
+def _server_process(pipe: Connection, tls: bool) -> None:
+    trio.run(_serve_until_stopped, pipe, tls)
+
+
+async def _load(
+    port: int,
+    ssl_context: ssl.SSLContext | None,
+    requests: int,
+) -> None:
+    async with BenchClient.connect(port, ssl_context) as client:
+        for _ in range(requests):
+            await client.request("GET", "/")
+
+
+async def _run(
+    ssl_context: ssl.SSLContext | None,
+    *,
+    connections: int,
+    requests: int,
+) -> tuple[float, float]:
+    """Returns the wall-clock time and the server's CPU time."""
+    pipe, child_pipe = multiprocessing.Pipe()
+    process = multiprocessing.get_context("spawn").Process(
+        target=_server_process,
+        args=(child_pipe, ssl_context is not None),
+    )
+    process.start()
+
+    try:
+        port = await trio.to_thread.run_sync(pipe.recv)
+
+        start = time.perf_counter()
+        async with trio.open_nursery() as nursery:
+            for _ in range(connections):
+                nursery.start_soon(
+                    functools.partial(
+                        _load,
+                        port,
+                        ssl_context,
+                        requests // connections,
+                    )
+                )
+        elapsed = time.perf_counter() - start
+
+        pipe.send(None)
+        cpu = await trio.to_thread.run_sync(pipe.recv)
+
+    finally:
+        process.join()
+
+    return elapsed, cpu
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    ssl_client = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
+    ssl_client.load_verify_locations("localhost.pem")
+    ssl_client.set_alpn_protocols(["h2"])
+
+    print(f"{'mode':>10} {'req/s':>10} {'server cpu (s)':>15} {'req/core-s':>11}")
+    for name, ssl_context in (("tls", ssl_client), ("cleartext", None)):
+        elapsed, cpu = await _run(
+            ssl_context,
+            connections=args.connections,
+            requests=args.requests,
+        )
+        print(
+            f"{name:>10}"
+            f" {args.requests / elapsed:>10.0f}"
+            f" {cpu:>15.2f}"
+            f" {args.requests / cpu:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    trio.run(main)
@@ -0,0 +1,149 @@
+"""Measure the cost of unblocking many flow-controlled streams.
+
+Opens N streams with a zero initial window so that every response blocks on
+flow control, then opens the streams' windows one at a time, waiting for each
+response to finish before opening the next. If every window update woke all
+blocked streams this would take time quadratic in N; with targeted wakeups it
+should grow linearly.
+
+Expects a localhost.pem file in the workspace root. Run with:
+
+  python -m benchmarks.flow_control_wakeups
+"""
+
+from __future__ import annotations
+
+import argparse
+import ssl
+import time
+
+import h2.connection
+import h2.events
+import h2.settings
+import trio
+
+import h2serve
+
+_BODY = b"x" * 1024
+
+
+async def _app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+
+    await resp.headers(200, [])
+    await resp.body(_BODY, end_stream=True)
+
+
+async def _receive_events(
+    stream: trio.abc.Stream,
+    conn: h2.connection.H2Connection,
+) -> list[h2.events.Event]:
+    events = conn.receive_data(await stream.receive_some())
+
+    for event in events:
+        if isinstance(event, h2.events.DataReceived):
+            conn.acknowledge_received_data(
+                event.flow_controlled_length,
+                event.stream_id,
+            )
+
+    await stream.send_all(conn.data_to_send())
+    return events
+
+
+async def _run(port: int, ssl_context: ssl.SSLContext, streams: int) -> float:
+    stream = await trio.open_ssl_over_tcp_stream(
+        "localhost",
+        port,
+        ssl_context=ssl_context,
+    )
+    conn = h2.connection.H2Connection()
+    conn.initiate_connection()
+    conn.update_settings({h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: 0})
+
+    async with stream:
+        await stream.send_all(conn.data_to_send())
+
+        # Acknowledge the server's settings before exceeding the default
+        # concurrent stream limit.
+        while not any(
+            isinstance(event, h2.events.RemoteSettingsChanged)
+            for event in await _receive_events(stream, conn)
+        ):
+            pass
+
+        ids = []
+        for _ in range(streams):
+            stream_id = conn.get_next_available_stream_id()
+            conn.send_headers(
+                stream_id,
+                [
+                    (":method", "GET"),
+                    (":path", "/"),
+                    (":authority", "localhost"),
+                    (":scheme", "https"),
+                ],
+                end_stream=True,
+            )
+            ids.append(stream_id)
+        await stream.send_all(conn.data_to_send())
+
+        # Wait until every response has started and is blocked.
+        started = 0
+        while started < streams:
+            for event in await _receive_events(stream, conn):
+                if isinstance(event, h2.events.ResponseReceived):
+                    started += 1
+
+        start = time.perf_counter()
+
+        for stream_id in ids:
+            conn.increment_flow_control_window(len(_BODY), stream_id)
+            await stream.send_all(conn.data_to_send())
+
+            while not any(
+                isinstance(event, h2.events.StreamEnded)
+                and event.stream_id == stream_id
+                for event in await _receive_events(stream, conn)
+            ):
+                pass
+
+        return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--streams", type=int, nargs="+", default=[250, 500, 1000])
+    args = parser.parse_args()
+
+    ssl_server = ssl.create_default_context(purpose=ssl.Purpose.CLIENT_AUTH)
+    ssl_server.load_cert_chain("localhost.pem")
+    ssl_server.set_alpn_protocols(["h2"])
+
+    ssl_client = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
+    ssl_client.load_verify_locations("localhost.pem")
+    ssl_client.set_alpn_protocols(["h2"])
+
+    async with trio.open_nursery() as nursery:
+        server = await h2serve.serve(
+            nursery,
+            _app,
+            host="localhost",
+            port=0,
+            ssl_context=ssl_server,
+            http2_settings={
+                h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: max(args.streams),
+            },
+        )
+
+        print(f"{'streams':>8} {'total (s)':>10} {'per stream (us)':>16}")
+        for streams in args.streams:
+            elapsed = await _run(server.localhost_port, ssl_client, streams)
+            print(f"{streams:>8} {elapsed:>10.3f} {elapsed / streams * 1e6:>16.1f}")
+
+        server.stop()
+
+
+if __name__ == "__main__":
+    trio.run(main)
@@ -0,0 +1,124 @@
+"""Measure the cost of encoding response headers.
+
+Sends the same set of typical response headers on many streams of an h2
+connection, once the way responses are built by default and once with
+`PreparedHeaders`, for several HPACK table sizes. Reports header blocks
+per second and the average encoded size of a block. Only the header path
+is timed; receiving the requests is not.
+
+Run with:
+
+  python -m benchmarks.headers
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+import h2.config
+import h2.connection
+import h2.settings
+
+import h2serve
+from h2serve._headers import trusted_headers
+
+# Streams opened per batch, below h2's default concurrent stream limit.
+_BATCH = 100
+
+_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"cache-control", b"private, max-age=0"),
+    (b"vary", b"accept-encoding"),
+    (b"server", b"h2serve"),
+    (b"x-content-type-options", b"nosniff"),
+    (b"strict-transport-security", b"max-age=31536000"),
+]
+_PREPARED = h2serve.PreparedHeaders(_HEADERS)
+
+_Send = Callable[[h2.connection.H2Connection, int], None]
+
+
+def _send_default(conn: h2.connection.H2Connection, stream_id: int) -> None:
+    conn.send_headers(
+        stream_id,
+        [(":status", str(200)), *_HEADERS],
+        end_stream=True,
+    )
+
+
+def _send_prepared(conn: h2.connection.H2Connection, stream_id: int) -> None:
+    with trusted_headers(conn):
+        conn.send_headers(stream_id, _PREPARED.with_status(200), end_stream=True)
+
+
+def _open_streams(
+    client: h2.connection.H2Connection,
+    server: h2.connection.H2Connection,
+) -> list[int]:
+    stream_ids = []
+    for _ in range(_BATCH):
+        stream_id = client.get_next_available_stream_id()
+        client.send_headers(
+            stream_id,
+            [
+                (":method", "GET"),
+                (":path", "/"),
+                (":authority", "localhost"),
+                (":scheme", "https"),
+            ],
+            end_stream=True,
+        )
+        stream_ids.append(stream_id)
+
+    server.receive_data(client.data_to_send())
+    return stream_ids
+
+
+def _run(send: _Send, *, table_size: int, blocks: int) -> tuple[float, float]:
+    """Returns the header blocks per second and encoded bytes per block."""
+    client = h2.connection.H2Connection()
+    server = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+    client.initiate_connection()
+    server.initiate_connection()
+
+    # The client's table size limits the server's encoder.
+    client.update_settings({h2.settings.SettingCodes.HEADER_TABLE_SIZE: table_size})
+    server.receive_data(client.data_to_send())
+    client.receive_data(server.data_to_send())
+
+    elapsed = 0.0
+    encoded = 0
+    for _ in range(blocks // _BATCH):
+        stream_ids = _open_streams(client, server)
+
+        start = time.perf_counter()
+        for stream_id in stream_ids:
+            send(server, stream_id)
+        data = server.data_to_send()
+        elapsed += time.perf_counter() - start
+
+        encoded += len(data) - 9 * _BATCH  # Exclude frame headers.
+
+        # Let the client know its streams are closed.
+        client.receive_data(data)
+
+    sent = blocks // _BATCH * _BATCH
+    return sent / elapsed, encoded / sent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--blocks", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'headers':>9} {'table size':>11} {'blocks/s':>10} {'bytes/block':>12}")
+    for table_size in (0, 4096, 65536):
+        for name, send in (("default", _send_default), ("prepared", _send_prepared)):
+            rate, size = _run(send, table_size=table_size, blocks=args.blocks)
+            print(f"{name:>9} {table_size:>11} {rate:>10.0f} {size:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
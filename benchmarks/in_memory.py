@@ -0,0 +1,64 @@
+"""Measure per-request protocol and handler overhead without a network.
+
+Serves small GET requests through `h2serve.testing.open_client`, which
+connects the client and the connection handler with an in-memory stream, so
+that sockets and TLS do not add noise. Reports requests per second and
+microseconds per request, with requests sent one at a time and multiplexed.
+
+Run with:
+
+  python -m benchmarks.in_memory
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import trio
+
+import h2serve
+import h2serve.testing
+
+_BODY = b"x" * 128
+
+
+async def _app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+
+    await resp.headers(200, [])
+    await resp.body(_BODY, end_stream=True)
+
+
+async def _load(client: h2serve.testing.HTTP2Client, requests: int) -> None:
+    for _ in range(requests):
+        await client.request("GET", "/")
+
+
+async def _run(*, streams: int, requests: int) -> float:
+    async with h2serve.testing.open_client(_app) as client:
+        start = time.perf_counter()
+        async with trio.open_nursery() as nursery:
+            for _ in range(streams):
+                nursery.start_soon(_load, client, requests // streams)
+        return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'streams':>8} {'req/s':>10} {'us/req':>8}")
+    for streams in (1, 10, 100):
+        elapsed = await _run(streams=streams, requests=args.requests)
+        print(
+            f"{streams:>8}"
+            f" {args.requests / elapsed:>10.0f}"
+            f" {elapsed / args.requests * 1e6:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    trio.run(main)
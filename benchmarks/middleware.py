@@ -0,0 +1,210 @@
+"""Measure per-request overhead as middleware depth grows.
+
+Runs a request through increasing numbers of middleware layers that each
+count requests, response statuses and finished requests. Compares
+`h2serve.Middleware` hooks, invoked the way the server invokes them, with
+the same logic written as wrapping handlers, each of which wraps the
+response to intercept its headers. Only the middleware path is timed: the
+response discards what it is given, so that the connection's own cost,
+which is much larger and noisier, does not hide the difference. Reports
+nanoseconds per request and per layer.
+
+Run with:
+
+  python -m benchmarks.middleware
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections.abc import Iterable
+from typing import cast
+
+import trio
+
+import h2serve
+from h2serve._middleware import MiddlewareChain, RequestHooks
+from h2serve._request import unbuffered_data_chunk_channel
+
+_HEADERS = h2serve.PreparedHeaders([(b"content-type", b"text/plain")])
+
+
+class _NullResponse:
+    """Accepts a response without sending it."""
+
+    def __init__(self) -> None:
+        self.ended = False
+
+    async def headers(
+        self,
+        status: int,
+        headers: Iterable[h2serve.Header] = (),
+        *,
+        prepared: h2serve.PreparedHeaders | None = None,
+        end_stream: bool = False,
+    ) -> None:
+        pass
+
+    async def body(self, data: bytes, *, end_stream: bool = False) -> None:
+        self.ended = end_stream
+
+
+class _HookedResponse(_NullResponse):
+    """Runs the start hooks where `HTTP2Response.headers` does."""
+
+    def __init__(self, hooks: RequestHooks) -> None:
+        super().__init__()
+        self._hooks = hooks
+
+    async def headers(
+        self,
+        status: int,
+        headers: Iterable[h2serve.Header] = (),
+        *,
+        prepared: h2serve.PreparedHeaders | None = None,
+        end_stream: bool = False,
+    ) -> None:
+        self._hooks.response_started(status, headers, prepared)
+
+
+async def _app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await resp.headers(200, prepared=_HEADERS)
+    await resp.body(b"hi", end_stream=True)
+
+
+class _Counts:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.ok = 0
+        self.finished = 0
+
+
+class _HookLayer(h2serve.Middleware):
+    def __init__(self) -> None:
+        self._counts = _Counts()
+
+    def on_request(self, req: h2serve.HTTP2Request) -> int | None:
+        self._counts.requests += 1
+        return None
+
+    def on_response_start(
+        self,
+        req: h2serve.HTTP2Request,
+        status: int,
+        headers: list[h2serve.Header],
+    ) -> None:
+        if status == 200:
+            self._counts.ok += 1
+
+    def on_response_end(self, req: h2serve.HTTP2Request, status: int | None) -> None:
+        self._counts.finished += 1
+
+
+class _WrappedResponse:
+    """Intercepts response headers the way hand-written middleware does."""
+
+    def __init__(self, resp: h2serve.HTTP2Response, counts: _Counts) -> None:
+        self._resp = resp
+        self._counts = counts
+
+    @property
+    def ended(self) -> bool:
+        return self._resp.ended
+
+    async def headers(
+        self,
+        status: int,
+        headers: Iterable[h2serve.Header] = (),
+        *,
+        prepared: h2serve.PreparedHeaders | None = None,
+        end_stream: bool = False,
+    ) -> None:
+        if status == 200:
+            self._counts.ok += 1
+        await self._resp.headers(
+            status,
+            headers,
+            prepared=prepared,
+            end_stream=end_stream,
+        )
+
+    async def body(self, data: bytes, *, end_stream: bool = False) -> None:
+        await self._resp.body(data, end_stream=end_stream)
+
+
+def _wrap(app: h2serve.AppHandler) -> h2serve.AppHandler:
+    counts = _Counts()
+
+    async def layer(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        counts.requests += 1
+        try:
+            wrapped = _WrappedResponse(resp, counts)
+            await app(req, cast(h2serve.HTTP2Response, wrapped))
+        finally:
+            counts.finished += 1
+
+    return layer
+
+
+def _request() -> h2serve.HTTP2Request:
+    _, body = unbuffered_data_chunk_channel()
+    _, trailers = trio.open_memory_channel[h2serve.Header](0)
+    return h2serve.HTTP2Request(
+        [(b":method", b"GET"), (b":path", b"/")],
+        body,
+        trailers,
+    )
+
+
+async def _time_hooks(depth: int, requests: int) -> float:
+    """Returns nanoseconds per request, as `HTTP2StreamHandler` runs hooks."""
+    chain = MiddlewareChain(_HookLayer() for _ in range(depth))
+    req = _request()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        hooks = chain.bind(req)
+        resp = cast(h2serve.HTTP2Response, _HookedResponse(hooks))
+        try:
+            if hooks.request_started() is None:
+                await _app(req, resp)
+        finally:
+            hooks.response_ended()
+    return (time.perf_counter() - start) / requests * 1e9
+
+
+async def _time_wrapped(depth: int, requests: int) -> float:
+    """Returns nanoseconds per request through `depth` wrapping handlers."""
+    app: h2serve.AppHandler = _app
+    for _ in range(depth):
+        app = _wrap(app)
+    req = _request()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(req, cast(h2serve.HTTP2Response, _NullResponse()))
+    return (time.perf_counter() - start) / requests * 1e9
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    baseline = await _time_wrapped(0, args.requests)
+    print(f"no middleware: {baseline:.0f} ns/req")
+    print(f"{'depth':>6} {'hooks':>9} {'/layer':>7} {'wrapped':>9} {'/layer':>7}")
+
+    for depth in (1, 4, 16, 64):
+        hooks = await _time_hooks(depth, args.requests)
+        wrapped = await _time_wrapped(depth, args.requests)
+        print(
+            f"{depth:>6}"
+            f" {hooks:>9.0f} {(hooks - baseline) / depth:>7.0f}"
+            f" {wrapped:>9.0f} {(wrapped - baseline) / depth:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    trio.run(main)
@@ -0,0 +1,118 @@
+"""Measure small-response latency while a bulk transfer runs.
+
+Requests a large response on a connection and, while it downloads, sends
+small requests on the same connection at a fixed rate. Reports p50 and p99
+latency of the small requests without a bulk transfer, with a bulk transfer
+and no priority signals, and with the small requests marked urgent using the
+RFC 9218 `priority` header.
+
+Expects a localhost.pem file in the workspace root. Run with:
+
+  python -m benchmarks.priority
+"""
+
+from __future__ import annotations
+
+import argparse
+import ssl
+import statistics
+
+import trio
+
+import h2serve
+
+from ._client import BenchClient
+
+_CHUNK = b"x" * 65536
+
+
+async def _app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+
+    path = dict(req.headers)[b":path"]
+    await resp.headers(200, [])
+
+    if path.startswith(b"/bulk/"):
+        for _ in range(int(path[len(b"/bulk/") :]) // len(_CHUNK)):
+            await resp.body(_CHUNK)
+    else:
+        await resp.body(b"x" * 1024)
+
+    await resp.end()
+
+
+def _percentile(latencies: list[float], p: int) -> float:
+    return statistics.quantiles(latencies, n=100)[p - 1]
+
+
+async def _run(
+    client: BenchClient,
+    *,
+    bulk_bytes: int,
+    small_requests: int,
+    small_headers: list[tuple[str, str]],
+) -> list[float]:
+    latencies: list[float] = []
+
+    async with trio.open_nursery() as nursery:
+        if bulk_bytes:
+            nursery.start_soon(client.request, "GET", f"/bulk/{bulk_bytes}")
+            await trio.sleep(0.05)
+
+        for _ in range(small_requests):
+            response = await client.request("GET", "/small", headers=small_headers)
+            latencies.append(response.latency)
+            await trio.sleep(0.005)
+
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--bulk-mb", type=int, default=512)
+    parser.add_argument("--small-requests", type=int, default=200)
+    args = parser.parse_args()
+
+    ssl_server = ssl.create_default_context(purpose=ssl.Purpose.CLIENT_AUTH)
+    ssl_server.load_cert_chain("localhost.pem")
+    ssl_server.set_alpn_protocols(["h2"])
+
+    ssl_client = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
+    ssl_client.load_verify_locations("localhost.pem")
+    ssl_client.set_alpn_protocols(["h2"])
+
+    async with trio.open_nursery() as nursery:
+        server = await h2serve.serve(
+            nursery,
+            _app,
+            host="localhost",
+            port=0,
+            ssl_context=ssl_server,
+        )
+
+        print(f"{'scenario':>24} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for name, bulk_bytes, small_headers in (
+            ("no bulk transfer", 0, []),
+            ("bulk, no priority", args.bulk_mb * 2**20, []),
+            ("bulk, small u=0", args.bulk_mb * 2**20, [("priority", "u=0")]),
+        ):
+            async with BenchClient.connect(server.localhost_port, ssl_client) as c:
+                latencies = await _run(
+                    c,
+                    bulk_bytes=bulk_bytes,
+                    small_requests=args.small_requests,
+                    small_headers=small_headers,
+                )
+
+            print(
+                f"{name:>24}"
+                f" {_percentile(latencies, 50) * 1000:>10.2f}"
+                f" {_percentile(latencies, 99) * 1000:>10.2f}"
+            )
+
+        server.stop()
+
+
+if __name__ == "__main__":
+    trio.run(main)
@@ -0,0 +1,137 @@
+"""Measure the cost of dispatching requests across many routes.
+
+Builds a `Router` and, for comparison, a linear chain of compiled regular
+expressions like the if/elif dispatch it replaces, both with the same
+routes. Each resource contributes four routes, so the default 300
+resources give 1,200 routes. Reports dispatches per second for requests
+that match the first, middle and last routes, and for unmatched paths.
+Only dispatch is timed; handlers do nothing.
+
+Run with:
+
+  python -m benchmarks.router
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from typing import cast
+
+import trio
+
+import h2serve
+from h2serve._request import unbuffered_data_chunk_channel
+
+
+async def _noop(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    pass
+
+
+class _RegexChain:
+    """Dispatches by trying every route's regular expression in order."""
+
+    def __init__(self) -> None:
+        self._routes: list[tuple[bytes, re.Pattern[str], h2serve.AppHandler]] = []
+
+    def add(self, method: str, pattern: str, handler: h2serve.AppHandler) -> None:
+        regex = re.sub(r"\{(\w+):int\}", r"(?P<\1>[0-9]+)", pattern)
+        regex = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", regex)
+        self._routes.append((method.encode(), re.compile(regex + "$"), handler))
+
+    async def __call__(
+        self, req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response
+    ) -> None:
+        headers = dict(req.headers)
+        method = headers[b":method"]
+        path = headers[b":path"].partition(b"?")[0].decode("latin-1")
+
+        for route_method, regex, handler in self._routes:
+            if route_method == method and regex.match(path):
+                await handler(req, resp)
+                return
+
+
+def _routes(resources: int) -> list[tuple[str, str]]:
+    routes = []
+    for i in range(resources):
+        routes += [
+            ("GET", f"/api/r{i}"),
+            ("POST", f"/api/r{i}"),
+            ("GET", f"/api/r{i}/{{id:int}}"),
+            ("GET", f"/api/r{i}/{{id:int}}/items/{{item}}"),
+        ]
+    return routes
+
+
+def _request(method: str, path: str) -> h2serve.HTTP2Request:
+    _, body = unbuffered_data_chunk_channel()
+    _, trailers = trio.open_memory_channel[h2serve.Header](0)
+    return h2serve.HTTP2Request(
+        [
+            (b":method", method.encode()),
+            (b":scheme", b"https"),
+            (b":authority", b"localhost"),
+            (b":path", path.encode()),
+            (b"user-agent", b"benchmark"),
+        ],
+        body,
+        trailers,
+    )
+
+
+async def _rate(
+    app: h2serve.AppHandler,
+    req: h2serve.HTTP2Request,
+    *,
+    seconds: float,
+) -> float:
+    resp = cast(h2serve.HTTP2Response, None)
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            await app(req, resp)
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+async def _main(resources: int, seconds: float) -> None:
+    router = h2serve.Router(not_found=_noop)
+    chain = _RegexChain()
+    for method, pattern in _routes(resources):
+        router.add(method, pattern, _noop)
+        chain.add(method, pattern, _noop)
+
+    last = resources - 1
+    cases = [
+        ("first", _request("GET", "/api/r0")),
+        ("middle", _request("GET", f"/api/r{last // 2}/17")),
+        ("last", _request("GET", f"/api/r{last}/17/items/abc?x=1")),
+        ("unmatched", _request("GET", "/api/missing/17")),
+    ]
+
+    print(f"{4 * resources} routes")
+    print(f"{'request':>10} {'router/s':>10} {'regex/s':>10} {'speedup':>8}")
+    for name, req in cases:
+        router_rate = await _rate(router, req, seconds=seconds)
+        chain_rate = await _rate(chain, req, seconds=seconds)
+        print(
+            f"{name:>10} {router_rate:>10.0f} {chain_rate:>10.0f}"
+            f" {router_rate / chain_rate:>7.1f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--resources", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    trio.run(_main, args.resources, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
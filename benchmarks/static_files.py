@@ -0,0 +1,80 @@
+"""Compare serving small files with `StaticFiles` and with `send_file`.
+
+Writes a few small assets to a temporary directory and serves them through
+`h2serve.testing.open_client`, once with a handler that opens each file
+with `HTTP2Response.send_file` on every request and once with
+`StaticFiles`, which caches them. Reports requests per second.
+
+Run with:
+
+  python -m benchmarks.static_files
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+import trio
+
+import h2serve
+import h2serve.testing
+
+_FILES = {f"asset{i}.css": os.urandom(4096) for i in range(10)}
+
+
+def _send_file_app(directory: str) -> h2serve.AppHandler:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await req.body.aclose()
+        await req.trailers.aclose()
+
+        name = dict(req.headers)[b":path"].decode().lstrip("/")
+        await resp.headers(200, [(b"content-type", b"text/css")])
+        await resp.send_file(os.path.join(directory, name), end_stream=True)
+
+    return app
+
+
+def _write_files(directory: str) -> None:
+    for name, data in _FILES.items():
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(data)
+
+
+async def _load(client: h2serve.testing.HTTP2Client, requests: int) -> None:
+    names = list(_FILES)
+    for i in range(requests):
+        await client.request("GET", f"/{names[i % len(names)]}")
+
+
+async def _run(app: h2serve.AppHandler, *, streams: int, requests: int) -> float:
+    async with h2serve.testing.open_client(app) as client:
+        start = time.perf_counter()
+        async with trio.open_nursery() as nursery:
+            for _ in range(streams):
+                nursery.start_soon(_load, client, requests // streams)
+        return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--streams", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        _write_files(directory)
+
+        print(f"{'handler':>12} {'req/s':>10}")
+        for name, app in (
+            ("send_file", _send_file_app(directory)),
+            ("StaticFiles", h2serve.StaticFiles(directory)),
+        ):
+            elapsed = await _run(app, streams=args.streams, requests=args.requests)
+            print(f"{name:>12} {args.requests / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    trio.run(main)
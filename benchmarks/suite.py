@@ -0,0 +1,396 @@
+"""Measure throughput and latency over a fixed set of scenarios.
+
+Runs the server in a separate process and drives it from this one with
+`BenchClient`. The scenarios cover small GET requests over several
+connections, large downloads, large uploads, and many multiplexed streams
+on a single connection. For each, reports requests per second, payload
+megabytes per second, p50/p99/p999 latency and the server's CPU time.
+
+Results are printed as a table and written as JSON so that runs can be
+compared, for example before and after a change:
+
+  python -m benchmarks.suite --output before.json
+  python -m benchmarks.suite --output after.json --baseline before.json
+
+Uses cleartext HTTP/2 by default; pass --tls to measure with TLS, which
+expects a localhost.pem file in the workspace root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import functools
+import json
+import multiprocessing
+import platform
+import ssl
+import subprocess
+import sys
+import time
+from multiprocessing.connection import Connection
+
+import trio
+
+import h2serve
+
+from ._client import BenchClient
+
+_MB = 1024 * 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class Scenario:
+    """A load pattern."""
+
+    name: str
+    method: str
+    request_size: int
+    """Bytes in each request body."""
+
+    response_size: int
+    """Bytes in each response body."""
+
+    connections: int
+    streams: int
+    """Concurrent streams per connection."""
+
+    requests: int
+    """Total requests, spread evenly over all streams."""
+
+
+SCENARIOS = (
+    Scenario(
+        "small_get",
+        "GET",
+        request_size=0,
+        response_size=128,
+        connections=8,
+        streams=1,
+        requests=20000,
+    ),
+    Scenario(
+        "large_download",
+        "GET",
+        request_size=0,
+        response_size=16 * _MB,
+        connections=2,
+        streams=1,
+        requests=40,
+    ),
+    Scenario(
+        "upload",
+        "POST",
+        request_size=4 * _MB,
+        response_size=0,
+        connections=2,
+        streams=1,
+        requests=100,
+    ),
+    Scenario(
+        "multiplexed",
+        "GET",
+        request_size=0,
+        response_size=1024,
+        connections=1,
+        streams=100,
+        requests=20000,
+    ),
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Result:
+    """Measurements for one scenario."""
+
+    scenario: str
+    requests: int
+    seconds: float
+    requests_per_second: float
+    mb_per_second: float
+    """Request and response body megabytes (MiB) transferred per second."""
+
+    latency_p50_ms: float
+    latency_p99_ms: float
+    latency_p999_ms: float
+    server_cpu_seconds: float
+
+
+async def _app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    # The path is the response size, e.g. "/1024".
+    path = dict(req.headers)[b":path"]
+    response_size = int(path[1:])
+
+    async for chunk in req.body:
+        chunk.ack.set()
+    await req.trailers.aclose()
+
+    if not response_size:
+        await resp.headers(200, [], end_stream=True)
+        return
+
+    await resp.headers(200, [(b"content-length", str(response_size).encode())])
+    await resp.body(bytes(response_size), end_stream=True)
+
+
+async def _serve_until_stopped(pipe: Connection, tls: bool) -> None:
+    ssl_context = None
+    if tls:
+        ssl_context = ssl.create_default_context(purpose=ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain("localhost.pem")
+        ssl_context.set_alpn_protocols(["h2"])
+
+    async with trio.open_nursery() as nursery:
+        server = await h2serve.serve(
+            nursery,
+            _app,
+            host="localhost",
+            port=0,
+            ssl_context=ssl_context,
+        )
+        pipe.send(server.localhost_port)
+
+        # Report CPU time whenever asked, until told to stop.
+        while await trio.to_thread.run_sync(pipe.recv) is not None:
+            pipe.send(time.process_time())
+
+        server.stop()
+
+
+def _server_process(pipe: Connection, tls: bool) -> None:
+    trio.run(_serve_until_stopped, pipe, tls)
+
+
+async def _load(
+    client: BenchClient,
+    scenario: Scenario,
+    requests: int,
+    body: bytes,
+    latencies: list[float],
+) -> None:
+    for _ in range(requests):
+        response = await client.request(
+            scenario.method,
+            f"/{scenario.response_size}",
+            body=body,
+        )
+        if len(response.body) != scenario.response_size:
+            raise RuntimeError(
+                f"Expected {scenario.response_size} bytes; got {len(response.body)}."
+            )
+        latencies.append(response.latency)
+
+
+async def _load_connection(
+    port: int,
+    ssl_context: ssl.SSLContext | None,
+    scenario: Scenario,
+    body: bytes,
+    latencies: list[float],
+) -> None:
+    requests_per_stream = scenario.requests // (scenario.connections * scenario.streams)
+
+    # A single `async with` with parentheses would require Python 3.10.
+    async with BenchClient.connect(port, ssl_context) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            for _ in range(scenario.streams):
+                nursery.start_soon(
+                    _load,
+                    client,
+                    scenario,
+                    requests_per_stream,
+                    body,
+                    latencies,
+                )
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def _run_scenario(
+    pipe: Connection,
+    port: int,
+    ssl_context: ssl.SSLContext | None,
+    scenario: Scenario,
+) -> Result:
+    body = bytes(scenario.request_size)
+    latencies: list[float] = []
+
+    pipe.send("cpu")
+    cpu_start = await trio.to_thread.run_sync(pipe.recv)
+    start = time.perf_counter()
+
+    async with trio.open_nursery() as nursery:
+        for _ in range(scenario.connections):
+            nursery.start_soon(
+                _load_connection,
+                port,
+                ssl_context,
+                scenario,
+                body,
+                latencies,
+            )
+
+    elapsed = time.perf_counter() - start
+    pipe.send("cpu")
+    cpu_end = await trio.to_thread.run_sync(pipe.recv)
+
+    latencies.sort()
+    payload = len(latencies) * (scenario.request_size + scenario.response_size)
+    return Result(
+        scenario=scenario.name,
+        requests=len(latencies),
+        seconds=elapsed,
+        requests_per_second=len(latencies) / elapsed,
+        mb_per_second=payload / _MB / elapsed,
+        latency_p50_ms=_percentile(latencies, 0.5) * 1000,
+        latency_p99_ms=_percentile(latencies, 0.99) * 1000,
+        latency_p999_ms=_percentile(latencies, 0.999) * 1000,
+        server_cpu_seconds=cpu_end - cpu_start,
+    )
+
+
+async def run(
+    scenarios: list[Scenario],
+    *,
+    tls: bool,
+    scale: float = 1.0,
+) -> list[Result]:
+    """Start a server process and run each scenario against it in turn.
+
+    Args:
+        scenarios: The scenarios to run.
+        tls: Whether to use TLS instead of cleartext HTTP/2.
+        scale: A factor applied to each scenario's request count.
+    """
+    ssl_context = None
+    if tls:
+        ssl_context = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
+        ssl_context.load_verify_locations("localhost.pem")
+        ssl_context.set_alpn_protocols(["h2"])
+
+    pipe, child_pipe = multiprocessing.Pipe()
+    process = multiprocessing.get_context("spawn").Process(
+        target=_server_process,
+        args=(child_pipe, tls),
+    )
+    process.start()
+
+    results: list[Result] = []
+    try:
+        port = await trio.to_thread.run_sync(pipe.recv)
+
+        for scenario in scenarios:
+            requests = max(
+                scenario.connections * scenario.streams,
+                int(scenario.requests * scale),
+            )
+            results.append(
+                await _run_scenario(
+                    pipe,
+                    port,
+                    ssl_context,
+                    dataclasses.replace(scenario, requests=requests),
+                )
+            )
+
+    finally:
+        pipe.send(None)
+        process.join()
+
+    return results
+
+
+def _environment(args: argparse.Namespace) -> dict[str, object]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        "revision": revision,
+        "python": sys.version,
+        "platform": platform.platform(),
+        "tls": args.tls,
+        "scale": args.scale,
+    }
+
+
+def _print_table(results: list[Result], baseline: dict[str, Result]) -> None:
+    print(
+        f"{'scenario':>15} {'req/s':>10} {'MB/s':>9}"
+        f" {'p50 (ms)':>9} {'p99 (ms)':>9} {'p999 (ms)':>10} {'cpu (s)':>8}"
+    )
+    for result in results:
+        line = (
+            f"{result.scenario:>15}"
+            f" {result.requests_per_second:>10.0f}"
+            f" {result.mb_per_second:>9.1f}"
+            f" {result.latency_p50_ms:>9.2f}"
+            f" {result.latency_p99_ms:>9.2f}"
+            f" {result.latency_p999_ms:>10.2f}"
+            f" {result.server_cpu_seconds:>8.2f}"
+        )
+        if before := baseline.get(result.scenario):
+            change = result.requests_per_second / before.requests_per_second - 1
+            line += f" ({change:+.1%} req/s)"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="A scenario to run; may be repeated. Defaults to all.",
+    )
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply each scenario's request count by this.",
+    )
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="A previous --output to compare with.")
+    args = parser.parse_args()
+
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.scenario or scenario.name in args.scenario
+    ]
+    results = trio.run(
+        functools.partial(run, scenarios, tls=args.tls, scale=args.scale)
+    )
+
+    baseline: dict[str, Result] = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            for result in json.load(f)["results"]:
+                baseline[result["scenario"]] = Result(**result)
+
+    _print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "environment": _environment(args),
+                    "results": [dataclasses.asdict(result) for result in results],
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Measure event loop latency while CPU-heavy handlers run.
+
+Serves requests whose handler renders a large HTML list, once with an
+async handler that does the work on the event loop and once with the same
+work in a `SyncHandler`. Meanwhile a task on the server's loop repeatedly
+sleeps for a millisecond and records how late it wakes up. Reports p50 and
+p99 of that delay, and request throughput.
+
+Uses cleartext HTTP/2 so that TLS does not dominate. Run with:
+
+  python -m benchmarks.sync_handlers
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import trio
+
+import h2serve
+
+from ._client import BenchClient
+
+_ITEMS = [{"id": i, "name": f"item {i}"} for i in range(20000)]
+_TICK = 0.001
+
+
+def _render() -> bytes:
+    # Pure-Python rendering, like a template engine. Unlike a single call
+    # into C, such as json.dumps, this lets the loop thread take the GIL
+    # every switch interval.
+    rows = [f"<li id={item['id']}>{item['name']}</li>" for item in _ITEMS]
+    return "".join(rows).encode()
+
+
+async def _async_app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+
+    await resp.headers(200, [])
+    await resp.body(_render(), end_stream=True)
+
+
+def _sync_app(req: h2serve.SyncRequest, resp: h2serve.SyncResponse) -> None:
+    resp.headers(200, [])
+    resp.write(_render())
+
+
+async def _measure_loop_delay(delays: list[float]) -> None:
+    while True:
+        start = time.perf_counter()
+        await trio.sleep(_TICK)
+        delays.append(time.perf_counter() - start - _TICK)
+
+
+async def _load(port: int, requests: int) -> None:
+    async with BenchClient.connect(port, None) as client:
+        for _ in range(requests):
+            await client.request("GET", "/")
+
+
+async def _run(
+    app: h2serve.AppHandler,
+    *,
+    connections: int,
+    requests: int,
+) -> tuple[list[float], float]:
+    delays: list[float] = []
+
+    async with trio.open_nursery() as nursery:
+        server = await h2serve.serve(
+            nursery,
+            app,
+            host="localhost",
+            port=0,
+            ssl_context=None,
+        )
+        nursery.start_soon(_measure_loop_delay, delays)
+
+        start = time.perf_counter()
+        async with trio.open_nursery() as load_nursery:
+            for _ in range(connections):
+                load_nursery.start_soon(
+                    _load,
+                    server.localhost_port,
+                    requests // connections,
+                )
+        elapsed = time.perf_counter() - start
+
+        nursery.cancel_scope.cancel()
+
+    return delays, elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'handler':>8} {'req/s':>8} {'p50 delay (ms)':>15} {'p99 delay (ms)':>15}")
+    for name, app in (
+        ("async", _async_app),
+        ("sync", h2serve.SyncHandler(_sync_app, max_workers=args.workers)),
+    ):
+        delays, elapsed = await _run(
+            app,
+            connections=args.connections,
+            requests=args.requests,
+        )
+        percentiles = statistics.quantiles(delays, n=100)
+        print(
+            f"{name:>8}"
+            f" {args.requests / elapsed:>8.0f}"
+            f" {percentiles[49] * 1000:>15.2f}"
+            f" {percentiles[98] * 1000:>15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    trio.run(main)
@@ -0,0 +1,177 @@
+"""Measure socket writes and TLS records per request.
+
+Serves many multiplexed requests whose responses consist of headers and
+several small DATA frames, with write coalescing disabled, with the default
+write size, and with deferred flushing, and reports the number of transport
+writes (roughly one syscall each) and TLS records per request.
+
+Expects a localhost.pem file in the workspace root. Run with:
+
+  python -m benchmarks.write_coalescing
+"""
+
+from __future__ import annotations
+
+import argparse
+import ssl
+
+import trio
+from typing_extensions import override
+
+import h2serve
+from h2serve._conn_handler import DEFAULT_MAX_WRITE_SIZE, HTTP2ConnectionHandler
+
+from ._client import BenchClient
+
+_TLS_RECORD_HEADER_SIZE = 5
+
+
+class _CountingStream(trio.abc.Stream):
+    """Counts writes and the TLS records they contain."""
+
+    def __init__(self, stream: trio.SocketStream) -> None:
+        self._stream = stream
+        self.socket = stream.socket
+        self.writes = 0
+        self.records = 0
+        self._record_remaining = 0
+        self._header = b""
+
+    @override
+    async def send_all(self, data: bytes | bytearray | memoryview) -> None:
+        self.writes += 1
+        self._count_records(bytes(data))
+        await self._stream.send_all(data)
+
+    @override
+    async def wait_send_all_might_not_block(self) -> None:
+        await self._stream.wait_send_all_might_not_block()
+
+    @override
+    async def receive_some(self, max_bytes: int | None = None) -> bytes | bytearray:
+        return await self._stream.receive_some(max_bytes)
+
+    @override
+    async def send_eof(self) -> None:
+        await self._stream.send_eof()
+
+    @override
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+    def _count_records(self, data: bytes) -> None:
+        while data:
+            if self._record_remaining:
+                n = min(self._record_remaining, len(data))
+                self._record_remaining -= n
+                data = data[n:]
+                continue
+
+            needed = _TLS_RECORD_HEADER_SIZE - len(self._header)
+            self._header += data[:needed]
+            data = data[needed:]
+
+            if len(self._header) == _TLS_RECORD_HEADER_SIZE:
+                self.records += 1
+                self._record_remaining = int.from_bytes(self._header[3:5], "big")
+                self._header = b""
+
+
+async def _app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+
+    await resp.headers(200, [])
+    for _ in range(4):
+        await resp.body(b"x" * 256)
+    await resp.end()
+
+
+async def _run(
+    *,
+    max_write_size: int,
+    deferred_flush: bool,
+    requests: int,
+    concurrency: int,
+    ssl_server: ssl.SSLContext,
+    ssl_client: ssl.SSLContext,
+) -> tuple[float, float]:
+    listeners = await trio.open_tcp_listeners(0, host="localhost")
+    port = listeners[0].socket.getsockname()[1]
+    counters: list[_CountingStream] = []
+
+    async def handle(stream: trio.SocketStream) -> None:
+        counting = _CountingStream(stream)
+        counters.append(counting)
+        conn = trio.SSLStream(counting, ssl_server, server_side=True)
+        await HTTP2ConnectionHandler(
+            conn,  # type: ignore[arg-type]
+            _app,
+            max_write_size=max_write_size,
+            deferred_flush=deferred_flush,
+        ).handle_no_except()
+
+    async with trio.open_nursery() as nursery:
+        await nursery.start(trio.serve_listeners, handle, listeners)
+
+        async with BenchClient.connect(port, ssl_client) as client:
+            # Exclude the handshake and connection setup.
+            await client.request("GET", "/")
+            writes_before = sum(c.writes for c in counters)
+            records_before = sum(c.records for c in counters)
+
+            async def worker(n: int) -> None:
+                for _ in range(n):
+                    await client.request("GET", "/")
+
+            async with trio.open_nursery() as workers:
+                for _ in range(concurrency):
+                    workers.start_soon(worker, requests // concurrency)
+
+        writes = sum(c.writes for c in counters) - writes_before
+        records = sum(c.records for c in counters) - records_before
+        nursery.cancel_scope.cancel()
+
+    total = requests // concurrency * concurrency
+    return writes / total, records / total
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    ssl_server = ssl.create_default_context(purpose=ssl.Purpose.CLIENT_AUTH)
+    ssl_server.load_cert_chain("localhost.pem")
+    ssl_server.set_alpn_protocols(["h2"])
+
+    ssl_client = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
+    ssl_client.load_verify_locations("localhost.pem")
+    ssl_client.set_alpn_protocols(["h2"])
+
+    print(
+        f"{'max_write_size':>16} {'deferred_flush':>16}"
+        f" {'writes/req':>12} {'records/req':>12}"
+    )
+    for max_write_size, deferred_flush in (
+        (0, False),
+        (DEFAULT_MAX_WRITE_SIZE, False),
+        (DEFAULT_MAX_WRITE_SIZE, True),
+    ):
+        writes, records = await _run(
+            max_write_size=max_write_size,
+            deferred_flush=deferred_flush,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            ssl_server=ssl_server,
+            ssl_client=ssl_client,
+        )
+        print(
+            f"{max_write_size:>16} {deferred_flush!s:>16}"
+            f" {writes:>12.2f} {records:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    trio.run(main)
@@ -1,18 +1,61 @@
 """A Python HTTP/2 server, built on trio."""
 
+from ._admission import AdmissionController, PriorityClass
 from ._app_handler import AppHandler
-from ._request import DataChunk, Header, HTTP2Request
+from ._compression import CompressedResponse, CompressionCache
+from ._conn_handler import ConnectionInfo
+from ._headers import PreparedHeaders
+from ._metrics import HistogramSnapshot, Metrics, MetricsRegistry
+from ._middleware import Middleware
+from ._prometheus import PrometheusHandler
+from ._request import (
+    DataChunk,
+    DataChunkAck,
+    Header,
+    HTTP2Request,
+    RequestBodyTooLargeError,
+)
 from ._response import HTTP2Response
-from ._server import Server, serve
+from ._response_cache import CacheKey, ResponseCache
+from ._router import Router, path_params
+from ._server import DrainResult, Server, serve
+from ._static_files import StaticFiles
+from ._sync_handler import SyncAppHandler, SyncHandler, SyncRequest, SyncResponse
+from ._tracing import StreamTracer, Tracer
 
 __version__ = "0.1.0-dev.1"
 
 __all__ = [
     "serve",
     "Server",
+    "DrainResult",
+    "ConnectionInfo",
     "AppHandler",
     "HTTP2Request",
     "HTTP2Response",
+    "PreparedHeaders",
+    "CompressedResponse",
+    "CompressionCache",
     "DataChunk",
+    "DataChunkAck",
     "Header",
+    "RequestBodyTooLargeError",
+    "SyncHandler",
+    "SyncAppHandler",
+    "SyncRequest",
+    "SyncResponse",
+    "Metrics",
+    "MetricsRegistry",
+    "HistogramSnapshot",
+    "PrometheusHandler",
+    "Router",
+    "path_params",
+    "StaticFiles",
+    "ResponseCache",
+    "CacheKey",
+    "Middleware",
+    "AdmissionController",
+    "PriorityClass",
+    "Tracer",
+    "StreamTracer",
 ]
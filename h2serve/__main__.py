@@ -0,0 +1,59 @@
+"""Serve an app with one or more worker processes.
+
+Example:
+    python -m h2serve myproject.web:app --port 8443 --workers 4 \
+        --certfile cert.pem --keyfile key.pem
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+
+from ._supervisor import Supervisor, WorkerConfig, load_app
+
+
+def main() -> None:
+    """Parse command-line arguments and run the supervisor."""
+    parser = argparse.ArgumentParser(
+        prog="python -m h2serve",
+        description="Serve an h2serve app on all cores.",
+    )
+    parser.add_argument("app", help='the app handler, as "module:attribute"')
+    parser.add_argument("--host", default=None, help="the host to bind")
+    parser.add_argument("--port", type=int, required=True, help="the port to bind")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="the number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--certfile",
+        help="the TLS certificate chain; serves cleartext h2c if omitted",
+    )
+    parser.add_argument("--keyfile", help="the TLS private key, if not in certfile")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+
+    # Fail before starting any workers if the app can't be imported.
+    load_app(args.app)
+
+    Supervisor(
+        WorkerConfig(
+            app=args.app,
+            host=args.host,
+            port=args.port,
+            certfile=args.certfile,
+            keyfile=args.keyfile,
+            log_level=args.log_level,
+        ),
+        workers=args.workers,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import collections
+import math
+from typing import Callable
+
+import trio
+
+from ._request import Header
+
+PriorityClass = Callable[[list[Header]], int]
+"""Assigns a request to a priority class by its headers.
+
+Lower classes are admitted first.
+"""
+
+
+class AdmissionRefusedError(Exception):
+    """A request was not admitted and its stream should be refused."""
+
+
+class AdmissionController:
+    """Limits how many requests are handled at once across a server.
+
+    Pass one to `serve`, and optionally share it between servers. At most
+    `max_concurrent` handlers run at a time. Requests that arrive while the
+    limit is reached wait in a queue of at most `max_queue` requests, and
+    are admitted in order of their priority class and then of arrival.
+
+    Requests that cannot be admitted are refused with a REFUSED_STREAM reset,
+    which tells the client that the request was not processed and can be
+    safely retried, possibly elsewhere. This happens when the queue is full,
+    unless the request has a lower class than a queued one, which it then
+    replaces; and when a request waits longer than `queue_timeout`.
+
+    The time queued requests wait is collected in `Metrics.admission_wait`.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        *,
+        max_queue: int = 0,
+        queue_timeout: float | None = None,
+        priority_class: PriorityClass | None = None,
+    ) -> None:
+        """Create a controller.
+
+        Args:
+            max_concurrent: The maximum number of handlers to run at once.
+            max_queue: The maximum number of requests waiting to be admitted.
+            queue_timeout: The longest a request may wait, in seconds, or None
+                to wait indefinitely.
+            priority_class: Assigns requests to priority classes, for example
+                by path or by a header. By default, all requests are in the
+                same class.
+        """
+        if max_concurrent < 1:
+            raise ValueError(f"max_concurrent must be positive; got {max_concurrent}.")
+
+        self._max_concurrent = max_concurrent
+        self._max_queue = max_queue
+        self._queue_timeout = math.inf if queue_timeout is None else queue_timeout
+        self._priority_class = priority_class
+
+        self._active = 0
+        self._queues: dict[int, collections.deque[AdmissionTicket]] = {}
+        self._queued = 0
+
+    @property
+    def active(self) -> int:
+        """The number of admitted requests whose handlers are running."""
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        """The number of requests waiting to be admitted."""
+        return self._queued
+
+    def request(self, headers: list[Header]) -> AdmissionTicket | None:
+        """Admit or enqueue a request, or return None to refuse it now."""
+        priority = self._priority_class(headers) if self._priority_class else 0
+        ticket = AdmissionTicket(self, priority)
+
+        if self._active < self._max_concurrent and not self._queued:
+            self._active += 1
+            ticket._admitted = True
+            return ticket
+
+        if self._queued >= self._max_queue and not self._displace(priority):
+            return None
+
+        self._queues.setdefault(priority, collections.deque()).append(ticket)
+        self._queued += 1
+        ticket._queued = True
+        return ticket
+
+    def _displace(self, priority: int) -> bool:
+        """Refuse the newest queued request of the highest class above this."""
+        if not self._queues:
+            return False
+
+        worst = max(self._queues)
+        if worst <= priority:
+            return False
+
+        self._remove(self._queues[worst][-1]).refuse()
+        return True
+
+    def _remove(self, ticket: AdmissionTicket) -> AdmissionTicket:
+        queue = self._queues[ticket.priority]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[ticket.priority]
+        self._queued -= 1
+        return ticket
+
+    def _release(self) -> None:
+        self._active -= 1
+        while self._active < self._max_concurrent and self._queues:
+            queue = self._queues[min(self._queues)]
+            ticket = self._remove(queue[0])
+            self._active += 1
+            ticket._admit()
+
+
+class AdmissionTicket:
+    """A request's place in an `AdmissionController`."""
+
+    __slots__ = (
+        "_admitted",
+        "_controller",
+        "_done",
+        "_queued",
+        "_refused",
+        "_released",
+        "priority",
+    )
+
+    def __init__(self, controller: AdmissionController, priority: int) -> None:
+        self._controller = controller
+        self.priority = priority
+        self._done = trio.Event()
+        self._admitted = False
+        self._queued = False
+        self._refused = False
+        self._released = False
+
+    @property
+    def admitted(self) -> bool:
+        """Whether the request has been admitted."""
+        return self._admitted
+
+    @property
+    def queued(self) -> bool:
+        """Whether the request had to wait in the queue."""
+        return self._queued
+
+    async def wait(self) -> None:
+        """Wait to be admitted.
+
+        Raises:
+            AdmissionRefusedError: If the request was refused while waiting,
+                or waited too long.
+        """
+        if self._admitted:
+            return
+
+        try:
+            with trio.move_on_after(self._controller._queue_timeout):
+                await self._done.wait()
+        finally:
+            if not self._done.is_set():
+                # Cancelled or timed out.
+                self._controller._remove(self)
+                self._refused = True
+
+        if self._refused:
+            raise AdmissionRefusedError
+
+    def refuse(self) -> None:
+        """Refuse a waiting request."""
+        self._refused = True
+        self._done.set()
+
+    def release(self) -> None:
+        """Let the next request in, if this one was admitted."""
+        if self._admitted and not self._released:
+            self._released = True
+            self._controller._release()
+
+    def _admit(self) -> None:
+        self._admitted = True
+        self._done.set()
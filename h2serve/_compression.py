@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import collections
+import zlib
+from collections.abc import Hashable, Iterable
+
+import trio
+
+from ._app_handler import AppHandler
+from ._headers import PreparedHeaders
+from ._request import Header, HTTP2Request
+from ._response import HTTP2Response
+
+# Responses whose whole body is known to be smaller than this are not
+# compressed, since the savings would not make up for the overhead.
+DEFAULT_MIN_SIZE = 256
+
+# Chunks at least this large are compressed in a worker thread. zlib releases
+# the GIL while it works, so the event loop keeps running.
+_THREAD_THRESHOLD = 64 * 1024
+
+# Supported content codings and the zlib wbits that produce them, in order
+# of preference.
+_WBITS = {b"gzip": 31, b"deflate": 15}
+
+_COMPRESSIBLE_TYPES = frozenset(
+    (
+        b"application/javascript",
+        b"application/json",
+        b"application/manifest+json",
+        b"application/wasm",
+        b"application/xml",
+        b"image/svg+xml",
+    )
+)
+
+
+def negotiate_encoding(accept_encoding: bytes | None) -> str | None:
+    """Pick a content coding from an `accept-encoding` header value.
+
+    Returns:
+        "gzip" or "deflate", or None if the response should not be encoded.
+    """
+    if not accept_encoding:
+        return None
+
+    weights: dict[bytes, float] = {}
+    for item in accept_encoding.split(b","):
+        coding, _, params = item.partition(b";")
+        weight = 1.0
+        name, _, value = params.strip().partition(b"=")
+        if name.strip().lower() == b"q":
+            try:
+                weight = float(value)
+            except ValueError:
+                continue
+        weights[coding.strip().lower()] = weight
+
+    # Prefer an encoding over identity unless identity is explicitly preferred.
+    best: bytes | None = None
+    best_weight = weights.get(b"identity", 0.0)
+    for coding in _WBITS:
+        weight = weights.get(coding, weights.get(b"*", 0.0))
+        if weight > 0 and weight > best_weight:
+            best, best_weight = coding, weight
+
+    return best.decode() if best else None
+
+
+def _is_compressible(status: int, headers: list[Header]) -> bool:
+    if status in (204, 304):
+        return False
+
+    content_type = b""
+    for name, value in headers:
+        name = name.lower()
+        if name == b"content-encoding":
+            return False
+        if name == b"cache-control" and b"no-transform" in value.lower():
+            return False
+        if name == b"content-type":
+            content_type = value.partition(b";")[0].strip().lower()
+
+    return (
+        content_type.startswith(b"text/")
+        or content_type in _COMPRESSIBLE_TYPES
+        or content_type.endswith((b"+json", b"+xml"))
+    )
+
+
+class CompressionCache:
+    """A bounded LRU of compressed payloads.
+
+    Share one between the responses of an app so that static assets are
+    compressed once per encoding instead of once per request.
+    """
+
+    def __init__(self, *, max_bytes: int = 16 * 1024 * 1024) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_bytes: The maximum total size of the compressed payloads to
+                keep. The least recently used ones are evicted first.
+        """
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries: collections.OrderedDict[tuple[Hashable, str], bytes] = (
+            collections.OrderedDict()
+        )
+
+        self.hits = 0
+        """The number of lookups that found a payload."""
+
+        self.misses = 0
+        """The number of lookups that did not find a payload."""
+
+    @property
+    def size(self) -> int:
+        """The total size of the cached payloads in bytes."""
+        return self._size
+
+    def get(self, key: Hashable, encoding: str) -> bytes | None:
+        """Look up a compressed payload, marking it as recently used."""
+        data = self._entries.get((key, encoding))
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end((key, encoding))
+        return data
+
+    def put(self, key: Hashable, encoding: str, data: bytes) -> None:
+        """Store a compressed payload, evicting others to make room."""
+        if len(data) > self._max_bytes:
+            return
+
+        if old := self._entries.pop((key, encoding), None):
+            self._size -= len(old)
+
+        self._entries[(key, encoding)] = data
+        self._size += len(data)
+
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+class CompressedResponse:
+    """Wraps an `HTTP2Response` to compress the body if the client accepts it.
+
+    The encoding is negotiated from the request's `accept-encoding` header.
+    Only bodies with textual content types are compressed, and only if the
+    response does not already have a `content-encoding` or forbid it with
+    `cache-control: no-transform`.
+
+    Response headers are held back until the first call to `body`, `trailers`
+    or `end`, so that a body that turns out to be small can be sent as is.
+    When compressing, `content-length` is removed, strong ETags are made weak
+    and `vary: accept-encoding` is added.
+
+    Each call to `body` flushes the compressor so that streamed responses
+    reach the client without delay. Compress in larger chunks for a better
+    ratio.
+    """
+
+    def __init__(
+        self,
+        req: HTTP2Request,
+        resp: HTTP2Response,
+        *,
+        cache: CompressionCache | None = None,
+        level: int = 6,
+        min_size: int = DEFAULT_MIN_SIZE,
+    ) -> None:
+        """Wrap a response.
+
+        Args:
+            req: The request, whose headers determine the encoding.
+            resp: The response to write to.
+            cache: Where to keep payloads passed to `body` with a `cache_key`.
+            level: The zlib compression level, from 1 (fastest) to 9 (best).
+            min_size: Bodies smaller than this are not compressed if their
+                size is known when the headers are sent.
+        """
+        self._resp = resp
+        self._cache = cache
+        self._level = level
+        self._min_size = min_size
+
+        accept_encoding = None
+        for name, value in req.headers:
+            if name == b"accept-encoding":
+                accept_encoding = value
+        self._encoding = negotiate_encoding(accept_encoding)
+
+        self._pending: tuple[int, list[Header]] | None = None
+        self._compressor: zlib._Compress | None = None
+        self._body_started = False
+
+    @property
+    def encoding(self) -> str | None:
+        """The content coding of the body, or None if it is not compressed.
+
+        Before the headers are sent, this is the negotiated encoding.
+        """
+        return self._encoding
+
+    @property
+    def ended(self) -> bool:
+        """Whether a frame with END_STREAM was emitted."""
+        return self._resp.ended
+
+    async def interim(
+        self,
+        status_1xx: int,
+        headers: Iterable[tuple[bytes, bytes]],
+    ) -> None:
+        """Send an informational (1xx) status. See `HTTP2Response.interim`."""
+        await self._resp.interim(status_1xx, headers)
+
+    async def push(
+        self,
+        path: str | bytes,
+        headers: Iterable[tuple[bytes, bytes]] = (),
+        *,
+        handler: AppHandler | None = None,
+    ) -> bool:
+        """Push the response to a request. See `HTTP2Response.push`."""
+        return await self._resp.push(path, headers, handler=handler)
+
+    async def headers(
+        self,
+        status: int,
+        headers: Iterable[tuple[bytes, bytes]] = (),
+        *,
+        prepared: PreparedHeaders | None = None,
+        end_stream: bool = False,
+    ) -> None:
+        """Set the response headers. See `HTTP2Response.headers`.
+
+        Unless `end_stream` is set or the body will not be compressed, the
+        headers are sent together with the first part of the body.
+        """
+        headers = list(headers)
+        all_headers = [*(prepared.headers if prepared else ()), *headers]
+
+        if not _is_compressible(status, all_headers):
+            self._encoding = None
+            await self._resp.headers(
+                status,
+                headers,
+                prepared=prepared,
+                end_stream=end_stream,
+            )
+            return
+
+        all_headers.append((b"vary", b"accept-encoding"))
+        if end_stream or not self._encoding:
+            self._encoding = None
+            await self._resp.headers(status, all_headers, end_stream=end_stream)
+        else:
+            self._pending = (status, all_headers)
+
+    async def body(
+        self,
+        data: bytes | bytearray | memoryview,
+        *,
+        end_stream: bool = False,
+        cache_key: Hashable | None = None,
+    ) -> None:
+        """Compress and send part of the response body.
+
+        Args:
+            data: The uncompressed data to send.
+            end_stream: If true, there is no more response body and no trailers.
+            cache_key: If given, `data` must be the whole body, and its
+                compressed form is looked up in and added to the cache under
+                this key. Use it for payloads that many responses share, such
+                as static files.
+
+        Raises:
+            ValueError: If `cache_key` is given for only part of a body.
+        """
+        if cache_key is not None and (self._body_started or not end_stream):
+            raise ValueError("A cache key can only be used for a whole body.")
+        self._body_started = True
+
+        if self._pending:
+            await self._send_headers(len(data) if end_stream else None)
+
+        if not self._compressor:
+            await self._resp.body(data, end_stream=end_stream)
+            return
+
+        if cache_key is not None and self._cache is not None:
+            await self._resp.body(
+                await self._compress_cached(cache_key, data),
+                end_stream=True,
+            )
+            return
+
+        compressed = await self._compress(data, finish=end_stream)
+        if compressed or end_stream:
+            await self._resp.body(compressed, end_stream=end_stream)
+
+    async def trailers(self, trailers: Iterable[tuple[bytes, bytes]]) -> None:
+        """Finish the body and send trailers. See `HTTP2Response.trailers`."""
+        if self._pending:
+            await self._send_headers(None)
+
+        if self._compressor:
+            await self._resp.body(await self._compress(b"", finish=True))
+
+        await self._resp.trailers(trailers)
+
+    async def end(self) -> None:
+        """Finish the body and end the response. See `HTTP2Response.end`."""
+        if self._pending:
+            # There is no body, so send the headers as they are.
+            status, headers = self._pending
+            self._pending = None
+            self._encoding = None
+            await self._resp.headers(status, headers, end_stream=True)
+
+        elif self._compressor and not self._resp.ended:
+            await self.body(b"", end_stream=True)
+
+        else:
+            await self._resp.end()
+
+    async def _send_headers(self, size: int | None) -> None:
+        assert self._pending
+        assert self._encoding
+        status, headers = self._pending
+        self._pending = None
+
+        if size is not None and size < self._min_size:
+            self._encoding = None
+            await self._resp.headers(status, headers)
+            return
+
+        encoded_headers: list[Header] = []
+        for name, value in headers:
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"etag" and value.startswith(b'"'):
+                value = b"W/" + value
+            encoded_headers.append((name, value))
+        encoded_headers.append((b"content-encoding", self._encoding.encode()))
+
+        self._compressor = zlib.compressobj(
+            self._level,
+            wbits=_WBITS[self._encoding.encode()],
+        )
+        await self._resp.headers(status, encoded_headers)
+
+    async def _compress(
+        self,
+        data: bytes | bytearray | memoryview,
+        *,
+        finish: bool,
+    ) -> bytes:
+        compressor = self._compressor
+        assert compressor
+        mode = zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH
+
+        def run() -> bytes:
+            return compressor.compress(data) + compressor.flush(mode)
+
+        if len(data) >= _THREAD_THRESHOLD:
+            return await trio.to_thread.run_sync(run)
+        return run()
+
+    async def _compress_cached(
+        self,
+        key: Hashable,
+        data: bytes | bytearray | memoryview,
+    ) -> bytes:
+        assert self._cache is not None
+        assert self._encoding
+        if cached := self._cache.get(key, self._encoding):
+            return cached
+
+        compressed = await self._compress(data, finish=True)
+        self._cache.put(key, self._encoding, compressed)
+        return compressed
@@ -1,20 +1,37 @@
 from __future__ import annotations
 
+import dataclasses
+import functools
 import logging
+import math
 
 import h2.config
 import h2.connection
 import h2.events
 import h2.exceptions
 import h2.settings
+import hyperframe.frame
 import trio
 from h2.errors import ErrorCodes
 
+from ._admission import AdmissionController, AdmissionRefusedError, AdmissionTicket
 from ._app_handler import AppHandler
+from ._flow_control import DEFAULT_WINDOW_SIZE, ReceiveWindowAcknowledger
 from ._logging import ContextualLogger, peer_ctx, stream_id_ctx
+from ._metrics import DEFAULT_DURATION_BUCKETS, ConnectionMetrics
+from ._middleware import MiddlewareChain
 from ._notifying_channel import notifying_channel
+from ._priority import (
+    PRIORITY_UPDATE_FRAME_TYPE,
+    PriorityScheduler,
+    parse_priority,
+    parse_priority_update,
+)
+from ._request import Header, RequestBodyTooLargeError
 from ._state import HTTP2State
 from ._stream_handler import HTTP2StreamHandler
+from ._tracing import StreamTracer, Tracer
+from ._window_tuning import ReceiveWindowBudget, ReceiveWindowTuner
 
 _logger = ContextualLogger(logging.getLogger(__name__))
 
@@ -26,29 +43,198 @@ _logger = ContextualLogger(logging.getLogger(__name__))
 _OUTGOING_BUFFER = 100
 _OUTGOING_TIMEOUT = 60 * 5
 
+# Coalesce queued outgoing data into writes of up to 64 KiB by default.
+# This is four full TLS records.
+DEFAULT_MAX_WRITE_SIZE = 64 * 1024
+
+# Every prior-knowledge HTTP/2 connection starts with this.
+_CONNECTION_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+# The payload of keepalive PINGs. Those sent by the window tuner are counters,
+# so acknowledgements of the two can be told apart.
+_KEEPALIVE_PING = b"keepaliv"
+
+# Events that are routed to the handler of their stream.
+_STREAM_EVENTS = (
+    h2.events.DataReceived,
+    h2.events.TrailersReceived,
+    h2.events.StreamEnded,
+    h2.events.StreamReset,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class ConnectionInfo:
+    """A snapshot of the state of a connection."""
+
+    peer: tuple[str, int] | tuple[str, int, int, int] | None
+    """The address of the client, or None if the transport is not a socket."""
+
+    stream_receive_window: int
+    """The receive window advertised for new streams, in bytes."""
+
+    connection_receive_window: int
+    """The receive window of the connection as a whole, in bytes."""
+
+    rtt: float | None
+    """The smoothed round-trip time in seconds.
+
+    This is only measured if receive windows are autotuned, and only once
+    the client has sent request data.
+    """
+
+    streams_active: int
+    """The number of streams whose handlers are running."""
+
+    streams_total: int
+    """The number of streams handled so far, including active ones."""
+
 
 class HTTP2ConnectionHandler:
-    """Runs an HTTP/2 server over a TLS stream."""
+    """Runs an HTTP/2 server over a byte stream.
+
+    The stream is usually a TLS stream or a cleartext TCP stream accepted by
+    `serve`, but any `trio.abc.Stream` works, such as an in-memory stream.
+    TLS streams must negotiate "h2" with ALPN; other streams must start with
+    the HTTP/2 connection preface.
+    """
 
     def __init__(
         self,
-        conn: trio.SSLStream[trio.SocketStream],
+        conn: trio.abc.Stream,
         app: AppHandler,
+        *,
+        max_write_size: int = DEFAULT_MAX_WRITE_SIZE,
+        deferred_flush: bool = False,
+        window_update_ratio: float = 0.5,
+        auto_ack: bool = False,
+        window_budget: ReceiveWindowBudget | None = None,
+        metrics: ConnectionMetrics | None = None,
+        tracer: Tracer | None = None,
+        header_table_size: int | None = None,
+        middleware: MiddlewareChain | None = None,
+        admission: AdmissionController | None = None,
+        idle_timeout: float | None = None,
+        keepalive_interval: float | None = None,
+        keepalive_timeout: float = 20.0,
     ) -> None:
+        """Prepare to handle a connection.
+
+        Args:
+            conn: The TLS stream to serve, or any other stream for cleartext
+                HTTP/2 with prior knowledge (h2c).
+            app: The application logic to run on every request.
+            max_write_size: The number of bytes after which to stop coalescing
+                queued outgoing data into a single write.
+            deferred_flush: Whether to serialize outgoing frames once per
+                scheduler batch instead of after every state access.
+            window_update_ratio: The fraction of a receive window that must be
+                acknowledged before sending a WINDOW_UPDATE for it.
+            auto_ack: Whether to acknowledge request data as soon as the
+                application reads it.
+            window_budget: If given, receive windows are autotuned within
+                this budget.
+            metrics: Where to count the connection's activity.
+            tracer: If given, receives timings of every request.
+            header_table_size: If given, the size of the HPACK tables: it is
+                advertised for request headers, and response headers are
+                compressed with a table no larger than it.
+            middleware: If given, hooks to run around every request.
+            admission: If given, admits requests from the client before their
+                handlers run.
+            idle_timeout: If given, the connection is drained after this many
+                seconds without open streams, or closed if it takes longer
+                than this to set up.
+            keepalive_interval: If given, a PING is sent after this many
+                seconds without receiving anything from the client.
+            keepalive_timeout: The connection is closed if a keepalive PING
+                is not acknowledged within this many seconds.
+        """
         self._conn_scope = trio.CancelScope()
 
         self._conn = conn
         self._app = app
-
-        self._peer = conn.transport_stream.socket.getpeername()
-        peer_ctx.set(self._peer)
+        self._max_write_size = max_write_size
+        self._deferred_flush = deferred_flush
+        self._auto_ack = auto_ack
+        self._tracer = tracer
+        self._header_table_size = header_table_size
+        self._middleware = middleware
+        self._admission = admission
+        self._idle_timeout = idle_timeout
+        self._keepalive_interval = keepalive_interval
+        self._keepalive_timeout = keepalive_timeout
+
+        self._peer = _peer_address(conn)
+        peer_ctx.set(str(self._peer) if self._peer else None)
 
         outgoing_data_in, outgoing_data_out = notifying_channel(_OUTGOING_BUFFER)
         self._outgoing_data = outgoing_data_out
-        self._state = HTTP2State(outgoing_data_in)
+
+        self._metrics = metrics or ConnectionMetrics(DEFAULT_DURATION_BUCKETS)
+        self._metrics.queue_depth = lambda: outgoing_data_out.queued
+        self._state = HTTP2State(outgoing_data_in, deferred_flush=deferred_flush)
+        self._scheduler = PriorityScheduler()
+        self._acknowledger = ReceiveWindowAcknowledger(
+            self._state,
+            stream_window=DEFAULT_WINDOW_SIZE,
+            ratio=window_update_ratio,
+        )
+
+        self._tuner: ReceiveWindowTuner | None = None
+        if window_budget:
+            self._tuner = ReceiveWindowTuner(
+                self._state,
+                self._acknowledger,
+                window_budget,
+            )
 
         self._streams: dict[int, HTTP2StreamHandler] = dict()
 
+        # Draining sends a GOAWAY, after which the connection is closed as
+        # soon as its last stream ends by no longer reading from it.
+        self._draining = False
+        self._goaway_stream_id: int | None = None
+        self._handler_nursery: trio.Nursery | None = None
+        self._read_scope = trio.CancelScope()
+
+        # For closing idle and unresponsive connections.
+        self._streams_changed = trio.Event()
+        self._keepalive_acked = trio.Event()
+        self._keepalive_scope = trio.CancelScope()
+        self._last_received = 0.0
+
+        # Data read before the main read loop started.
+        self._unprocessed = b""
+
+    def info(self) -> ConnectionInfo:
+        """Describe the current state of the connection."""
+        return ConnectionInfo(
+            peer=self._peer,
+            stream_receive_window=self._acknowledger.stream_window,
+            connection_receive_window=self._acknowledger.connection_window,
+            rtt=self._tuner.rtt if self._tuner else None,
+            streams_active=len(self._streams),
+            streams_total=self._metrics.streams_opened,
+        )
+
+    def drain(self) -> None:
+        """Gracefully close the connection.
+
+        This sends a GOAWAY frame with the ID of the last stream that the
+        client opened, refuses any later streams, and closes the connection
+        once the handlers of the remaining streams finish. It does not wait
+        for that; `handle_no_except` returns when it happens.
+
+        Calling this method again is a no-op.
+        """
+        if self._draining:
+            return
+
+        self._draining = True
+        if self._handler_nursery:
+            self._handler_nursery.start_soon(self._send_goaway)
+
     async def handle_no_except(
         self,
         *,
@@ -75,73 +261,172 @@ class HTTP2ConnectionHandler:
         self,
         initial_settings: dict[h2.settings.SettingCodes | int, int] | None = None,
     ) -> None:
+        if self._header_table_size is not None:
+            initial_settings = {
+                h2.settings.SettingCodes.HEADER_TABLE_SIZE: self._header_table_size,
+                **(initial_settings or {}),
+            }
+
         try:
             _logger.info("New connection.")
 
-            await self._conn.do_handshake()
-            _logger.info("Handshake succeeded.")
-
-            await self._validate_http2_connection()
+            with trio.move_on_after(self._idle_timeout or math.inf) as setup_scope:
+                await self._set_up()
+            if setup_scope.cancelled_caught:
+                _logger.info("Timed out setting up the connection.")
+                return
             _logger.info("Valid HTTP/2 setup.")
 
             with self._conn_scope:
                 async with trio.open_nursery() as write_scope:
                     with self._state:
                         write_scope.start_soon(self._loop_write)
+                        if self._deferred_flush:
+                            write_scope.start_soon(self._state.run_flusher)
 
                         async with self._state.use() as state:
                             state.initiate_connection()
+                            self._limit_encoder_table(state)
                             if initial_settings:
                                 state.update_settings(initial_settings)
 
+                        if initial_settings:
+                            self._acknowledger.set_windows(
+                                initial_settings.get(
+                                    h2.settings.SettingCodes.INITIAL_WINDOW_SIZE,
+                                    DEFAULT_WINDOW_SIZE,
+                                ),
+                                DEFAULT_WINDOW_SIZE,
+                            )
+
                         async with trio.open_nursery() as handler_nursery:
-                            await self._loop_read(handler_nursery)
+                            handler_nursery.start_soon(self._acknowledger.run)
+                            if self._tuner:
+                                handler_nursery.start_soon(self._tuner.run)
+
+                            handler_nursery.start_soon(self._keep_alive)
+
+                            self._handler_nursery = handler_nursery
+                            if self._draining:
+                                handler_nursery.start_soon(self._send_goaway)
+
+                            with self._read_scope:
+                                await self._loop_read(handler_nursery)
+
+                            self._keepalive_scope.cancel()
+                            self._acknowledger.close()
+                            if self._tuner:
+                                self._tuner.close()
+
+                        self._handler_nursery = None
 
         finally:
             _logger.info("Trying to gracefully close TCP connection...")
             await self._conn.aclose()
             _logger.info("Closed gracefully.")
 
-    async def _validate_http2_connection(self) -> None:
+    async def _set_up(self) -> None:
+        if isinstance(self._conn, trio.SSLStream):
+            await self._conn.do_handshake()
+            _logger.info("Handshake succeeded.")
+
+            self._validate_http2_connection(self._conn)
+        else:
+            await self._validate_connection_preface()
+
+    def _limit_encoder_table(self, state: h2.connection.H2Connection) -> None:
+        """Undo h2 growing the HPACK encoder table past the configured size.
+
+        h2 resizes the table to whatever the client's settings allow.
+        """
+        limit = self._header_table_size
+        if limit is not None and state.encoder.header_table_size > limit:
+            state.encoder.header_table_size = limit
+
+    def _validate_http2_connection(
+        self,
+        conn: trio.SSLStream[trio.abc.Stream],
+    ) -> None:
         """Validate that a connection is ready for HTTP/2.
 
         Raises an error if the connection is not valid.
         """
         # _stream forwards ssl.SSLObject methods.
-        tls_version = self._conn.version()
+        tls_version = conn.version()
         if tls_version not in ("TLSv1.2", "TLSv1.3"):
             raise ValueError(
                 f"Unrecognized TLS version: {tls_version}. HTTP/2 requires TLS 1.2+."
             )
 
-        alpn = self._conn.selected_alpn_protocol()
+        alpn = conn.selected_alpn_protocol()
 
         if not alpn:
             raise ValueError("No ALPN protocol negotiated.")
         if alpn != "h2":
             raise ValueError(f"Invalid protocol selected: {alpn}")
 
+    async def _validate_connection_preface(self) -> None:
+        """Validate that a cleartext connection starts with the HTTP/2 preface.
+
+        Only prior-knowledge connections are supported, so anything else, such
+        as an HTTP/1.1 request or upgrade, is rejected as soon as it diverges.
+        The bytes read are kept for h2 to process.
+
+        Raises an error if the connection is not valid.
+        """
+        received = b""
+        while len(received) < len(_CONNECTION_PREFACE):
+            data = await self._conn.receive_some()
+            if not data:
+                raise ValueError("Connection closed before the HTTP/2 preface.")
+
+            received += data
+            if not _CONNECTION_PREFACE.startswith(received[: len(_CONNECTION_PREFACE)]):
+                raise ValueError(
+                    "Invalid HTTP/2 connection preface."
+                    " Cleartext connections must use HTTP/2 with prior knowledge."
+                )
+
+        self._unprocessed = received
+
     async def _loop_write(self) -> None:
         # NOTE: The contract of HTTP2State requires we close _outgoing_data
         #   on any failure to send data.
         async with self._outgoing_data:
-            async for data in self._outgoing_data:
+            while True:
+                try:
+                    data, events = await self._outgoing_data.receive_batch(
+                        self._max_write_size
+                    )
+                except trio.EndOfChannel:
+                    return
+
                 with trio.fail_after(_OUTGOING_TIMEOUT):
                     await self._conn.send_all(data)
+                self._metrics.bytes_sent += len(data)
+
+                # Only unblock senders once their data is written, so that
+                # `block_on_send` applies backpressure from the socket.
+                for event in events:
+                    event.set()
 
     async def _loop_read(
         self,
         handler_nursery: trio.Nursery,
     ) -> None:
         while True:
-            data = await self._conn.receive_some()
+            data = self._unprocessed or await self._conn.receive_some()
+            self._unprocessed = b""
             if not data:
                 _logger.info("Reached end of TCP connection.")
                 return
+            self._metrics.bytes_received += len(data)
+            self._last_received = trio.current_time()
 
             async with self._state.use() as state:
                 try:
                     events = state.receive_data(data)
+                    self._limit_encoder_table(state)
 
                 except h2.exceptions.ProtocolError as e:
                     _logger.exception("Protocol error.", exc_info=e)
@@ -165,59 +450,316 @@ class HTTP2ConnectionHandler:
         handler_nursery: trio.Nursery,
     ) -> None:
         if isinstance(event, h2.events.RequestReceived):
+            self._start_stream(event, handler_nursery)
+
+        elif isinstance(event, _STREAM_EVENTS):
+            self._route_stream_event(event)
+
+        elif isinstance(event, h2.events.PingAckReceived):
+            assert event.ping_data is not None
+            if event.ping_data == _KEEPALIVE_PING:
+                self._keepalive_acked.set()
+            elif self._tuner:
+                self._tuner.ping_acked(event.ping_data)
+
+        elif isinstance(event, h2.events.WindowUpdated):
             assert event.stream_id is not None
-            assert event.headers is not None
-            stream = HTTP2StreamHandler(
-                self._state,
-                event.stream_id,
-                event.headers,
-            )
+            self._state.notify_window_changed(event.stream_id)
+
+        elif isinstance(event, h2.events.RemoteSettingsChanged):
+            if h2.settings.SettingCodes.INITIAL_WINDOW_SIZE in event.changed_settings:
+                self._state.notify_window_changed(None)
+
+        elif isinstance(event, h2.events.UnknownFrameReceived):
+            assert event.frame is not None
+            self._process_unknown_frame(event.frame)
+
+    def _route_stream_event(self, event: h2.events.Event) -> None:
+        assert isinstance(event, _STREAM_EVENTS)
+
+        if self._tuner and isinstance(event, h2.events.DataReceived):
+            assert event.flow_controlled_length is not None
+            self._tuner.data_received(event.flow_controlled_length)
+
+        elif isinstance(event, h2.events.StreamReset):
+            assert event.error_code is not None
+            self._metrics.count_reset(event.error_code, sent=not event.remote_reset)
 
-            # We expect h2 to raise an error if the stream already exists.
-            self._streams[event.stream_id] = stream
-            handler_nursery.start_soon(self._run_stream_handler, stream)
+        # NOTE: We can receive data, trailers and resets after we have sent
+        #   a full response.
+        if stream := self._streams.get(event.stream_id):
+            self._process_stream_event(stream, event)
 
         elif isinstance(event, h2.events.DataReceived):
-            assert event.data is not None
+            # Nothing will read this data, so only the connection
+            # window needs to be restored.
             assert event.flow_controlled_length is not None
+            self._acknowledger.acknowledge(event.flow_controlled_length)
 
-            # NOTE: We can receive data after we have sent a full response.
-            if event.stream_id in self._streams:
-                stream = self._streams[event.stream_id]
-                stream.push_data(event.data, event.flow_controlled_length)
+    def _process_stream_event(
+        self,
+        stream: HTTP2StreamHandler,
+        event: h2.events.Event,
+    ) -> None:
+        if isinstance(event, h2.events.DataReceived):
+            assert event.data is not None
+            assert event.flow_controlled_length is not None
+            stream.push_data(event.data, event.flow_controlled_length)
 
         elif isinstance(event, h2.events.TrailersReceived):
             assert event.headers is not None
-
-            # NOTE: We can receive trailers after we have sent a full response.
-            if event.stream_id in self._streams:
-                stream = self._streams[event.stream_id]
-                stream.push_trailers(event.headers)
+            stream.push_trailers(event.headers)
 
         elif isinstance(event, h2.events.StreamEnded):
-            if event.stream_id in self._streams:
-                self._streams[event.stream_id].mark_complete()
+            stream.mark_complete()
 
         elif isinstance(event, h2.events.StreamReset):
-            if event.stream_id in self._streams:
-                self._streams[event.stream_id].cancel()
+            stream.cancel()
 
-    async def _run_stream_handler(self, stream: HTTP2StreamHandler) -> None:
+    def _start_stream(
+        self,
+        event: h2.events.RequestReceived,
+        handler_nursery: trio.Nursery,
+    ) -> None:
+        assert event.stream_id is not None
+        assert event.headers is not None
+
+        # The client sent this before it received our GOAWAY.
+        last_stream_id = self._goaway_stream_id
+        if last_stream_id is not None and event.stream_id > last_stream_id:
+            self._refuse_stream(event.stream_id, handler_nursery)
+            return
+
+        headers = list(event.headers)
+        admission = None
+        if self._admission:
+            admission = self._admission.request(headers)
+            if not admission:
+                self._refuse_stream(event.stream_id, handler_nursery)
+                return
+
+        # Only streams that are handled are later removed from the scheduler.
+        for name, value in headers:
+            if name == b"priority":
+                self._scheduler.set_priority(event.stream_id, parse_priority(value))
+
+        self._open_stream(
+            event.stream_id,
+            headers,
+            self._app,
+            handler_nursery,
+            admission=admission,
+        )
+
+    def _refuse_stream(self, stream_id: int, handler_nursery: trio.Nursery) -> None:
+        """Reset a stream that was not processed, so the client may retry it."""
+        handler_nursery.start_soon(
+            self._reset_stream,
+            stream_id,
+            ErrorCodes.REFUSED_STREAM,
+        )
+
+    def _start_pushed_stream(
+        self,
+        handler_nursery: trio.Nursery,
+        stream_id: int,
+        headers: list[Header],
+        app: AppHandler | None,
+    ) -> None:
+        """Handle a promised request as if the client had sent it."""
+        stream = self._open_stream(
+            stream_id, headers, app or self._app, handler_nursery
+        )
+        stream.mark_complete()
+
+    def _open_stream(
+        self,
+        stream_id: int,
+        headers: list[Header],
+        app: AppHandler,
+        handler_nursery: trio.Nursery,
+        *,
+        admission: AdmissionTicket | None = None,
+    ) -> HTTP2StreamHandler:
+        received_at = trio.current_time()
+
+        stream_tracer = None
+        if self._tracer:
+            stream_tracer = self._tracer.start_stream(stream_id, headers, received_at)
+
+        # Only requests from the client can be answered with pushes.
+        start_push = None
+        if stream_id % 2:
+            start_push = functools.partial(self._start_pushed_stream, handler_nursery)
+
+        stream = HTTP2StreamHandler(
+            self._state,
+            self._scheduler,
+            self._acknowledger,
+            self._metrics,
+            stream_id,
+            headers,
+            auto_ack=self._auto_ack,
+            tracer=stream_tracer,
+            middleware=self._middleware,
+            start_push=start_push,
+            admission=admission,
+        )
+
+        # We expect h2 to raise an error if the stream already exists.
+        self._streams[stream_id] = stream
+        self._acknowledger.track(stream_id)
+        self._notify_streams_changed()
+        self._metrics.streams_opened += 1
+        handler_nursery.start_soon(
+            self._run_stream_handler,
+            stream,
+            app,
+            received_at,
+            stream_tracer,
+        )
+        return stream
+
+    def _process_unknown_frame(self, frame: hyperframe.frame.Frame) -> None:
+        if not isinstance(frame, hyperframe.frame.ExtensionFrame):
+            return
+
+        if frame.type == PRIORITY_UPDATE_FRAME_TYPE:
+            update = parse_priority_update(frame.body)
+
+            # Updates for streams that are not open are ignored.
+            if update and update[0] in self._streams:
+                self._scheduler.set_priority(*update)
+
+    async def _run_stream_handler(
+        self,
+        stream: HTTP2StreamHandler,
+        app: AppHandler,
+        started_at: float,
+        tracer: StreamTracer | None,
+    ) -> None:
         stream_id_ctx.set(stream.id)
 
         try:
-            await stream.run(self._app)
+            await stream.run(app)
+
+        except AdmissionRefusedError:
+            await self._reset_stream(stream.id, ErrorCodes.REFUSED_STREAM)
+
+        except RequestBodyTooLargeError as e:
+            _logger.warning("Resetting stream: %s", e)
+            await self._reset_stream(stream.id, ErrorCodes.CANCEL)
 
         except Exception as e:
             _logger.exception("Stream ended due to exception.", exc_info=e)
+            await self._reset_stream(stream.id, ErrorCodes.INTERNAL_ERROR)
+
+        finally:
+            del self._streams[stream.id]
+            self._notify_streams_changed()
+            self._scheduler.remove(stream.id)
+            self._acknowledger.forget(stream.id)
+
+            ended_at = trio.current_time()
+            self._metrics.streams_closed += 1
+            self._metrics.stream_duration.observe(ended_at - started_at)
+            if tracer:
+                tracer.stream_ended(ended_at)
+
+            self._close_if_drained()
+
+    def _notify_streams_changed(self) -> None:
+        self._streams_changed.set()
+        self._streams_changed = trio.Event()
+
+    async def _keep_alive(self) -> None:
+        """Close the connection when it is idle or the client is unresponsive."""
+        # The client just completed the connection setup.
+        self._last_received = trio.current_time()
+
+        with self._keepalive_scope:
+            async with trio.open_nursery() as nursery:
+                if self._idle_timeout is not None:
+                    nursery.start_soon(self._drain_when_idle)
+                if self._keepalive_interval is not None:
+                    nursery.start_soon(self._ping_until_unresponsive)
+
+    async def _drain_when_idle(self) -> None:
+        assert self._idle_timeout is not None
+
+        while True:
+            changed = self._streams_changed
+            if self._streams:
+                await changed.wait()
+                continue
+
+            with trio.move_on_after(self._idle_timeout) as idle_scope:
+                await changed.wait()
+
+            if idle_scope.cancelled_caught:
+                _logger.info("Closing idle connection.")
+                self.drain()
+                return
+
+    async def _ping_until_unresponsive(self) -> None:
+        assert self._keepalive_interval is not None
 
-            # NOTE: If the stream ended because the connection is dead, this will
-            #   also error out, cancelling all stream handlers in the nursery.
+        while True:
+            # Anything received from the client shows that it is alive.
+            await trio.sleep_until(self._last_received + self._keepalive_interval)
+            if trio.current_time() < self._last_received + self._keepalive_interval:
+                continue
+
+            self._keepalive_acked = trio.Event()
             async with self._state.use() as state:
-                state.reset_stream(
-                    stream.id,
-                    error_code=ErrorCodes.INTERNAL_ERROR,
+                state.ping(_KEEPALIVE_PING)
+
+            with trio.move_on_after(self._keepalive_timeout) as ping_scope:
+                await self._keepalive_acked.wait()
+
+            if ping_scope.cancelled_caught:
+                _logger.warning("Closing connection: keepalive PING timed out.")
+                self._conn_scope.cancel()
+                return
+
+    async def _send_goaway(self) -> None:
+        async with self._state.use() as state:
+            self._goaway_stream_id = state.highest_inbound_stream_id
+            self._state.send_frame(
+                hyperframe.frame.GoAwayFrame(
+                    last_stream_id=self._goaway_stream_id,
+                    error_code=ErrorCodes.NO_ERROR,
                 )
+            )
 
-        finally:
-            del self._streams[stream.id]
+        _logger.info(
+            "Draining after stream %d with %d active streams.",
+            self._goaway_stream_id,
+            len(self._streams),
+        )
+        self._close_if_drained()
+
+    def _close_if_drained(self) -> None:
+        if self._goaway_stream_id is not None and not self._streams:
+            self._read_scope.cancel()
+
+    async def _reset_stream(self, stream_id: int, error_code: ErrorCodes) -> None:
+        # NOTE: If the stream ended because the connection is dead, this will
+        #   also error out, cancelling all stream handlers in the nursery.
+        async with self._state.use() as state:
+            state.reset_stream(stream_id, error_code=error_code)
+
+        self._metrics.count_reset(error_code, sent=True)
+
+
+def _peer_address(
+    conn: trio.abc.Stream,
+) -> tuple[str, int] | tuple[str, int, int, int] | None:
+    """Return the address of the socket under a stream, if there is one."""
+    while isinstance(conn, trio.SSLStream):
+        conn = conn.transport_stream
+
+    if isinstance(conn, trio.SocketStream):
+        return conn.socket.getpeername()  # type: ignore[no-any-return]
+
+    return None
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import contextlib
+
+import h2.connection
+import h2.exceptions
+import trio
+
+from ._state import HTTP2State
+
+DEFAULT_WINDOW_SIZE = 65535
+"""The initial size of HTTP/2 flow control windows."""
+
+
+class ReceiveWindowAcknowledger:
+    """Coalesces acknowledgements of received data into few WINDOW_UPDATEs.
+
+    Acknowledging data only updates counters. Once the acknowledged but not
+    yet advertised bytes for a stream or for the connection reach a fraction
+    of the corresponding window, a single background task takes the state lock
+    and sends WINDOW_UPDATE frames for everything that is due.
+    """
+
+    def __init__(
+        self,
+        state: HTTP2State,
+        *,
+        stream_window: int,
+        connection_window: int = DEFAULT_WINDOW_SIZE,
+        ratio: float,
+    ) -> None:
+        """Initialize the acknowledger.
+
+        Args:
+            state: The connection state.
+            stream_window: The initial receive window of new streams.
+            connection_window: The receive window of the connection.
+            ratio: The fraction of a window, between 0 and 1, that must be
+                acknowledged before sending a WINDOW_UPDATE for it.
+        """
+        if not (0 < ratio <= 1):
+            raise ValueError(f"The ratio must be in (0, 1]; got {ratio}.")
+
+        self._state = state
+        self._ratio = ratio
+
+        self._stream_pending: dict[int, int] = {}
+        self._conn_pending = 0
+
+        self._due_streams: set[int] = set()
+        self._due = trio.Event()
+        self._closed = False
+
+        self._stream_window = stream_window
+        self._conn_window = connection_window
+        self.set_windows(stream_window, connection_window)
+
+    @property
+    def stream_window(self) -> int:
+        """The receive window of new streams."""
+        return self._stream_window
+
+    @property
+    def connection_window(self) -> int:
+        """The receive window of the connection."""
+        return self._conn_window
+
+    def set_windows(self, stream_window: int, connection_window: int) -> None:
+        """Update the window sizes from which thresholds are computed.
+
+        The stream window must separately be advertised to the peer in
+        SETTINGS_INITIAL_WINDOW_SIZE. The connection window can only be changed
+        through WINDOW_UPDATEs, so the difference is added to or withheld from
+        the updates sent for the connection.
+        """
+        self._stream_window = stream_window
+        self._stream_threshold = max(1, int(stream_window * self._ratio))
+        self._conn_threshold = max(1, int(connection_window * self._ratio))
+
+        self._conn_pending += connection_window - self._conn_window
+        self._conn_window = connection_window
+        if self._conn_pending >= self._conn_threshold:
+            self._due.set()
+
+    def acknowledge(self, size: int, stream_id: int | None = None) -> None:
+        """Hand back flow-controlled bytes to the peer.
+
+        Args:
+            size: The flow-controlled length of the processed data.
+            stream_id: The stream on which the data was received, or None
+                to acknowledge it only on the connection window. Streams that
+                are not tracked, for example because they were forgotten
+                before the application acknowledged their data, only count
+                toward the connection.
+        """
+        if self._closed or size <= 0:
+            return
+
+        self._conn_pending += size
+        if self._conn_pending >= self._conn_threshold:
+            self._due.set()
+
+        if stream_id is not None and stream_id in self._stream_pending:
+            pending = self._stream_pending[stream_id] + size
+            self._stream_pending[stream_id] = pending
+
+            if pending >= self._stream_threshold:
+                self._due_streams.add(stream_id)
+                self._due.set()
+
+    def track(self, stream_id: int) -> None:
+        """Start counting acknowledgements for a new stream."""
+        self._stream_pending[stream_id] = 0
+
+    def forget(self, stream_id: int) -> None:
+        """Stop tracking a stream that will not receive more data.
+
+        Data acknowledged for it afterward only counts toward the connection.
+        """
+        self._stream_pending.pop(stream_id, None)
+        self._due_streams.discard(stream_id)
+
+    def close(self) -> None:
+        """Stop sending WINDOW_UPDATEs and make `run` return."""
+        self._closed = True
+        self._due.set()
+
+    async def run(self) -> None:
+        """Send WINDOW_UPDATEs as they become due, until closed."""
+        while True:
+            await self._due.wait()
+            if self._closed:
+                return
+
+            self._due = trio.Event()
+            async with self._state.use() as state:
+                self._send_updates(state)
+
+    def _send_updates(self, state: h2.connection.H2Connection) -> None:
+        if self._conn_pending >= self._conn_threshold:
+            state.increment_flow_control_window(self._conn_pending)
+            self._conn_pending = 0
+
+        for stream_id in self._due_streams:
+            size = self._stream_pending.get(stream_id, 0)
+            if not size:
+                continue
+
+            self._stream_pending[stream_id] = 0
+            if stream_id not in state.streams:
+                continue
+
+            # The stream may have been closed before it was forgotten.
+            with contextlib.suppress(h2.exceptions.StreamClosedError):
+                state.increment_flow_control_window(size, stream_id)
+
+        self._due_streams.clear()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import contextlib
+from collections.abc import Iterable, Iterator
+
+import h2.config
+import h2.connection
+import h2.utilities
+
+from ._request import Header
+
+# The flags h2 uses to validate the headers of a response.
+_RESPONSE_FLAGS = h2.utilities.HeaderValidationFlags(
+    is_client=False,
+    is_trailer=False,
+    is_response_header=True,
+    is_push_promise=False,
+)
+
+# Encoded status pseudo-headers for the status codes defined by HTTP.
+_STATUS_HEADERS = {
+    status: (b":status", str(status).encode()) for status in range(100, 600)
+}
+
+
+def status_header(status: int) -> Header:
+    """Return the `:status` pseudo-header for a status code."""
+    header = _STATUS_HEADERS.get(status)
+    if header is None:
+        # Other statuses are sent as they are, as h2 itself would.
+        header = (b":status", str(status).encode())
+    return header
+
+
+class PreparedHeaders:
+    """A set of response headers that is validated once and reused.
+
+    Building and checking a header list is a noticeable part of the cost of
+    a small response. A `PreparedHeaders` does that work when it is created,
+    so that responses sending it skip h2's normalization and validation.
+    Create one for each header set that many responses share, for example at
+    import time, and pass it to `HTTP2Response.headers`.
+
+    The headers are still HPACK-encoded for every response, since the
+    encoding depends on the state of the connection's compression table.
+    Repeated headers encode to short references into that table.
+    """
+
+    __slots__ = ("_by_status", "_headers")
+
+    def __init__(self, headers: Iterable[tuple[bytes, bytes]]) -> None:
+        """Validate and normalize headers.
+
+        Args:
+            headers: Response headers, excluding the `:status` pseudo-header.
+
+        Raises:
+            ValueError: If the headers include a pseudo-header.
+            h2.exceptions.ProtocolError: If the headers are not valid in an
+                HTTP/2 response.
+        """
+        headers = list(headers)
+        for name, _ in headers:
+            if name.startswith(b":"):
+                raise ValueError(f"Prepared headers cannot contain {name!r}.")
+
+        # Validate as a complete response so that pseudo-header checks pass.
+        validated = list(
+            h2.utilities.validate_outbound_headers(
+                h2.utilities.normalize_outbound_headers(
+                    h2.utilities.utf8_encode_headers([_STATUS_HEADERS[200], *headers]),
+                    _RESPONSE_FLAGS,
+                ),
+                _RESPONSE_FLAGS,
+            )
+        )
+
+        self._headers: tuple[Header, ...] = tuple(validated[1:])
+        self._by_status: dict[int, list[Header]] = {}
+
+    @property
+    def headers(self) -> tuple[Header, ...]:
+        """The normalized headers.
+
+        Sensitive headers, like `authorization`, are `hpack.HeaderTuple`
+        instances that are never added to the compression table.
+        """
+        return self._headers
+
+    def with_status(self, status: int) -> list[Header]:
+        """Return the complete header block for a status, cached."""
+        try:
+            return self._by_status[status]
+        except KeyError:
+            block = [status_header(status), *self._headers]
+            self._by_status[status] = block
+            return block
+
+
+@contextlib.contextmanager
+def trusted_headers(state: h2.connection.H2Connection) -> Iterator[None]:
+    """Skip h2's outbound header normalization and validation.
+
+    Only headers that were already checked, like `PreparedHeaders`, may be
+    sent in this context.
+    """
+    config: h2.config.H2Configuration = state.config
+    normalize = config.normalize_outbound_headers
+    validate = config.validate_outbound_headers
+
+    config.normalize_outbound_headers = False
+    config.validate_outbound_headers = False
+    try:
+        yield
+    finally:
+        config.normalize_outbound_headers = normalize
+        config.validate_outbound_headers = validate
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import bisect
+import dataclasses
+from collections.abc import Iterable, Iterator
+from typing import Callable
+
+from h2.errors import ErrorCodes
+
+DEFAULT_DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+"""Upper bounds in seconds of the stream duration histogram buckets."""
+
+
+class Histogram:
+    """A histogram with fixed bucket upper bounds."""
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last is +Inf.
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def merge(self, other: Histogram) -> None:
+        """Add another histogram's observations to this one."""
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+
+
+class ConnectionMetrics:
+    """Counters for a single connection.
+
+    These are only updated from the connection's own tasks, so updating them
+    is a plain attribute increment. They are aggregated when scraped.
+    """
+
+    __slots__ = (
+        "admission_wait",
+        "bytes_received",
+        "bytes_sent",
+        "flow_control_blocked",
+        "queue_depth",
+        "resets_received",
+        "resets_sent",
+        "stream_duration",
+        "streams_closed",
+        "streams_opened",
+    )
+
+    def __init__(self, duration_buckets: tuple[float, ...]) -> None:
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.streams_opened = 0
+        self.streams_closed = 0
+        self.resets_sent: dict[int, int] = {}
+        self.resets_received: dict[int, int] = {}
+        self.stream_duration = Histogram(duration_buckets)
+        self.flow_control_blocked = 0.0
+        self.admission_wait = Histogram(duration_buckets)
+
+        self.queue_depth: Callable[[], int] = lambda: 0
+        """Returns the number of chunks waiting to be written to the socket."""
+
+    def count_reset(self, error_code: int, *, sent: bool) -> None:
+        """Count a stream reset sent or received with an error code."""
+        resets = self.resets_sent if sent else self.resets_received
+        resets[error_code] = resets.get(error_code, 0) + 1
+
+    def merge(self, other: ConnectionMetrics) -> None:
+        """Add another connection's counters to this one."""
+        self.bytes_received += other.bytes_received
+        self.bytes_sent += other.bytes_sent
+        self.streams_opened += other.streams_opened
+        self.streams_closed += other.streams_closed
+        for code, count in other.resets_sent.items():
+            self.resets_sent[code] = self.resets_sent.get(code, 0) + count
+        for code, count in other.resets_received.items():
+            self.resets_received[code] = self.resets_received.get(code, 0) + count
+        self.stream_duration.merge(other.stream_duration)
+        self.flow_control_blocked += other.flow_control_blocked
+        self.admission_wait.merge(other.admission_wait)
+
+
+@dataclasses.dataclass(frozen=True)
+class HistogramSnapshot:
+    """The observations of a histogram at some point in time."""
+
+    buckets: tuple[float, ...]
+    """Bucket upper bounds."""
+
+    counts: tuple[int, ...]
+    """The number of observations in each bucket, plus one for +Inf.
+
+    These are not cumulative.
+    """
+
+    sum: float
+    """The sum of all observations."""
+
+    @property
+    def count(self) -> int:
+        """The number of observations."""
+        return sum(self.counts)
+
+
+@dataclasses.dataclass(frozen=True)
+class Metrics:
+    """A snapshot of a server's metrics."""
+
+    connections_active: int
+    connections_total: int
+    streams_active: int
+    streams_total: int
+    bytes_received: int
+    bytes_sent: int
+
+    resets_sent: dict[str, int]
+    """Streams reset by the server, by error code name."""
+
+    resets_received: dict[str, int]
+    """Streams reset by clients, by error code name."""
+
+    stream_duration: HistogramSnapshot
+    """Seconds from receiving request headers to the handler finishing."""
+
+    flow_control_blocked_seconds: float
+    """Total seconds response bodies spent waiting for flow control windows."""
+
+    outgoing_queue_depth: int
+    """Chunks of outgoing data waiting to be written, over all connections."""
+
+    admission_wait: HistogramSnapshot
+    """Seconds requests waited in an `AdmissionController`'s queue to be
+    admitted or refused. Requests admitted at once are not counted."""
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        return "".join(_render_prometheus(self))
+
+
+class MetricsRegistry:
+    """Collects metrics from a server's connections.
+
+    Pass one to `serve` to get a reference to it before the server starts,
+    for example to mount a `PrometheusHandler`.
+    """
+
+    def __init__(
+        self,
+        *,
+        duration_buckets: tuple[float, ...] = DEFAULT_DURATION_BUCKETS,
+    ) -> None:
+        """Create an empty registry.
+
+        Args:
+            duration_buckets: Sorted upper bounds of the stream duration
+                histogram buckets, in seconds.
+        """
+        self._buckets = tuple(duration_buckets)
+        self._live: set[ConnectionMetrics] = set()
+        self._closed = ConnectionMetrics(self._buckets)
+        self._connections_total = 0
+
+    def open_connection(self) -> ConnectionMetrics:
+        """Start collecting metrics for a new connection."""
+        metrics = ConnectionMetrics(self._buckets)
+        self._live.add(metrics)
+        self._connections_total += 1
+        return metrics
+
+    def close_connection(self, metrics: ConnectionMetrics) -> None:
+        """Fold a closed connection's metrics into the totals."""
+        self._live.discard(metrics)
+        self._closed.merge(metrics)
+
+    def snapshot(self) -> Metrics:
+        """Aggregate the metrics of all connections."""
+        total = ConnectionMetrics(self._buckets)
+        total.merge(self._closed)
+        queue_depth = 0
+        for metrics in self._live:
+            total.merge(metrics)
+            queue_depth += metrics.queue_depth()
+
+        return Metrics(
+            connections_active=len(self._live),
+            connections_total=self._connections_total,
+            streams_active=total.streams_opened - total.streams_closed,
+            streams_total=total.streams_opened,
+            bytes_received=total.bytes_received,
+            bytes_sent=total.bytes_sent,
+            resets_sent=_name_error_codes(total.resets_sent),
+            resets_received=_name_error_codes(total.resets_received),
+            stream_duration=_snapshot(self._buckets, total.stream_duration),
+            flow_control_blocked_seconds=total.flow_control_blocked,
+            outgoing_queue_depth=queue_depth,
+            admission_wait=_snapshot(self._buckets, total.admission_wait),
+        )
+
+
+def _snapshot(buckets: tuple[float, ...], histogram: Histogram) -> HistogramSnapshot:
+    return HistogramSnapshot(
+        buckets=buckets,
+        counts=tuple(histogram.counts),
+        sum=histogram.sum,
+    )
+
+
+def _name_error_codes(counts: dict[int, int]) -> dict[str, int]:
+    names: dict[str, int] = {}
+    for code, count in counts.items():
+        try:
+            name = ErrorCodes(code).name
+        except ValueError:
+            name = str(code)
+        names[name] = count
+    return names
+
+
+def _render_prometheus(metrics: Metrics) -> Iterator[str]:
+    def metric(
+        name: str,
+        kind: str,
+        help: str,
+        samples: Iterable[tuple[str, float]],
+    ) -> Iterator[str]:
+        yield f"# HELP h2serve_{name} {help}\n"
+        yield f"# TYPE h2serve_{name} {kind}\n"
+        for suffix, value in samples:
+            yield f"h2serve_{name}{suffix} {value}\n"
+
+    yield from metric(
+        "connections_active",
+        "gauge",
+        "Open connections.",
+        [("", metrics.connections_active)],
+    )
+    yield from metric(
+        "connections_total",
+        "counter",
+        "Accepted connections.",
+        [("", metrics.connections_total)],
+    )
+    yield from metric(
+        "streams_active",
+        "gauge",
+        "Streams whose handler is running.",
+        [("", metrics.streams_active)],
+    )
+    yield from metric(
+        "streams_total",
+        "counter",
+        "Streams opened by clients.",
+        [("", metrics.streams_total)],
+    )
+    yield from metric(
+        "received_bytes_total",
+        "counter",
+        "Bytes read from connections.",
+        [("", metrics.bytes_received)],
+    )
+    yield from metric(
+        "sent_bytes_total",
+        "counter",
+        "Bytes written to connections.",
+        [("", metrics.bytes_sent)],
+    )
+    yield from metric(
+        "stream_resets_total",
+        "counter",
+        "Stream resets by direction and error code.",
+        [
+            *(
+                (f'{{direction="sent",error_code="{code}"}}', count)
+                for code, count in sorted(metrics.resets_sent.items())
+            ),
+            *(
+                (f'{{direction="received",error_code="{code}"}}', count)
+                for code, count in sorted(metrics.resets_received.items())
+            ),
+        ],
+    )
+
+    yield from _histogram(
+        metric,
+        "stream_duration_seconds",
+        "Time from receiving request headers to the handler finishing.",
+        metrics.stream_duration,
+    )
+
+    yield from metric(
+        "flow_control_blocked_seconds_total",
+        "counter",
+        "Time response bodies spent waiting for flow control windows.",
+        [("", metrics.flow_control_blocked_seconds)],
+    )
+    yield from metric(
+        "outgoing_queue_depth",
+        "gauge",
+        "Chunks of outgoing data waiting to be written.",
+        [("", metrics.outgoing_queue_depth)],
+    )
+    yield from _histogram(
+        metric,
+        "admission_wait_seconds",
+        "Time queued requests waited to be admitted or refused.",
+        metrics.admission_wait,
+    )
+
+
+def _histogram(
+    metric: Callable[[str, str, str, Iterable[tuple[str, float]]], Iterator[str]],
+    name: str,
+    help: str,
+    histogram: HistogramSnapshot,
+) -> Iterator[str]:
+    cumulative = 0
+    buckets: list[tuple[str, float]] = []
+    for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+        cumulative += count
+        buckets.append((f'_bucket{{le="{bound}"}}', cumulative))
+    yield from metric(
+        name,
+        "histogram",
+        help,
+        [*buckets, ("_sum", histogram.sum), ("_count", cumulative)],
+    )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from ._headers import PreparedHeaders
+from ._request import Header, HTTP2Request
+
+
+class Middleware:
+    """Hooks that run around every request, configured with `serve`.
+
+    Subclasses override any of the hooks; the others cost nothing. Hooks are
+    plain methods called by the server at fixed points of a request, so they
+    don't wrap the application handler or its response, and must not block.
+
+    `on_request` hooks run in the order the middleware was given to `serve`,
+    and the response hooks in reverse order, so that the first middleware
+    sees the request first and the response last. To keep state for a
+    request across hooks, key it by the request object.
+    """
+
+    def on_request(self, req: HTTP2Request) -> int | None:
+        """Called before the application handler.
+
+        Args:
+            req: The request. Its body must not be read here.
+
+        Returns:
+            None to continue, or a status to respond with immediately instead
+            of running the rest of the middleware's `on_request` hooks and
+            the handler. The response has no body; `on_response_start` hooks
+            can add headers to it.
+        """
+        return None
+
+    def on_response_start(
+        self,
+        req: HTTP2Request,
+        status: int,
+        headers: list[Header],
+    ) -> None:
+        """Called when the response headers are about to be sent.
+
+        Args:
+            req: The request.
+            status: The response status.
+            headers: The response headers, which may be modified in place.
+        """
+
+    def on_response_end(self, req: HTTP2Request, status: int | None) -> None:
+        """Called when the handler has returned or raised an exception.
+
+        Args:
+            req: The request.
+            status: The response status, or None if no headers were sent.
+        """
+
+
+def _overrides(middleware: Middleware, hook: str) -> bool:
+    return getattr(type(middleware), hook) is not getattr(Middleware, hook)
+
+
+class MiddlewareChain:
+    """The hooks of a sequence of middleware, collected once.
+
+    Only hooks that are overridden are kept, so middleware that only
+    observes requests adds nothing to the response path, and vice versa.
+    """
+
+    def __init__(self, middleware: Iterable[Middleware]) -> None:
+        middleware = list(middleware)
+        self.request_hooks = tuple(
+            m.on_request for m in middleware if _overrides(m, "on_request")
+        )
+        self.response_start_hooks = tuple(
+            m.on_response_start
+            for m in reversed(middleware)
+            if _overrides(m, "on_response_start")
+        )
+        self.response_end_hooks = tuple(
+            m.on_response_end
+            for m in reversed(middleware)
+            if _overrides(m, "on_response_end")
+        )
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.request_hooks or self.response_start_hooks or self.response_end_hooks
+        )
+
+    def bind(self, req: HTTP2Request) -> RequestHooks:
+        """Return the hooks for a request."""
+        return RequestHooks(self, req)
+
+
+class RequestHooks:
+    """The middleware hooks of a single request."""
+
+    __slots__ = ("_chain", "_req", "_status")
+
+    def __init__(self, chain: MiddlewareChain, req: HTTP2Request) -> None:
+        self._chain = chain
+        self._req = req
+        self._status: int | None = None
+
+    def request_started(self) -> int | None:
+        """Run the `on_request` hooks, returning a status to respond with."""
+        for hook in self._chain.request_hooks:
+            status = hook(self._req)
+            if status is not None:
+                return status
+
+        return None
+
+    def response_started(
+        self,
+        status: int,
+        headers: Iterable[Header],
+        prepared: PreparedHeaders | None,
+    ) -> tuple[Iterable[Header], PreparedHeaders | None]:
+        """Run the `on_response_start` hooks, returning the headers to send.
+
+        Prepared headers are merged into the list the hooks receive, unless
+        there are no such hooks.
+        """
+        self._status = status
+
+        hooks = self._chain.response_start_hooks
+        if not hooks:
+            return headers, prepared
+
+        header_list = [*(prepared.headers if prepared else ()), *headers]
+        for hook in hooks:
+            hook(self._req, status, header_list)
+
+        return header_list, None
+
+    def response_ended(self) -> None:
+        """Run the `on_response_end` hooks."""
+        for hook in self._chain.response_end_hooks:
+            hook(self._req, self._status)
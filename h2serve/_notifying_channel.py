@@ -60,6 +60,11 @@ class NotifyingReceiveChannel(trio.abc.ReceiveChannel[bytes]):
     ) -> None:
         self._chan = chan
 
+    @property
+    def queued(self) -> int:
+        """The number of items waiting to be received."""
+        return self._chan.statistics().current_buffer_used
+
     @override
     async def receive(self) -> bytes:
         data, event = await self._chan.receive()
@@ -69,6 +74,46 @@ class NotifyingReceiveChannel(trio.abc.ReceiveChannel[bytes]):
 
         return data
 
+    async def receive_batch(self, max_bytes: int) -> tuple[bytes, list[trio.Event]]:
+        """Receive all data that is already queued, up to a size limit.
+
+        This waits for at least one item, then takes any other buffered items
+        until `max_bytes` is reached. Unlike `receive`, this does not signal
+        the items' events; the caller must set them after it has flushed the
+        data.
+
+        Args:
+            max_bytes: The size after which to stop taking more items. The result
+                may exceed this by at most one item.
+
+        Returns:
+            The concatenated data and the events of all received items.
+
+        Raises:
+            trio.EndOfChannel: If the channel is closed and drained.
+        """
+        data, event = await self._chan.receive()
+
+        chunks = [data]
+        events = [event] if event else []
+        size = len(data)
+
+        while size < max_bytes:
+            try:
+                data, event = self._chan.receive_nowait()
+            except (trio.WouldBlock, trio.EndOfChannel):
+                break
+
+            chunks.append(data)
+            if event:
+                events.append(event)
+            size += len(data)
+
+        if len(chunks) == 1:
+            return chunks[0], events
+        else:
+            return b"".join(chunks), events
+
     @override
     async def aclose(self) -> None:
         await self._chan.aclose()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import itertools
+from collections.abc import AsyncIterator
+
+import trio
+
+PRIORITY_UPDATE_FRAME_TYPE = 0x10
+"""The frame type of RFC 9218 PRIORITY_UPDATE frames for HTTP/2."""
+
+
+@dataclasses.dataclass(frozen=True)
+class Priority:
+    """Extensible priority parameters of a response, as defined in RFC 9218.
+
+    Attributes:
+        urgency: From 0 (most urgent) to 7 (least urgent).
+        incremental: Whether the client can use partial responses, in which case
+            the response may be interleaved with others of the same urgency.
+    """
+
+    urgency: int = 3
+    incremental: bool = False
+
+
+def parse_priority(value: bytes) -> Priority:
+    """Parse a priority field value.
+
+    This is a Structured Fields Dictionary (RFC 8941). Unknown and invalid
+    members are ignored, and missing parameters take their default values.
+
+    Args:
+        value: The value of a `priority` header or PRIORITY_UPDATE frame.
+    """
+    urgency = Priority.urgency
+    incremental = Priority.incremental
+
+    for member in value.split(b","):
+        # Drop any parameters attached to the member.
+        key, _, item = member.split(b";", 1)[0].strip().partition(b"=")
+
+        if key == b"u":
+            if item.isdigit() and 0 <= int(item) <= 7:
+                urgency = int(item)
+
+        elif key == b"i":
+            if item in (b"", b"?1"):
+                incremental = True
+            elif item == b"?0":
+                incremental = False
+
+    return Priority(urgency, incremental)
+
+
+def parse_priority_update(payload: bytes) -> tuple[int, Priority] | None:
+    """Parse the payload of a PRIORITY_UPDATE frame.
+
+    Returns:
+        The prioritized stream ID and its new priority, or None if the payload
+        is malformed.
+    """
+    if len(payload) < 4:
+        return None
+
+    stream_id = int.from_bytes(payload[:4], "big") & 0x7FFFFFFF
+    if stream_id == 0:
+        return None
+
+    return stream_id, parse_priority(payload[4:])
+
+
+class PriorityScheduler:
+    """Orders DATA frames across the streams of a connection.
+
+    Streams take turns sending one frame at a time. When several streams are
+    waiting, the most urgent goes first. Among streams of the same urgency,
+    non-incremental streams are served one at a time in order of stream ID
+    and the rest are interleaved round-robin.
+
+    Streams that sent no priority signal are treated as incremental, so that
+    a large response does not starve others by default.
+    """
+
+    def __init__(self) -> None:
+        self._priorities: dict[int, Priority] = {}
+        # Keyed by arrival round and stream, since several tasks may send on
+        # the same stream.
+        self._waiters: dict[tuple[int, int], trio.Event] = {}
+        self._round = itertools.count()
+        self._busy = False
+
+    def set_priority(self, stream_id: int, priority: Priority) -> None:
+        """Set a stream's priority, replacing any previous value."""
+        self._priorities[stream_id] = priority
+
+    def remove(self, stream_id: int) -> None:
+        """Forget about a stream that has ended."""
+        self._priorities.pop(stream_id, None)
+
+    @contextlib.asynccontextmanager
+    async def turn(self, stream_id: int) -> AsyncIterator[SchedulerTurn]:
+        """Wait until the stream is allowed to send a frame.
+
+        The turn ends when the context manager exits or when `release` is called
+        on the yielded value, whichever comes first. Frames must be queued in
+        the same order as turns, so it is best to release the turn right after
+        generating a frame and before waiting for it to be sent.
+        """
+        await self._acquire(stream_id)
+
+        turn = SchedulerTurn(self)
+        try:
+            yield turn
+        finally:
+            turn.release()
+
+    async def _acquire(self, stream_id: int) -> None:
+        if not self._busy and not self._waiters:
+            await trio.lowlevel.checkpoint_if_cancelled()
+            self._busy = True
+            return
+
+        granted = trio.Event()
+        key = (next(self._round), stream_id)
+        self._waiters[key] = granted
+
+        try:
+            await granted.wait()
+        except BaseException:
+            if granted.is_set():
+                self._release()
+            else:
+                del self._waiters[key]
+            raise
+
+    def _release(self) -> None:
+        if not self._waiters:
+            self._busy = False
+            return
+
+        next_key = min(self._waiters, key=self._sort_key)
+        self._waiters.pop(next_key).set()
+
+    def _sort_key(self, key: tuple[int, int]) -> tuple[int, int, int, int]:
+        round_, stream_id = key
+        priority = self._priorities.get(stream_id)
+
+        if priority is None:
+            return (Priority.urgency, 1, round_, stream_id)
+        elif priority.incremental:
+            return (priority.urgency, 1, round_, stream_id)
+        else:
+            return (priority.urgency, 0, stream_id, round_)
+
+
+class SchedulerTurn:
+    """A stream's turn to send a frame."""
+
+    def __init__(self, scheduler: PriorityScheduler) -> None:
+        self._scheduler = scheduler
+        self._released = False
+
+    def release(self) -> None:
+        """Let the next stream send. Calling this more than once is a no-op."""
+        if not self._released:
+            self._released = True
+            self._scheduler._release()
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from ._metrics import MetricsRegistry
+from ._request import HTTP2Request
+from ._response import HTTP2Response
+
+
+class PrometheusHandler:
+    """An `AppHandler` that serves metrics in the Prometheus text format.
+
+    Route a path such as "/metrics" to it from the application.
+    """
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        """Serve metrics from a registry that is passed to `serve`."""
+        self._registry = registry
+
+    async def __call__(self, req: HTTP2Request, resp: HTTP2Response) -> None:
+        """Respond with the current metrics."""
+        await req.body.aclose()
+        await req.trailers.aclose()
+
+        body = self._registry.snapshot().to_prometheus().encode()
+        await resp.headers(
+            200,
+            [
+                (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        )
+        await resp.body(body, end_stream=True)
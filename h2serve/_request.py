@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import dataclasses
 import math
+from typing import Callable
 
 import trio
 from typing_extensions import override
@@ -18,7 +19,8 @@ class HTTP2Request:
             after all data has been received. Closing it indicates that the rest of
             the body can be discarded. Every received chunk must be acknowledged by
             setting its `ack` event to emit window updates; failing to do so can result
-            in a deadlock if flow control is used.
+            in a deadlock if flow control is used. If the server was started with
+            `auto_ack`, chunks are acknowledged as they are read.
         trailers: A channel of trailers, closed after the entire request is received.
             This must not be read until the body has been fully read or closed.
             Reading from it raises EndOfChannel after the entire request has been
@@ -28,36 +30,183 @@ class HTTP2Request:
     def __init__(
         self,
         headers: list[Header],
-        body: trio.abc.ReceiveChannel[DataChunk],
+        body: DataChunkReceiveChannel,
         trailers: trio.abc.ReceiveChannel[Header],
     ) -> None:
         self.headers = headers
         self.body = body
         self.trailers = trailers
 
+    async def read(self, *, max_bytes: int) -> bytearray:
+        """Read and acknowledge the entire request body.
+
+        If the request has a content-length header, the result is allocated
+        once up front. Otherwise it grows as chunks arrive.
+
+        This closes `body`, after which `trailers` may be read.
+
+        Args:
+            max_bytes: The largest body to accept.
+
+        Returns:
+            The request body.
+
+        Raises:
+            RequestBodyTooLargeError: If the body is longer than `max_bytes`.
+                This is raised before reading anything if the content-length
+                header is too large. Unless the application handles it,
+                the stream is reset.
+        """
+        content_length = self._content_length()
+
+        if content_length is None:
+            buffer = bytearray()
+            async with self.body:
+                async for chunk in self.body:
+                    if len(buffer) + len(chunk.data) > max_bytes:
+                        chunk.ack.set()
+                        raise RequestBodyTooLargeError(max_bytes)
+
+                    buffer += chunk.data
+                    chunk.ack.set()
+            return buffer
+
+        if content_length > max_bytes:
+            await self.body.aclose()
+            raise RequestBodyTooLargeError(max_bytes)
+
+        buffer = bytearray(content_length)
+        n = await self.readinto(buffer)
+        del buffer[n:]
+        return buffer
+
+    async def readinto(self, buffer: bytearray | memoryview) -> int:
+        """Read and acknowledge the entire request body into a buffer.
+
+        This closes `body`, after which `trailers` may be read.
+
+        Args:
+            buffer: A writable buffer that must fit the entire body.
+
+        Returns:
+            The length of the body.
+
+        Raises:
+            RequestBodyTooLargeError: If the body does not fit in the buffer.
+                This is raised before reading anything if the content-length
+                header is too large. Unless the application handles it,
+                the stream is reset.
+        """
+        view = memoryview(buffer)
+        content_length = self._content_length()
+
+        async with self.body:
+            if content_length is not None and content_length > len(view):
+                raise RequestBodyTooLargeError(len(view))
+
+            n = 0
+            async for chunk in self.body:
+                end = n + len(chunk.data)
+                if end > len(view):
+                    chunk.ack.set()
+                    raise RequestBodyTooLargeError(len(view))
+
+                view[n:end] = chunk.data
+                chunk.ack.set()
+                n = end
+
+        return n
+
+    def _content_length(self) -> int | None:
+        for name, value in self.headers:
+            if name == b"content-length":
+                return int(value)
+
+        return None
+
 
 Header = tuple[bytes, bytes]
 
 
+class RequestBodyTooLargeError(Exception):
+    """The request body is larger than the application accepts."""
+
+    def __init__(self, max_bytes: int) -> None:
+        super().__init__(f"The request body exceeds {max_bytes} bytes.")
+        self.max_bytes = max_bytes
+
+
+class DataChunkAck:
+    """Acknowledges a chunk of request data for flow control.
+
+    This has the `set`, `is_set` and `wait` methods of `trio.Event`, but
+    acknowledging data only updates a counter. Window updates are batched and
+    sent once enough data has been acknowledged.
+    """
+
+    __slots__ = ("_callback", "_event", "_is_set")
+
+    def __init__(self, callback: Callable[[], None]) -> None:
+        self._callback = callback
+        self._is_set = False
+
+        # Created only if something waits, which is rare.
+        self._event: trio.Event | None = None
+
+    def set(self) -> None:
+        """Acknowledge the chunk. Calling this again is a no-op."""
+        if not self._is_set:
+            self._is_set = True
+            self._callback()
+            if self._event:
+                self._event.set()
+
+    def is_set(self) -> bool:
+        """Whether the chunk has been acknowledged."""
+        return self._is_set
+
+    async def wait(self) -> None:
+        """Wait until the chunk is acknowledged."""
+        if self._is_set:
+            await trio.lowlevel.checkpoint()
+            return
+
+        if not self._event:
+            self._event = trio.Event()
+        await self._event.wait()
+
+
 @dataclasses.dataclass(frozen=True)
 class DataChunk:
     data: bytes
-    ack: trio.Event
+    ack: DataChunkAck
 
 
-def unbuffered_data_chunk_channel() -> tuple[
+def unbuffered_data_chunk_channel(
+    *,
+    auto_ack: bool = False,
+) -> tuple[
     trio.MemorySendChannel[DataChunk],
     DataChunkReceiveChannel,
 ]:
     send, recv = trio.open_memory_channel[DataChunk](math.inf)
-    return send, DataChunkReceiveChannel(recv)
+    return send, DataChunkReceiveChannel(recv, auto_ack=auto_ack)
 
 
 class DataChunkReceiveChannel(trio.abc.ReceiveChannel[DataChunk]):
-    """Wraps a receive channel to ack all buffered data chunks on close."""
+    """Wraps a receive channel to ack all buffered data chunks on close.
 
-    def __init__(self, chan: trio.MemoryReceiveChannel[DataChunk]) -> None:
+    If `auto_ack` is set, chunks are also acknowledged as they are received.
+    """
+
+    def __init__(
+        self,
+        chan: trio.MemoryReceiveChannel[DataChunk],
+        *,
+        auto_ack: bool = False,
+    ) -> None:
         self._chan = chan
+        self._auto_ack = auto_ack
 
     def close(self) -> None:
         self._ack_all()
@@ -70,7 +219,26 @@ class DataChunkReceiveChannel(trio.abc.ReceiveChannel[DataChunk]):
 
     @override
     async def receive(self) -> DataChunk:
-        return await self._chan.receive()
+        chunk = await self._chan.receive()
+
+        if self._auto_ack:
+            chunk.ack.set()
+
+        return chunk
+
+    def receive_nowait(self) -> DataChunk:
+        """Receive a chunk that has already arrived.
+
+        Raises:
+            trio.WouldBlock: If no chunk is available.
+            trio.EndOfChannel: If the body has ended.
+        """
+        chunk = self._chan.receive_nowait()
+
+        if self._auto_ack:
+            chunk.ack.set()
+
+        return chunk
 
     def _ack_all(self) -> None:
         """Acknowledge all buffered chunks."""
@@ -1,16 +1,55 @@
 from __future__ import annotations
 
+import contextlib
+import io
+import mmap
+import os
 from collections.abc import Iterable
+from typing import TYPE_CHECKING, Callable
 
+import h2.connection
+import trio
+
+from ._headers import PreparedHeaders, status_header, trusted_headers
+from ._metrics import ConnectionMetrics
+from ._middleware import RequestHooks
+from ._priority import PriorityScheduler
+from ._request import Header
 from ._state import HTTP2State
+from ._tracing import StreamTracer
+
+if TYPE_CHECKING:
+    from ._app_handler import AppHandler
+
+# Files that can't be memory-mapped are read in pieces the size of the default
+# flow control window.
+_FILE_READ_SIZE = 65535
 
 
 class HTTP2Response:
     """An HTTP/2 response writer."""
 
-    def __init__(self, stream_id: int, state: HTTP2State) -> None:
+    def __init__(
+        self,
+        stream_id: int,
+        state: HTTP2State,
+        scheduler: PriorityScheduler,
+        metrics: ConnectionMetrics,
+        tracer: StreamTracer | None = None,
+        hooks: RequestHooks | None = None,
+        request_headers: list[Header] | None = None,
+        start_push: Callable[[int, list[Header], AppHandler | None], None]
+        | None = None,
+    ) -> None:
         self._id = stream_id
         self._state = state
+        self._scheduler = scheduler
+        self._metrics = metrics
+        self._tracer = tracer
+        self._hooks = hooks
+        self._request_headers = request_headers or []
+        self._start_push = start_push
+        self._data_written = False
 
         self._ended = False
 
@@ -42,16 +81,67 @@ class HTTP2Response:
             state.send_headers(
                 self._id,
                 [
-                    (":status", str(status_1xx)),
+                    status_header(status_1xx),
                     *headers,
                 ],
             )
 
+    async def push(
+        self,
+        path: str | bytes,
+        headers: Iterable[tuple[bytes, bytes]] = (),
+        *,
+        handler: AppHandler | None = None,
+    ) -> bool:
+        """Push the response to a GET request the client is about to make.
+
+        This promises the request to the client with a PUSH_PROMISE frame on
+        this stream, then handles it on a new stream as if the client had
+        sent it, with `handler` or else the server's application handler.
+        The promised request has the :scheme and :authority of this request,
+        the given path and headers, and no body. If the client resets the
+        promised stream, its handler is cancelled.
+
+        Call this before sending the parts of this response that refer to the
+        pushed resource, so that the client does not request it itself, and
+        before ending the response.
+
+        Args:
+            path: The path of the promised request.
+            headers: Other headers of the promised request.
+            handler: The handler for the promised request.
+
+        Returns:
+            Whether the request was promised. Nothing is pushed if the client
+            disabled push, if as many pushed streams as the client allows are
+            open, or if this response is itself pushed.
+        """
+        if not self._start_push:
+            return False
+
+        promised_headers: list[Header] = [
+            (b":method", b"GET"),
+            *(h for h in self._request_headers if h[0] in (b":scheme", b":authority")),
+            (b":path", path.encode() if isinstance(path, str) else path),
+            *headers,
+        ]
+
+        async with self._state.use() as state:
+            if not _can_push(state):
+                return False
+
+            promised_id = state.get_next_available_stream_id()
+            state.push_stream(self._id, promised_id, promised_headers)
+
+        self._start_push(promised_id, promised_headers, handler)
+        return True
+
     async def headers(
         self,
         status: int,
-        headers: Iterable[tuple[bytes, bytes]],
+        headers: Iterable[tuple[bytes, bytes]] = (),
         *,
+        prepared: PreparedHeaders | None = None,
         end_stream: bool = False,
     ) -> None:
         """Send response headers.
@@ -61,24 +151,42 @@ class HTTP2Response:
         Args:
             status: The HTTP status code to send.
             headers: Other headers to include.
+            prepared: Headers to send before `headers`. If there are no other
+                headers, this skips building and validating a header list.
             end_stream: If true, indicates that there is no response body or trailers.
         """
+        if self._hooks:
+            headers, prepared = self._hooks.response_started(status, headers, prepared)
+
         async with self._state.use(block_on_send=True) as state:
-            state.send_headers(
-                self._id,
-                [
-                    (":status", str(status)),
-                    *headers,
-                ],
-                end_stream=end_stream,
-            )
+            if prepared and not headers:
+                with trusted_headers(state):
+                    state.send_headers(
+                        self._id,
+                        prepared.with_status(status),
+                        end_stream=end_stream,
+                    )
+
+            else:
+                state.send_headers(
+                    self._id,
+                    [
+                        status_header(status),
+                        *(prepared.headers if prepared else ()),
+                        *headers,
+                    ],
+                    end_stream=end_stream,
+                )
+
+        if self._tracer:
+            self._tracer.headers_sent(trio.current_time())
 
         if end_stream:
             self._ended = True
 
     async def body(
         self,
-        data: bytes,
+        data: bytes | bytearray | memoryview,
         *,
         end_stream: bool = False,
     ) -> None:
@@ -91,32 +199,170 @@ class HTTP2Response:
         settings. The data may be broken up across more than one DATA frame
         depending on the client's flow control window.
 
+        When several responses are sending data at once, frames are interleaved
+        according to their RFC 9218 priorities.
+
         Args:
             data: The raw data to send.
             end_stream: If true, there is no more response body and no trailers.
         """
         # Avoid reallocating when slicing.
-        data = memoryview(data)
+        view = memoryview(data)
 
-        if not data and end_stream:
+        if not view and end_stream:
             async with self._state.use() as state:
                 state.send_data(self._id, b"", end_stream=True)
 
-        while len(data) > 0:
-            async with self._state.use(block_on_send=True) as state:
-                while (limit := state.local_flow_control_window(self._id)) <= 0:
-                    await self._state.wait_for_change()
+        while len(view) > 0:
+            turn_cm = self._scheduler.turn(self._id)
+            use_cm = self._state.use(block_on_send=True)
+
+            async with turn_cm as turn, use_cm as state:
+                limit = min(
+                    state.local_flow_control_window(self._id),
+                    state.max_outbound_frame_size,
+                )
+
+                if limit <= 0:
+                    # Let other streams send while this one is blocked.
+                    turn.release()
+
+                    blocked_at = trio.current_time()
+                    await self._state.wait_for_window(self._id)
+                    self._metrics.flow_control_blocked += (
+                        trio.current_time() - blocked_at
+                    )
+                    continue
 
                 state.send_data(
                     self._id,
-                    data[:limit],
-                    end_stream=end_stream and limit >= len(data),
+                    view[:limit],
+                    end_stream=end_stream and limit >= len(view),
                 )
-                data = data[limit:]
+                view = view[limit:]
+
+                # Release the turn before waiting for the data to be sent.
+                turn.release()
+
+            if self._tracer and not self._data_written:
+                self._data_written = True
+                self._tracer.first_data_written(trio.current_time())
 
         if end_stream:
             self._ended = True
 
+    async def send_file(
+        self,
+        file: str | os.PathLike[str] | io.RawIOBase | io.BufferedIOBase,
+        *,
+        offset: int = 0,
+        length: int | None = None,
+        end_stream: bool = False,
+    ) -> None:
+        """Send (part of) a file as the response body.
+
+        Regular files are memory-mapped and sent without copying them into
+        Python buffers. Other files are read in pieces on a worker thread.
+
+        This may be called zero or more times, interleaved with `body`.
+
+        Args:
+            file: A path, or a file opened in binary mode. Paths are opened and
+                closed by this method; open files are not closed, but their
+                position is not preserved.
+            offset: The position in the file at which to start.
+            length: The number of bytes to send, or None to send the rest of
+                the file.
+            end_stream: If true, there is no more response body and no trailers.
+
+        Raises:
+            ValueError: If the file ends before `offset + length`, or if
+                `offset` is not zero for a file that cannot seek, such as a
+                pipe.
+        """
+        if isinstance(file, (str, os.PathLike)):
+            f = await trio.to_thread.run_sync(_open_binary, file)
+            try:
+                await self._send_file(f, offset, length, end_stream)
+            finally:
+                f.close()
+
+        else:
+            await self._send_file(file, offset, length, end_stream)
+
+    async def _send_file(
+        self,
+        f: io.RawIOBase | io.BufferedIOBase,
+        offset: int,
+        length: int | None,
+        end_stream: bool,
+    ) -> None:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Not mappable, e.g. an empty file, a pipe or an in-memory file.
+            # io.UnsupportedOperation is both an OSError and a ValueError.
+            await self._send_file_in_pieces(f, offset, length, end_stream)
+            return
+
+        try:
+            if length is None:
+                length = len(mapped) - offset
+            if offset < 0 or length < 0 or offset + length > len(mapped):
+                raise ValueError(
+                    f"Cannot send {length} bytes at offset {offset}"
+                    f" of a {len(mapped)}-byte file."
+                )
+
+            # madvise rejects an empty range at the end of the map.
+            if length and hasattr(mmap, "MADV_SEQUENTIAL"):
+                start = offset - offset % mmap.PAGESIZE
+                mapped.madvise(mmap.MADV_SEQUENTIAL, start, offset + length - start)
+
+            with memoryview(mapped) as view:
+                await self.body(view[offset : offset + length], end_stream=end_stream)
+
+        finally:
+            # If slices of the map are still referenced, for example by the
+            # traceback of a cancellation, it is closed when they are
+            # garbage collected.
+            with contextlib.suppress(BufferError):
+                mapped.close()
+
+    async def _send_file_in_pieces(
+        self,
+        f: io.RawIOBase | io.BufferedIOBase,
+        offset: int,
+        length: int | None,
+        end_stream: bool,
+    ) -> None:
+        if f.seekable():
+            await trio.to_thread.run_sync(f.seek, offset)
+        elif offset:
+            raise ValueError(f"Cannot send from offset {offset} of an unseekable file.")
+
+        # The buffer can be reused because `body` returns only after h2
+        # has copied the data into a frame.
+        buffer = memoryview(bytearray(_FILE_READ_SIZE))
+        remaining = length
+
+        while remaining is None or remaining > 0:
+            size = len(buffer) if remaining is None else min(remaining, len(buffer))
+            n = await trio.to_thread.run_sync(f.readinto, buffer[:size])
+
+            if not n:
+                if remaining is not None:
+                    raise ValueError(f"The file ended {remaining} bytes early.")
+                break
+
+            if remaining is not None:
+                remaining -= n
+
+            await self.body(buffer[:n], end_stream=end_stream and remaining == 0)
+
+        if end_stream and remaining is None:
+            await self.body(b"", end_stream=True)
+
     async def trailers(self, trailers: Iterable[tuple[bytes, bytes]]) -> None:
         """Send response trailers.
 
@@ -148,3 +394,23 @@ class HTTP2Response:
                 state.end_stream(self._id)
 
             self._ended = True
+
+
+def _can_push(state: h2.connection.H2Connection) -> bool:
+    """Whether the client accepts another pushed stream."""
+    settings = state.remote_settings
+    if not settings.enable_push:
+        return False
+
+    # h2 does not enforce the limit for pushed streams. Reserved streams are
+    # counted too, since their handlers are about to send responses.
+    pushed = sum(
+        1
+        for stream_id, stream in state.streams.items()
+        if stream_id % 2 == 0 and not stream.closed
+    )
+    return pushed < settings.max_concurrent_streams
+
+
+def _open_binary(path: str | os.PathLike[str]) -> io.BufferedReader:
+    return open(path, "rb")  # noqa: SIM115
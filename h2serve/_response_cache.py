@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import io
+import os
+from collections.abc import Hashable, Iterable
+from typing import Callable, cast
+
+import trio
+
+from ._app_handler import AppHandler
+from ._headers import PreparedHeaders
+from ._request import Header, HTTP2Request
+from ._response import HTTP2Response
+
+CacheKey = Callable[[HTTP2Request], "Hashable | None"]
+"""Computes the cache key of a request, or None to not cache it."""
+
+# Statuses whose responses may be cached without explicit freshness
+# information. See RFC 9110, section 15.1.
+_CACHEABLE_STATUSES = frozenset((200, 203, 204, 300, 301, 404, 405, 410, 414, 501))
+
+# Approximate memory used by a cache entry besides its headers and body.
+_ENTRY_OVERHEAD = 256
+
+
+@dataclasses.dataclass
+class _CachedResponse:
+    status: int
+    headers: list[Header]
+    body: bytes
+    trailers: list[Header] | None
+    stored_at: float
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        headers = self.headers + (self.trailers or [])
+        return (
+            _ENTRY_OVERHEAD
+            + len(self.body)
+            + sum(len(name) + len(value) for name, value in headers)
+        )
+
+
+@dataclasses.dataclass
+class _Flight:
+    """A request whose handler is running, which others with its key await."""
+
+    done: trio.Event = dataclasses.field(default_factory=trio.Event)
+    response: _CachedResponse | None = None
+
+
+class ResponseCache:
+    """Wraps an `AppHandler` to cache its responses in memory.
+
+    By default, GET requests are cached by their path and the values of the
+    request headers named in `vary`. Cached responses are replayed until
+    they are `ttl` seconds old, with an Age header. The least recently used
+    responses are evicted to stay within `max_bytes`.
+
+    When several requests with the same key arrive while the handler is
+    producing a response for it, the handler only runs once. The first
+    request's response is streamed as usual while it is recorded, and the
+    other requests get the recording. If the response turns out not to be
+    cacheable, they run the handler themselves.
+
+    A response is not cached if its status is not cacheable by default, if
+    it has `cache-control: no-store` or `private`, a `set-cookie` header or
+    `vary: *`, if its body exceeds `max_entry_bytes`, if it is sent with
+    `HTTP2Response.send_file`, or if the handler calls `HTTP2Response.push`.
+    """
+
+    def __init__(
+        self,
+        app: AppHandler,
+        *,
+        ttl: float = 1.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 1024 * 1024,
+        vary: Iterable[bytes] = (),
+        key: CacheKey | None = None,
+    ) -> None:
+        """Wrap a handler.
+
+        Args:
+            app: The handler whose responses to cache.
+            ttl: How long to serve a response from the cache, in seconds.
+            max_bytes: The memory budget for cached responses.
+            max_entry_bytes: Larger response bodies are not cached.
+            vary: Names of request headers whose values are part of the key,
+                in lowercase.
+            key: Computes the key of a request instead of the default, or
+                returns None to pass the request through.
+        """
+        self._app = app
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._max_entry_bytes = max_entry_bytes
+        self._vary = tuple(vary)
+        self._key = key or self._default_key
+
+        self._entries: collections.OrderedDict[Hashable, _CachedResponse] = (
+            collections.OrderedDict()
+        )
+        self._size = 0
+        self._flights: dict[Hashable, _Flight] = {}
+
+        self.hits = 0
+        """Requests answered from the cache, including coalesced ones."""
+
+        self.misses = 0
+        """Requests that ran the handler."""
+
+    @property
+    def size(self) -> int:
+        """The approximate memory used by cached responses, in bytes."""
+        return self._size
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        self._entries.clear()
+        self._size = 0
+
+    async def __call__(self, req: HTTP2Request, resp: HTTP2Response) -> None:
+        """Respond from the cache or by running the handler."""
+        key = self._key(req)
+        if key is None:
+            await self._app(req, resp)
+            return
+
+        cached = self._lookup(key)
+        if not cached and (flight := self._flights.get(key)):
+            await flight.done.wait()
+            cached = flight.response
+
+        if cached:
+            self.hits += 1
+            await req.body.aclose()
+            await req.trailers.aclose()
+            await _replay(cached, resp)
+            return
+
+        self.misses += 1
+        if key in self._flights:
+            # An uncacheable response is being produced for the same key.
+            await self._app(req, resp)
+            return
+
+        flight = self._flights[key] = _Flight()
+        try:
+            recorder = _RecordingResponse(resp, max_bytes=self._max_entry_bytes)
+            await self._app(req, cast(HTTP2Response, recorder))
+
+            now = trio.current_time()
+            if response := recorder.result(now, now + self._ttl):
+                flight.response = response
+                self._store(key, response)
+
+        finally:
+            del self._flights[key]
+            flight.done.set()
+
+    def _default_key(self, req: HTTP2Request) -> Hashable | None:
+        headers = dict(req.headers)
+        if headers.get(b":method") != b"GET":
+            return None
+
+        return (
+            headers.get(b":path"),
+            *(headers.get(name) for name in self._vary),
+        )
+
+    def _lookup(self, key: Hashable) -> _CachedResponse | None:
+        cached = self._entries.get(key)
+        if not cached:
+            return None
+
+        if trio.current_time() >= cached.expires_at:
+            self._evict(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return cached
+
+    def _store(self, key: Hashable, response: _CachedResponse) -> None:
+        self._evict(key)
+        if response.size > self._max_bytes:
+            return
+
+        self._entries[key] = response
+        self._size += response.size
+
+        while self._size > self._max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: Hashable) -> None:
+        if evicted := self._entries.pop(key, None):
+            self._size -= evicted.size
+
+
+async def _replay(cached: _CachedResponse, resp: HTTP2Response) -> None:
+    age = int(trio.current_time() - cached.stored_at)
+    await resp.headers(
+        cached.status,
+        [*cached.headers, (b"age", str(age).encode())],
+        end_stream=not cached.body and cached.trailers is None,
+    )
+
+    if cached.body:
+        await resp.body(cached.body, end_stream=cached.trailers is None)
+    if cached.trailers is not None:
+        await resp.trailers(cached.trailers)
+
+
+def _is_cacheable(status: int, headers: list[Header]) -> bool:
+    if status not in _CACHEABLE_STATUSES:
+        return False
+
+    for name, value in headers:
+        name = name.lower()
+        if name == b"set-cookie":
+            return False
+        if name == b"vary" and value.strip() == b"*":
+            return False
+        if name == b"cache-control":
+            directives = {d.strip().lower() for d in value.split(b",")}
+            if directives & {b"no-store", b"private"}:
+                return False
+
+    return True
+
+
+class _RecordingResponse:
+    """Forwards writes to a response and records them for the cache."""
+
+    def __init__(self, resp: HTTP2Response, *, max_bytes: int) -> None:
+        self._resp = resp
+        self._max_bytes = max_bytes
+
+        self._cacheable = True
+        self._status = 0
+        self._headers: list[Header] = []
+        self._body: list[bytes] = []
+        self._body_size = 0
+        self._trailers: list[Header] | None = None
+
+    @property
+    def ended(self) -> bool:
+        return self._resp.ended
+
+    def result(self, now: float, expires_at: float) -> _CachedResponse | None:
+        """Return the recorded response if it is complete and cacheable."""
+        if not self._cacheable or not self._resp.ended:
+            return None
+
+        return _CachedResponse(
+            status=self._status,
+            headers=self._headers,
+            body=b"".join(self._body),
+            trailers=self._trailers,
+            stored_at=now,
+            expires_at=expires_at,
+        )
+
+    async def interim(
+        self,
+        status_1xx: int,
+        headers: Iterable[tuple[bytes, bytes]],
+    ) -> None:
+        await self._resp.interim(status_1xx, headers)
+
+    async def push(
+        self,
+        path: str | bytes,
+        headers: Iterable[tuple[bytes, bytes]] = (),
+        *,
+        handler: AppHandler | None = None,
+    ) -> bool:
+        # Replaying the response would not push anything.
+        self._cacheable = False
+        self._body.clear()
+        return await self._resp.push(path, headers, handler=handler)
+
+    async def headers(
+        self,
+        status: int,
+        headers: Iterable[tuple[bytes, bytes]] = (),
+        *,
+        prepared: PreparedHeaders | None = None,
+        end_stream: bool = False,
+    ) -> None:
+        headers = list(headers)
+        self._status = status
+        self._headers = [*(prepared.headers if prepared else ()), *headers]
+        self._cacheable = self._cacheable and _is_cacheable(status, self._headers)
+
+        await self._resp.headers(
+            status,
+            headers,
+            prepared=prepared,
+            end_stream=end_stream,
+        )
+
+    async def body(
+        self,
+        data: bytes | bytearray | memoryview,
+        *,
+        end_stream: bool = False,
+    ) -> None:
+        if self._cacheable:
+            self._body_size += len(data)
+            if self._body_size > self._max_bytes:
+                self._cacheable = False
+                self._body.clear()
+            else:
+                self._body.append(bytes(data))
+
+        await self._resp.body(data, end_stream=end_stream)
+
+    async def send_file(
+        self,
+        file: str | os.PathLike[str] | io.RawIOBase | io.BufferedIOBase,
+        *,
+        offset: int = 0,
+        length: int | None = None,
+        end_stream: bool = False,
+    ) -> None:
+        self._cacheable = False
+        self._body.clear()
+        await self._resp.send_file(
+            file,
+            offset=offset,
+            length=length,
+            end_stream=end_stream,
+        )
+
+    async def trailers(self, trailers: Iterable[tuple[bytes, bytes]]) -> None:
+        self._trailers = list(trailers)
+        await self._resp.trailers(self._trailers)
+
+    async def end(self) -> None:
+        await self._resp.end()
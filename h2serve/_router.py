@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import dataclasses
+import types
+import urllib.parse
+from collections.abc import Iterable, Mapping
+from contextvars import ContextVar
+from typing import Callable
+
+from ._app_handler import AppHandler
+from ._request import HTTP2Request
+from ._response import HTTP2Response
+
+_NO_PARAMS: Mapping[str, object] = types.MappingProxyType({})
+
+_params_ctx: ContextVar[Mapping[str, object]] = ContextVar(
+    "path_params",
+    default=_NO_PARAMS,
+)
+
+
+def path_params() -> Mapping[str, object]:
+    """Return the path parameters of the route being handled.
+
+    Inside a handler added to a `Router`, this maps the names of the
+    parameters in its route pattern to their converted values. Elsewhere,
+    it is empty.
+    """
+    return _params_ctx.get()
+
+
+def _to_str(segment: str) -> object:
+    if not segment:
+        raise ValueError("Empty path segment.")
+    return segment
+
+
+def _to_int(segment: str) -> object:
+    if not (segment.isascii() and segment.isdigit()):
+        raise ValueError(f"Not an integer: {segment!r}")
+    return int(segment)
+
+
+# Parameter types, in the order in which they are tried. The "path" type is
+# not here: it matches the rest of the path and is handled separately.
+_CONVERTERS: dict[str, Callable[[str], object]] = {
+    "int": _to_int,
+    "str": _to_str,
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class _Route:
+    handler: AppHandler
+    names: tuple[str, ...]
+    """The names of the route's parameters, in order."""
+
+
+class _Node:
+    """A node of the routing trie, which corresponds to a path prefix."""
+
+    __slots__ = ("params", "rest", "routes", "static")
+
+    def __init__(self) -> None:
+        self.static: dict[str, _Node] = {}
+        """Children for literal path segments."""
+
+        self.params: list[tuple[str, _Node]] = []
+        """Children for parameter segments by type, in `_CONVERTERS` order."""
+
+        self.routes: dict[bytes | None, _Route] = {}
+        """Routes ending here, by method. None matches any method."""
+
+        self.rest: dict[bytes | None, _Route] = {}
+        """Routes whose last parameter matches the rest of the path."""
+
+    def param_child(self, type_name: str) -> _Node:
+        for name, child in self.params:
+            if name == type_name:
+                return child
+
+        child = _Node()
+        self.params.append((type_name, child))
+        self.params.sort(key=lambda param: list(_CONVERTERS).index(param[0]))
+        return child
+
+
+class Router:
+    """An `AppHandler` that dispatches requests to handlers by path and method.
+
+    Route patterns are paths whose segments may be parameters, written
+    ``{name}`` or ``{name:type}``. The types are ``str`` (the default),
+    which matches one non-empty segment, ``int``, which matches a segment
+    of ASCII digits, and ``path``, which matches the rest of the path,
+    slashes included, and may only be the last segment::
+
+        router = h2serve.Router()
+        router.add("GET", "/users/{id:int}", get_user)
+        router.add(None, "/static/{file:path}", static_files)
+
+    Handlers read the converted parameters with `path_params`.
+
+    Patterns are compiled into a trie of path segments, so a request is
+    dispatched by walking its path once rather than trying every route.
+    Where several routes match, literal segments take precedence over
+    parameters, ``int`` over ``str``, and ``str`` over ``path``.
+
+    Requests whose path matches no route are passed to `not_found`, which
+    responds with 404 by default. If the path matches but the method does
+    not, the response is 405 with an Allow header. The query string is
+    ignored, and segments are percent-decoded after splitting the path.
+    """
+
+    def __init__(self, *, not_found: AppHandler | None = None) -> None:
+        """Create a router without routes.
+
+        Args:
+            not_found: The handler for requests that match no route.
+        """
+        self._root = _Node()
+        self._not_found = not_found or _respond_not_found
+
+    def add(
+        self,
+        method: str | None,
+        pattern: str,
+        handler: AppHandler,
+    ) -> None:
+        """Add a route.
+
+        Args:
+            method: The request method to match, or None for any method.
+            pattern: The route pattern, starting with a slash.
+            handler: The handler for matching requests.
+
+        Raises:
+            ValueError: If the pattern is invalid or already has a handler
+                for the method.
+        """
+        if not pattern.startswith("/"):
+            raise ValueError(f"Route pattern must start with '/': {pattern!r}")
+
+        node = self._root
+        names: list[str] = []
+        routes = None
+
+        segments = pattern[1:].split("/")
+        for i, segment in enumerate(segments):
+            type_name = _parse_param(segment, names)
+            if type_name is None:
+                node = node.static.setdefault(segment, _Node())
+            elif type_name == "path":
+                if i != len(segments) - 1:
+                    raise ValueError(f"Path parameter must be last: {pattern!r}")
+                routes = node.rest
+            else:
+                node = node.param_child(type_name)
+
+        if routes is None:
+            routes = node.routes
+
+        key = method.upper().encode() if method else None
+        if key in routes:
+            raise ValueError(f"Duplicate route: {method or '*'} {pattern}")
+        routes[key] = _Route(handler, tuple(names))
+
+    def route(
+        self,
+        pattern: str,
+        *,
+        methods: Iterable[str] | None = ("GET",),
+    ) -> Callable[[AppHandler], AppHandler]:
+        """Return a decorator that adds a handler for some methods.
+
+        Args:
+            pattern: The route pattern, as for `add`.
+            methods: The request methods to match, or None for any method.
+        """
+
+        def decorator(handler: AppHandler) -> AppHandler:
+            for method in methods if methods is not None else (None,):
+                self.add(method, pattern, handler)
+            return handler
+
+        return decorator
+
+    async def __call__(self, req: HTTP2Request, resp: HTTP2Response) -> None:
+        """Dispatch a request to the handler of its route."""
+        method = path = b""
+        for name, value in req.headers:
+            if name == b":method":
+                method = value
+            elif name == b":path":
+                path = value
+            elif not name.startswith(b":"):
+                break
+
+        values: list[object] = []
+        routes = self._match(path, values)
+        if routes is None:
+            await self._not_found(req, resp)
+            return
+
+        route = routes.get(method) or routes.get(None)
+        if route is None:
+            await _respond_not_allowed(req, resp, routes)
+            return
+
+        token = _params_ctx.set(dict(zip(route.names, values)))
+        try:
+            await route.handler(req, resp)
+        finally:
+            _params_ctx.reset(token)
+
+    def _match(
+        self,
+        raw_path: bytes,
+        values: list[object],
+    ) -> dict[bytes | None, _Route] | None:
+        """Find the routes for a path and collect its parameter values."""
+        path = raw_path.partition(b"?")[0].decode("latin-1")
+        if not path.startswith("/"):
+            return None
+
+        segments = [
+            urllib.parse.unquote(segment) if "%" in segment else segment
+            for segment in path[1:].split("/")
+        ]
+        return _find(self._root, segments, 0, values)
+
+
+def _parse_param(segment: str, names: list[str]) -> str | None:
+    """Return the type of a parameter segment and add its name to `names`.
+
+    Returns None for a literal segment.
+
+    Raises:
+        ValueError: If the segment is not a valid literal or parameter.
+    """
+    if not (segment.startswith("{") and segment.endswith("}")):
+        if "{" in segment or "}" in segment:
+            raise ValueError(f"Invalid route segment: {segment!r}")
+        return None
+
+    name, _, type_name = segment[1:-1].partition(":")
+    type_name = type_name or "str"
+    if not name.isidentifier() or name in names:
+        raise ValueError(f"Invalid or repeated parameter: {segment!r}")
+    if type_name != "path" and type_name not in _CONVERTERS:
+        raise ValueError(f"Unknown parameter type: {segment!r}")
+
+    names.append(name)
+    return type_name
+
+
+def _find(
+    node: _Node,
+    segments: list[str],
+    i: int,
+    values: list[object],
+) -> dict[bytes | None, _Route] | None:
+    """Walk the trie from `node` along `segments[i:]`.
+
+    Children are tried in order of precedence, and only revisited when a
+    more specific branch turns out not to lead to a route.
+    """
+    if i == len(segments):
+        if node.routes:
+            return node.routes
+
+    else:
+        segment = segments[i]
+
+        child = node.static.get(segment)
+        if child and (routes := _find(child, segments, i + 1, values)):
+            return routes
+
+        for type_name, child in node.params:
+            try:
+                value = _CONVERTERS[type_name](segment)
+            except ValueError:
+                continue
+
+            values.append(value)
+            if routes := _find(child, segments, i + 1, values):
+                return routes
+            values.pop()
+
+    if node.rest:
+        values.append("/".join(segments[i:]))
+        return node.rest
+
+    return None
+
+
+async def _respond_not_found(req: HTTP2Request, resp: HTTP2Response) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+    await resp.headers(404, end_stream=True)
+
+
+async def _respond_not_allowed(
+    req: HTTP2Request,
+    resp: HTTP2Response,
+    routes: dict[bytes | None, _Route],
+) -> None:
+    await req.body.aclose()
+    await req.trailers.aclose()
+
+    allow = b", ".join(sorted(method for method in routes if method))
+    await resp.headers(405, [(b"allow", allow)], end_stream=True)
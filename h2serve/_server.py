@@ -1,21 +1,35 @@
 from __future__ import annotations
 
+import dataclasses
 import functools
 import logging
 import ssl
-from typing import Union, cast
+from collections.abc import Iterable
+from typing import Union
 
 import h2.settings
 import trio
 
+from ._admission import AdmissionController
 from ._app_handler import AppHandler
-from ._conn_handler import HTTP2ConnectionHandler
+from ._conn_handler import (
+    DEFAULT_MAX_WRITE_SIZE,
+    ConnectionInfo,
+    HTTP2ConnectionHandler,
+)
 from ._logging import ContextualLogger
+from ._metrics import Metrics, MetricsRegistry
+from ._middleware import Middleware, MiddlewareChain
+from ._tracing import Tracer
+from ._window_tuning import ReceiveWindowBudget
 
 _logger = ContextualLogger(logging.getLogger(__name__))
 
 
 # Using | in type aliases is Python 3.10+
+_ServerStream = Union[trio.SSLStream[trio.SocketStream], trio.SocketStream]
+"""A connection accepted with or without TLS."""
+
 INETSocketAddr = Union[tuple[str, int], tuple[str, int, int, int]]
 """An IPv4 (host, port) or an IPv6 (host, port, flowinfo, scope_id).
 
@@ -24,16 +38,37 @@ socket families.
 """
 
 
+@dataclasses.dataclass(frozen=True)
+class DrainResult:
+    """How the streams of a drained server ended."""
+
+    completed: int
+    """The number of streams whose handlers finished before the timeout."""
+
+    cancelled: int
+    """The number of streams that were cancelled at the timeout."""
+
+
 class Server:
     """A handle to a running HTTP/2 server."""
 
     def __init__(
         self,
         cancel_scope: trio.CancelScope,
+        accept_scope: trio.CancelScope,
+        stopped: trio.Event,
         addresses: list[INETSocketAddr],
+        connections: set[HTTP2ConnectionHandler],
+        window_budget: ReceiveWindowBudget | None,
+        metrics: MetricsRegistry,
     ) -> None:
         self._cancel_scope = cancel_scope
+        self._accept_scope = accept_scope
+        self._stopped = stopped
         self._addresses = addresses
+        self._connections = connections
+        self._window_budget = window_budget
+        self._metrics = metrics
 
     @property
     def addresses(self) -> list[INETSocketAddr]:
@@ -53,6 +88,29 @@ class Server:
 
         raise ValueError("The server is not running on localhost.")
 
+    def connections(self) -> list[ConnectionInfo]:
+        """Describe all open connections."""
+        return [conn.info() for conn in self._connections]
+
+    def metrics(self) -> Metrics:
+        """Aggregate the server's metrics."""
+        return self._metrics.snapshot()
+
+    def set_receive_window_budget(self, max_bytes: int) -> None:
+        """Change the memory budget for autotuned receive windows.
+
+        If connections have grown their windows beyond the new budget, the
+        largest ones are shrunk to an equal share of it. This can be used to
+        give memory back when the process is under pressure.
+
+        Raises:
+            ValueError: If the server was not started with a budget.
+        """
+        if not self._window_budget:
+            raise ValueError("Receive window autotuning is not enabled.")
+
+        self._window_budget.set_max_bytes(max_bytes)
+
     def stop(self) -> None:
         """Close all connections and cancel all handlers.
 
@@ -61,6 +119,49 @@ class Server:
         """
         self._cancel_scope.cancel()
 
+    async def drain(self, timeout: float) -> DrainResult:  # noqa: ASYNC109
+        """Stop the server without interrupting requests in progress.
+
+        The server stops accepting connections and sends a GOAWAY frame on
+        every open connection, which tells clients to send new requests
+        elsewhere while the streams they already opened are handled. Each
+        connection is closed as soon as its last stream ends. Streams that
+        are still running after `timeout` seconds are cancelled as with
+        `stop`.
+
+        After calling this, the server can no longer be used.
+
+        Args:
+            timeout: How long to wait for streams to finish, in seconds.
+
+        Returns:
+            How many streams finished and how many were cancelled, counting
+            those that were active when this was called or started later.
+        """
+        self._accept_scope.cancel()
+
+        before = {conn: conn.info() for conn in self._connections}
+        for conn in before:
+            conn.drain()
+
+        with trio.move_on_after(timeout):
+            await self._stopped.wait()
+
+        completed = 0
+        cancelled = 0
+        for conn in {*before, *self._connections}:
+            info = conn.info()
+            completed += info.streams_total - info.streams_active
+            cancelled += info.streams_active
+            if conn in before:
+                completed -= before[conn].streams_total - before[conn].streams_active
+
+        self.stop()
+        await self._stopped.wait()
+
+        _logger.info("Drained: %d completed, %d cancelled.", completed, cancelled)
+        return DrainResult(completed=completed, cancelled=cancelled)
+
 
 async def serve(
     nursery: trio.Nursery,
@@ -68,8 +169,22 @@ async def serve(
     *,
     host: str | bytes | None,
     port: int,
-    ssl_context: ssl.SSLContext,
+    ssl_context: ssl.SSLContext | None,
     http2_settings: dict[h2.settings.SettingCodes | int, int] | None = None,
+    max_write_size: int = DEFAULT_MAX_WRITE_SIZE,
+    deferred_flush: bool = False,
+    window_update_ratio: float = 0.5,
+    auto_ack: bool = False,
+    receive_window_budget: int | None = None,
+    reuse_port: bool = False,
+    metrics: MetricsRegistry | None = None,
+    tracer: Tracer | None = None,
+    header_table_size: int | None = None,
+    middleware: Iterable[Middleware] = (),
+    admission: AdmissionController | None = None,
+    idle_timeout: float | None = None,
+    keepalive_interval: float | None = None,
+    keepalive_timeout: float = 20.0,
 ) -> Server:
     """Start an HTTP/2 server.
 
@@ -79,12 +194,78 @@ async def serve(
         host: The host to pass to `trio.open_ssl_over_tcp_listeners`. For local testing,
             you often want the string "localhost" or "127.0.0.1", or your IP address
             on your local network (e.g. "192.168.0.<X>"). See the `trio` documentation
-            for more.
+            for more. Cleartext servers pass it to `trio.open_tcp_listeners`.
         port: The port to listen on, or 0 to allow the OS to pick a port for you.
         ssl_context: The SSL context to use. It must be a server context (purpose
             set to `ssl.Purpose.CLIENT_AUTH`) with ALPN protocols set to ["h2"].
+            If None, the server accepts cleartext HTTP/2 with prior knowledge
+            (h2c) instead, which is meant for trusted networks such as behind
+            a TLS-terminating load balancer. HTTP/1.1 upgrades are not
+            supported.
         http2_settings: Initial settings to use on new connections.
             Unspecified settings use their default values.
+        max_write_size: Outgoing data that is queued while a connection is
+            writing is coalesced into a single write of up to roughly this many
+            bytes. Larger values mean fewer TLS records and syscalls at the cost
+            of larger writes. Use 0 to write each queued chunk separately.
+        deferred_flush: If true, frames generated by a connection's streams are
+            serialized by a single task once per scheduler batch rather than
+            after every individual operation. This reduces per-frame overhead
+            on connections with many concurrent streams. Responses that wait
+            for their data to be sent are released once it is written.
+        window_update_ratio: Acknowledged request data is handed back to the
+            client in WINDOW_UPDATE frames once it reaches this fraction of
+            the stream or connection receive window. Must be in (0, 1].
+        auto_ack: If true, request body chunks are acknowledged as soon as the
+            application reads them from `HTTP2Request.body`, so that it does
+            not need to set `DataChunk.ack` itself.
+        receive_window_budget: If set, each connection measures its round-trip
+            time with PING frames while receiving request data and grows its
+            receive windows toward the bandwidth-delay product. This is the
+            total number of bytes by which all connections together may grow
+            their windows beyond the initial ones. Connections are shrunk
+            toward an equal share when the budget runs out. If None, windows
+            keep their initial sizes.
+        reuse_port: If true, listening sockets are bound with SO_REUSEPORT so
+            that several processes can serve the same port, with the kernel
+            distributing connections among them. This is how `python -m
+            h2serve --workers N` scales across cores. Requires a nonzero port
+            and an OS that supports SO_REUSEPORT, such as Linux.
+        metrics: The registry in which to collect the server's metrics, for
+            example to serve them with a `PrometheusHandler`. If None, the
+            server creates its own. Either way, they are available through
+            `Server.metrics`.
+        tracer: If set, receives timestamps for the phases of every request:
+            receipt of its headers, the handler starting, response headers,
+            the first DATA frame written and the end of the stream. Without a
+            tracer, no timestamps are taken.
+        header_table_size: If set, the size in bytes of each connection's
+            HPACK compression tables. It is advertised as the
+            SETTINGS_HEADER_TABLE_SIZE for request headers unless
+            `http2_settings` says otherwise, and response headers are
+            compressed with a table no larger than this or than the client
+            allows. Larger tables let more repeated headers be sent as
+            short references, at the cost of memory per connection. If None,
+            request headers use the default of 4096 bytes and response
+            headers use whatever the client allows.
+        middleware: Hooks to run around every request, in order. Their hooks
+            are collected once here, so that requests only pay for the hooks
+            that are overridden. See `Middleware`.
+        admission: If set, limits how many request handlers run at once, and
+            queues or refuses the requests beyond that. Each connection still
+            accepts as many streams as its SETTINGS_MAX_CONCURRENT_STREAMS,
+            which `http2_settings` can lower.
+        idle_timeout: If set, connections that have had no open streams for
+            this many seconds are sent a GOAWAY and closed, as are connections
+            that take longer than this to complete the TLS handshake or send
+            the connection preface. If None, idle connections are kept open
+            until the client closes them.
+        keepalive_interval: If set, connections on which nothing has been
+            received for this many seconds are sent a PING, to detect clients
+            that went away without closing the connection, even while they
+            have open streams.
+        keepalive_timeout: How long to wait for a keepalive PING to be
+            acknowledged before closing the connection, in seconds.
 
     Returns:
         A handle to the server.
@@ -97,6 +278,20 @@ async def serve(
             port=port,
             ssl_context=ssl_context,
             http2_settings=http2_settings,
+            max_write_size=max_write_size,
+            deferred_flush=deferred_flush,
+            window_update_ratio=window_update_ratio,
+            auto_ack=auto_ack,
+            receive_window_budget=receive_window_budget,
+            reuse_port=reuse_port,
+            metrics=metrics or MetricsRegistry(),
+            tracer=tracer,
+            header_table_size=header_table_size,
+            middleware=MiddlewareChain(middleware) or None,
+            admission=admission,
+            idle_timeout=idle_timeout,
+            keepalive_interval=keepalive_interval,
+            keepalive_timeout=keepalive_timeout,
         )
     )
 
@@ -108,35 +303,156 @@ async def _serve(
     app: AppHandler,
     host: str | bytes | None,
     port: int,
-    ssl_context: ssl.SSLContext,
+    ssl_context: ssl.SSLContext | None,
     http2_settings: dict[h2.settings.SettingCodes | int, int] | None,
+    max_write_size: int,
+    deferred_flush: bool,
+    window_update_ratio: float,
+    auto_ack: bool,
+    receive_window_budget: int | None,
+    reuse_port: bool,
+    metrics: MetricsRegistry,
+    tracer: Tracer | None,
+    header_table_size: int | None,
+    middleware: MiddlewareChain | None,
+    admission: AdmissionController | None,
+    idle_timeout: float | None,
+    keepalive_interval: float | None,
+    keepalive_timeout: float,
     *,
     task_status: trio.TaskStatus[Server] = trio.TASK_STATUS_IGNORED,
 ) -> None:
-    listeners = await trio.open_ssl_over_tcp_listeners(
-        port,
-        ssl_context,
-        host=host,
-    )
+    if reuse_port:
+        tcp_listeners = await _open_reuse_port_listeners(port, host=host)
+    else:
+        tcp_listeners = await trio.open_tcp_listeners(port, host=host)
 
-    addresses: list[INETSocketAddr] = []
-    for listener in listeners:
-        sockstream = cast(trio.SocketStream, listener.transport_listener)
-        addresses.append(sockstream.socket.getsockname())
+    addresses: list[INETSocketAddr] = [
+        listener.socket.getsockname() for listener in tcp_listeners
+    ]
     _logger.info("Listening on %s", addresses)
 
+    listeners: list[trio.abc.Listener[_ServerStream]] = []
+    for listener in tcp_listeners:
+        if ssl_context:
+            listeners.append(trio.SSLListener(listener, ssl_context))
+        else:
+            listeners.append(listener)
+
+    window_budget = None
+    if receive_window_budget is not None:
+        window_budget = ReceiveWindowBudget(receive_window_budget)
+
+    connections: set[HTTP2ConnectionHandler] = set()
+
     cancel_scope = trio.CancelScope()
+    accept_scope = trio.CancelScope()
+    stopped = trio.Event()
     task_status.started(
         Server(
             cancel_scope=cancel_scope,
+            accept_scope=accept_scope,
+            stopped=stopped,
             addresses=addresses,
+            connections=connections,
+            window_budget=window_budget,
+            metrics=metrics,
         )
     )
 
-    async def handle(stream: trio.SSLStream[trio.SocketStream]) -> None:
-        await HTTP2ConnectionHandler(stream, app).handle_no_except(
-            initial_settings=http2_settings
+    async def handle(stream: _ServerStream) -> None:
+        conn_metrics = metrics.open_connection()
+        conn = HTTP2ConnectionHandler(
+            stream,
+            app,
+            max_write_size=max_write_size,
+            deferred_flush=deferred_flush,
+            window_update_ratio=window_update_ratio,
+            auto_ack=auto_ack,
+            window_budget=window_budget,
+            metrics=conn_metrics,
+            tracer=tracer,
+            header_table_size=header_table_size,
+            middleware=middleware,
+            admission=admission,
+            idle_timeout=idle_timeout,
+            keepalive_interval=keepalive_interval,
+            keepalive_timeout=keepalive_timeout,
         )
 
-    with cancel_scope:
-        await trio.serve_listeners(handle, listeners)
+        connections.add(conn)
+
+        # The connection was accepted just as the server started draining.
+        if accept_scope.cancel_called:
+            conn.drain()
+        try:
+            await conn.handle_no_except(initial_settings=http2_settings)
+        finally:
+            connections.discard(conn)
+            metrics.close_connection(conn_metrics)
+
+    try:
+        with cancel_scope:
+            # Connections outlive the listeners so that they can be drained.
+            async with trio.open_nursery() as connection_nursery:
+                with accept_scope:
+                    await trio.serve_listeners(
+                        handle,
+                        listeners,
+                        handler_nursery=connection_nursery,
+                    )
+    finally:
+        stopped.set()
+
+
+async def _open_reuse_port_listeners(
+    port: int,
+    *,
+    host: str | bytes | None,
+) -> list[trio.SocketListener]:
+    """Like `trio.open_tcp_listeners`, but binds sockets with SO_REUSEPORT."""
+    if not port:
+        raise ValueError("SO_REUSEPORT requires a fixed port.")
+    if not hasattr(trio.socket, "SO_REUSEPORT"):
+        raise ValueError("SO_REUSEPORT is not supported on this platform.")
+
+    addresses = await trio.socket.getaddrinfo(
+        host,
+        port,
+        type=trio.socket.SOCK_STREAM,
+        flags=trio.socket.AI_PASSIVE,
+    )
+
+    listeners: list[trio.SocketListener] = []
+    try:
+        for family, socktype, proto, _, sockaddr in addresses:
+            sock = trio.socket.socket(family, socktype, proto)
+            try:
+                await _bind_reuse_port(sock, sockaddr)
+            except BaseException:
+                sock.close()
+                raise
+
+            listeners.append(trio.SocketListener(sock))
+
+    except BaseException:
+        for listener in listeners:
+            listener.socket.close()
+        raise
+
+    return listeners
+
+
+async def _bind_reuse_port(
+    sock: trio.socket.SocketType,
+    sockaddr: tuple[str, int] | tuple[str, int, int, int],
+) -> None:
+    socket = trio.socket
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    if sock.family == socket.AF_INET6:
+        # Like trio, don't accept IPv4 connections on IPv6 sockets.
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+
+    await sock.bind(sockaddr)
+    sock.listen()
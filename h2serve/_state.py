@@ -5,6 +5,7 @@ from collections.abc import AsyncIterator
 
 import h2.config
 import h2.connection
+import hyperframe.frame
 import trio
 
 from ._notifying_channel import NotifyingSendChannel
@@ -15,8 +16,12 @@ class HTTP2State:
 
     This provides the `use` context manager for locking and accessing
     the state value, after which any new data is flushed to an output channel.
-    The `wait_for_change` method allows temporarily releasing the lock and
-    blocking until another task calls `use`.
+    The `wait_for_window` method allows temporarily releasing the lock and
+    blocking until a stream's send window may have grown, as reported through
+    `notify_window_changed`.
+
+    In deferred flushing mode, `use` only marks the state as dirty and
+    `run_flusher` serializes all new data once per scheduler batch.
 
     Usable as a context manager to close the output channel's send side.
     """
@@ -24,6 +29,8 @@ class HTTP2State:
     def __init__(
         self,
         out: NotifyingSendChannel,
+        *,
+        deferred_flush: bool = False,
     ) -> None:
         """Initiate the state.
 
@@ -32,19 +39,39 @@ class HTTP2State:
                 the receiver must implement timeouts and promptly close the channel
                 on any timeout or write error. This is important because a part of `use`
                 shields itself from cancellation.
+            deferred_flush: Whether to flush data from `run_flusher` instead of
+                at the end of every `use`. If set, `run_flusher` must be running
+                for as long as the state is used.
         """
         self._outfifo = trio.StrictFIFOLock()
         self._out = out
 
+        self._deferred_flush = deferred_flush
+        self._dirty = trio.Event()
+        self._flushed = trio.Event()
+        self._closing = False
+
         config = h2.config.H2Configuration(client_side=False)
         self._h2_state = h2.connection.H2Connection(config)
-        self._h2_state_cond = trio.Condition()
+        self._h2_state_lock = trio.Lock()
+
+        # Frames serialized outside of h2, sent after h2's own data.
+        self._raw_frames = b""
+
+        # Tasks blocked on a stream's own window or on the connection window.
+        self._stream_window_waiters: dict[int, trio.Event] = {}
+        self._conn_window_waiters: dict[int, trio.Event] = {}
 
     def __enter__(self) -> None:
         pass
 
     def __exit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
-        self._out.close()
+        if self._deferred_flush:
+            # Let the flusher write any remaining data and close the channel.
+            self._closing = True
+            self._dirty.set()
+        else:
+            self._out.close()
 
     @contextlib.asynccontextmanager
     async def use(
@@ -61,14 +88,21 @@ class HTTP2State:
             trio.BrokenResourceError: If we are unable to flush data, meaning that
                 the connection has been closed.
         """
-        async with self._h2_state_cond:
+        async with self._h2_state_lock:
             yield self._h2_state
-            send_event = trio.Event() if block_on_send else None
 
-            self._h2_state_cond.notify_all()
-            data = self._h2_state.data_to_send()
+            if self._deferred_flush:
+                flushed = self._flushed
+                self._dirty.set()
+            else:
+                send_event = trio.Event() if block_on_send else None
+                data = self._take_data()
+
+        if self._deferred_flush:
+            if block_on_send:
+                await flushed.wait()
 
-        if data:
+        elif data:
             # Cancelling would discard frames and put us in an invalid state,
             # so we shield. We expect the _out channel receiver to implement
             # timeouts and close itself if it is blocked too long.
@@ -79,9 +113,99 @@ class HTTP2State:
             if send_event:
                 await send_event.wait()
 
-    async def wait_for_change(self) -> None:
-        """Wait for the connection state to change.
+    async def run_flusher(self) -> None:
+        """Flush new data to the out-channel in deferred flushing mode.
+
+        This waits for the state to be marked dirty, then yields to the scheduler
+        so that every other runnable task can use the state before serializing
+        all new data as a single item. Tasks that used `block_on_send` are released
+        once that item is read from the channel.
+
+        Returns after the state's context manager exits and all data is flushed,
+        closing the out-channel.
+        """
+        try:
+            while not self._closing or self._dirty.is_set():
+                await self._dirty.wait()
+                await trio.lowlevel.checkpoint()
+
+                async with self._h2_state_lock:
+                    self._dirty = trio.Event()
+                    flushed, self._flushed = self._flushed, trio.Event()
+                    data = self._take_data()
+
+                if data:
+                    await self._out.send(data, flushed)
+                else:
+                    flushed.set()
+
+        finally:
+            self._out.close()
 
-        This can only be used inside the `use()` context manager.
+    def send_frame(self, frame: hyperframe.frame.Frame) -> None:
+        """Send a frame without passing it through h2.
+
+        This is for frames that h2 can only send by changing its state in a
+        way we do not want, such as a GOAWAY after which open streams may
+        still finish: h2 refuses to send anything after its own GOAWAY.
+
+        Must be called from within `use`.
+        """
+        assert self._h2_state_lock.locked()
+        self._raw_frames += frame.serialize()
+
+    def _take_data(self) -> bytes:
+        data = self._h2_state.data_to_send()
+        if self._raw_frames:
+            data += self._raw_frames
+            self._raw_frames = b""
+        return data
+
+    async def wait_for_window(self, stream_id: int) -> None:
+        """Wait until the stream's send window may have grown.
+
+        This can only be used inside the `use()` context manager. It releases
+        the lock while waiting. Only this stream's task is woken when its window
+        or the connection window is updated, so callers should re-check
+        `local_flow_control_window` after this returns.
+        """
+        if self._h2_state.outbound_flow_control_window <= 0:
+            waiters = self._conn_window_waiters
+        else:
+            waiters = self._stream_window_waiters
+
+        event = trio.Event()
+        waiters[stream_id] = event
+
+        self._h2_state_lock.release()
+        try:
+            await event.wait()
+        finally:
+            if waiters.get(stream_id) is event:
+                del waiters[stream_id]
+
+            with trio.CancelScope(shield=True):
+                await self._h2_state_lock.acquire()
+
+    def notify_window_changed(self, stream_id: int | None) -> None:
+        """Wake tasks whose send window may have grown.
+
+        Args:
+            stream_id: The stream whose window was updated, 0 if the connection
+                window was updated, or None if all stream windows changed
+                (e.g. due to a SETTINGS_INITIAL_WINDOW_SIZE change).
         """
-        await self._h2_state_cond.wait()
+        if stream_id is None:
+            waiters = self._stream_window_waiters
+            self._stream_window_waiters = {}
+            for event in waiters.values():
+                event.set()
+
+        elif stream_id == 0:
+            waiters = self._conn_window_waiters
+            self._conn_window_waiters = {}
+            for event in waiters.values():
+                event.set()
+
+        elif stream_id in self._stream_window_waiters:
+            self._stream_window_waiters.pop(stream_id).set()
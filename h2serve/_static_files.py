@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import dataclasses
+import email.utils
+import mimetypes
+import mmap
+import os
+import stat
+import urllib.parse
+
+import trio
+
+from ._headers import PreparedHeaders
+from ._request import Header, HTTP2Request
+from ._response import HTTP2Response
+
+# Approximate memory used by a cache entry besides the file contents.
+_ENTRY_OVERHEAD = 512
+
+
+class _UnsatisfiableRangeError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class _File:
+    """A cached file: its metadata, and its contents or a map of them."""
+
+    path: str
+    """The path of the file, which is the index file for a directory."""
+
+    size: int
+    mtime_ns: int
+    ino: int
+    etag: bytes
+    last_modified: bytes
+    headers: PreparedHeaders
+    """The headers of a full 200 response."""
+
+    content: bytes | mmap.mmap
+    checked_at: float
+    """When the file was last compared to the file system."""
+
+    @property
+    def cost(self) -> int:
+        """The number of bytes this counts against the cache budget."""
+        if isinstance(self.content, bytes):
+            return _ENTRY_OVERHEAD + len(self.content)
+        return _ENTRY_OVERHEAD
+
+    def close(self) -> None:
+        if isinstance(self.content, mmap.mmap):
+            # Responses still sending from the map keep it alive until
+            # they are done.
+            with contextlib.suppress(BufferError):
+                self.content.close()
+
+
+class StaticFiles:
+    """An `AppHandler` that serves the files in a directory.
+
+    Small files are kept in memory and large files stay memory-mapped, in
+    an LRU cache. Within `revalidate_after` seconds of loading or checking
+    a file, requests for it make no system calls at all. After that, the
+    next request checks whether the file changed.
+
+    Responses have ETag and Last-Modified headers. Conditional requests are
+    answered with 304 Not Modified, and a single byte range can be requested
+    with a Range header. Requests for multiple ranges get the whole file.
+
+    Replace files by renaming new ones over them rather than writing to them
+    in place: truncating a memory-mapped file can crash the process.
+    Symbolic links inside the directory are followed.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        *,
+        prefix: str = "/",
+        index: str | None = "index.html",
+        cache_bytes: int = 64 * 1024 * 1024,
+        max_cached_file_size: int = 256 * 1024,
+        max_mapped_files: int = 256,
+        revalidate_after: float = 1.0,
+        cache_control: bytes | None = None,
+    ) -> None:
+        """Serve a directory.
+
+        Args:
+            directory: The directory whose files to serve.
+            prefix: The path prefix under which the files are served. It is
+                removed from the request path to find a file.
+            index: The file to serve for a request for a directory.
+            cache_bytes: The memory budget for cached file contents.
+            max_cached_file_size: Files up to this size are read into memory;
+                larger ones are memory-mapped.
+            max_mapped_files: The maximum number of files to keep mapped.
+                Each mapping holds a file descriptor.
+            revalidate_after: Seconds after which to check whether a cached
+                file changed.
+            cache_control: A Cache-Control header value for all responses.
+        """
+        self._root = os.path.abspath(directory)
+        self._prefix = prefix if prefix.endswith("/") else prefix + "/"
+        self._index = index
+        self._cache_bytes = cache_bytes
+        self._max_cached_file_size = max_cached_file_size
+        self._max_mapped_files = max_mapped_files
+        self._revalidate_after = revalidate_after
+        self._cache_control = cache_control
+
+        self._files: collections.OrderedDict[str, _File] = collections.OrderedDict()
+        self._cached_bytes = 0
+        self._mapped_files = 0
+
+    async def __call__(self, req: HTTP2Request, resp: HTTP2Response) -> None:
+        """Respond with a file, or with an error status."""
+        await req.body.aclose()
+        await req.trailers.aclose()
+
+        headers = dict(req.headers)
+        method = headers.get(b":method")
+        if method not in (b"GET", b"HEAD"):
+            await resp.headers(405, [(b"allow", b"GET, HEAD")], end_stream=True)
+            return
+
+        path = self._resolve(headers.get(b":path", b""))
+        file = await self._get(path) if path else None
+        if not file:
+            await resp.headers(404, [], end_stream=True)
+            return
+
+        # Pin the contents before the first await: another request may evict
+        # the file meanwhile, which closes its map.
+        with memoryview(file.content) as content:
+            await _respond(headers, resp, file, content)
+
+    def _resolve(self, raw_path: bytes) -> str | None:
+        """Map a request path to a path on disk, or None if it is outside."""
+        path = urllib.parse.unquote(raw_path.partition(b"?")[0].decode("latin-1"))
+        if not path.startswith(self._prefix) or "\0" in path:
+            return None
+
+        parts = path[len(self._prefix) :].split("/")
+        if any(part in (".", "..") or os.sep in part for part in parts):
+            return None
+
+        if parts[-1] == "" and self._index:
+            parts[-1] = self._index
+
+        return os.path.join(self._root, *parts)
+
+    async def _get(self, path: str) -> _File | None:
+        """Look up a file in the cache, loading or revalidating it as needed."""
+        now = trio.current_time()
+
+        file = self._files.get(path)
+        if file:
+            self._files.move_to_end(path)
+            if now - file.checked_at < self._revalidate_after:
+                return file
+
+            try:
+                st = await trio.to_thread.run_sync(os.stat, file.path)
+            except OSError:
+                self._evict(path)
+                return None
+
+            if (st.st_ino, st.st_size, st.st_mtime_ns) == (
+                file.ino,
+                file.size,
+                file.mtime_ns,
+            ):
+                file.checked_at = now
+                return file
+
+            self._evict(path)
+
+        try:
+            file = await trio.to_thread.run_sync(self._load, path, now)
+        except (OSError, ValueError):
+            return None
+
+        if cached := self._files.get(path):
+            # Another request loaded it meanwhile.
+            file.close()
+            return cached
+
+        self._add(path, file)
+        return file
+
+    def _load(self, path: str, now: float) -> _File:
+        """Open a file and read or map it. Runs in a worker thread."""
+        target = path
+        if self._index and os.path.isdir(path):
+            target = os.path.join(path, self._index)
+
+        with open(target, "rb") as f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                raise ValueError(f"Not a regular file: {target}")
+
+            content: bytes | mmap.mmap
+            if st.st_size <= self._max_cached_file_size:
+                content = f.read(st.st_size)
+            else:
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        size = len(content)
+        etag = f'"{st.st_mtime_ns:x}-{size:x}"'.encode()
+        last_modified = email.utils.formatdate(st.st_mtime, usegmt=True).encode()
+        content_type, _ = mimetypes.guess_type(target)
+
+        headers: list[Header] = [
+            (b"content-type", (content_type or "application/octet-stream").encode()),
+            (b"content-length", str(size).encode()),
+            (b"etag", etag),
+            (b"last-modified", last_modified),
+            (b"accept-ranges", b"bytes"),
+        ]
+        if self._cache_control:
+            headers.append((b"cache-control", self._cache_control))
+
+        return _File(
+            path=target,
+            size=size,
+            mtime_ns=st.st_mtime_ns,
+            ino=st.st_ino,
+            etag=etag,
+            last_modified=last_modified,
+            headers=PreparedHeaders(headers),
+            content=content,
+            checked_at=now,
+        )
+
+    def _add(self, path: str, file: _File) -> None:
+        self._files[path] = file
+        self._cached_bytes += file.cost
+        if isinstance(file.content, mmap.mmap):
+            self._mapped_files += 1
+
+        while len(self._files) > 1 and (
+            self._cached_bytes > self._cache_bytes
+            or self._mapped_files > self._max_mapped_files
+        ):
+            self._evict(next(iter(self._files)))
+
+    def _evict(self, path: str) -> None:
+        file = self._files.pop(path, None)
+        if not file:
+            return
+
+        self._cached_bytes -= file.cost
+        if isinstance(file.content, mmap.mmap):
+            self._mapped_files -= 1
+        file.close()
+
+
+async def _respond(
+    headers: dict[bytes, bytes],
+    resp: HTTP2Response,
+    file: _File,
+    content: memoryview,
+) -> None:
+    """Respond to a GET or HEAD request for a file."""
+    method = headers[b":method"]
+
+    if _is_not_modified(headers, file):
+        await resp.headers(
+            304,
+            [(b"etag", file.etag), (b"last-modified", file.last_modified)],
+            end_stream=True,
+        )
+        return
+
+    try:
+        byte_range = _requested_range(headers, file)
+    except _UnsatisfiableRangeError:
+        await resp.headers(
+            416,
+            [(b"content-range", f"bytes */{file.size}".encode())],
+            end_stream=True,
+        )
+        return
+
+    if byte_range:
+        start, stop = byte_range
+        await resp.headers(
+            206,
+            [
+                *(h for h in file.headers.headers if h[0] != b"content-length"),
+                (b"content-length", str(stop - start).encode()),
+                (
+                    b"content-range",
+                    f"bytes {start}-{stop - 1}/{file.size}".encode(),
+                ),
+            ],
+            end_stream=method == b"HEAD",
+        )
+    else:
+        start, stop = 0, file.size
+        await resp.headers(
+            200,
+            prepared=file.headers,
+            end_stream=method == b"HEAD",
+        )
+
+    if method == b"GET":
+        await resp.body(content[start:stop], end_stream=True)
+
+
+def _is_not_modified(headers: dict[bytes, bytes], file: _File) -> bool:
+    if if_none_match := headers.get(b"if-none-match"):
+        if if_none_match.strip() == b"*":
+            return True
+        return any(
+            tag.strip().removeprefix(b"W/") == file.etag
+            for tag in if_none_match.split(b",")
+        )
+
+    if if_modified_since := headers.get(b"if-modified-since"):
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since.decode())
+        except (TypeError, ValueError):
+            return False
+        return file.mtime_ns // 1_000_000_000 <= since.timestamp()
+
+    return False
+
+
+def _requested_range(
+    headers: dict[bytes, bytes],
+    file: _File,
+) -> tuple[int, int] | None:
+    """Return the single byte range to send, or None to send the whole file.
+
+    Raises:
+        _UnsatisfiableRangeError: If the range is outside the file.
+    """
+    range_header = headers.get(b"range")
+    if not range_header:
+        return None
+
+    if_range = headers.get(b"if-range")
+    if if_range and if_range not in (file.etag, file.last_modified):
+        return None
+
+    unit, _, ranges = range_header.partition(b"=")
+    if unit.strip() != b"bytes" or b"," in ranges:
+        return None
+
+    first, sep, last = ranges.strip().partition(b"-")
+    if not sep:
+        return None
+
+    try:
+        if not first:
+            start, stop = max(0, file.size - int(last)), file.size
+        else:
+            start = int(first)
+            stop = min(int(last) + 1, file.size) if last else file.size
+            if last and int(last) < start:
+                # An invalid range is ignored. See RFC 9110, section 14.1.1.
+                return None
+    except ValueError:
+        return None
+
+    if start >= stop:
+        raise _UnsatisfiableRangeError
+    return start, stop
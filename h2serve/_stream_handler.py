@@ -1,17 +1,31 @@
 from __future__ import annotations
 
+import functools
 import logging
 import math
 from collections.abc import Iterable
+from typing import Callable
 
 import hpack
 import trio
 
+from ._admission import AdmissionTicket
 from ._app_handler import AppHandler
+from ._flow_control import ReceiveWindowAcknowledger
 from ._logging import ContextualLogger
-from ._request import DataChunk, Header, HTTP2Request, unbuffered_data_chunk_channel
+from ._metrics import ConnectionMetrics
+from ._middleware import MiddlewareChain, RequestHooks
+from ._priority import PriorityScheduler
+from ._request import (
+    DataChunk,
+    DataChunkAck,
+    Header,
+    HTTP2Request,
+    unbuffered_data_chunk_channel,
+)
 from ._response import HTTP2Response
 from ._state import HTTP2State
+from ._tracing import StreamTracer
 
 _logger = ContextualLogger(logging.getLogger(__name__))
 
@@ -22,18 +36,37 @@ class HTTP2StreamHandler:
     def __init__(
         self,
         state: HTTP2State,
+        scheduler: PriorityScheduler,
+        acknowledger: ReceiveWindowAcknowledger,
+        metrics: ConnectionMetrics,
         stream_id: int,
         headers: Iterable[hpack.HeaderTuple],
+        *,
+        auto_ack: bool = False,
+        tracer: StreamTracer | None = None,
+        middleware: MiddlewareChain | None = None,
+        start_push: Callable[[int, list[Header], AppHandler | None], None]
+        | None = None,
+        admission: AdmissionTicket | None = None,
     ) -> None:
         self._state = state
+        self._scheduler = scheduler
+        self._acknowledger = acknowledger
+        self._metrics = metrics
+        self._tracer = tracer
+        self._middleware = middleware
+        self._start_push = start_push
+        self._admission = admission
         self.id = stream_id
         self._headers: list[tuple[bytes, bytes]] = list(headers)
 
-        self._nursery: trio.Nursery | None = None
+        # Created up front so that a reset can cancel the stream before its
+        # handler starts, for example while it waits to be admitted.
+        self._cancel_scope = trio.CancelScope()
 
         # We use HTTP/2 flow control to bound the memory usage of request data.
         # The h2 package raises errors if the client sends more data than it's allowed.
-        body_in, body_out = unbuffered_data_chunk_channel()
+        body_in, body_out = unbuffered_data_chunk_channel(auto_ack=auto_ack)
         self._req_body_in = body_in
         self._req_body_out = body_out
         self._req_body_fifo = trio.StrictFIFOLock()
@@ -47,64 +80,102 @@ class HTTP2StreamHandler:
     async def run(self, app: AppHandler) -> None:
         """Run application logic to respond to a request.
 
+        If the request needs to be admitted, this first waits for that.
+
         Raises:
+            AdmissionRefusedError: If the request is refused instead.
             Exception: Any error from the application handler. The stream is not
                 automatically reset when this happens.
         """
-        async with trio.open_nursery() as self._nursery:
-            req = HTTP2Request(
-                self._headers,
-                self._req_body_out,
-                self._trailers_out,
-            )
+        with self._cancel_scope:
+            try:
+                if self._admission and self._admission.queued:
+                    queued_at = trio.current_time()
+                    try:
+                        await self._admission.wait()
+                    finally:
+                        self._metrics.admission_wait.observe(
+                            trio.current_time() - queued_at
+                        )
+
+                await self._respond(app)
+
+            finally:
+                if self._admission:
+                    self._admission.release()
+
+    async def _respond(self, app: AppHandler) -> None:
+        req = HTTP2Request(
+            self._headers,
+            self._req_body_out,
+            self._trailers_out,
+        )
+
+        hooks = self._middleware.bind(req) if self._middleware else None
+        resp = HTTP2Response(
+            self.id,
+            self._state,
+            self._scheduler,
+            self._metrics,
+            self._tracer,
+            hooks,
+            self._headers,
+            self._start_push,
+        )
 
-            resp = HTTP2Response(
-                self.id,
-                self._state,
+        try:
+            await self._run_app(app, req, resp, hooks)
+        finally:
+            if hooks:
+                hooks.response_ended()
+
+        # In case the client fails to end the stream, make sure we do it.
+        if not resp.ended:
+            _logger.warning(
+                "Application did not properly end stream."
+                " Sending an empty DATA frame with the END_STREAM flag."
             )
+            async with self._state.use() as state:
+                state.end_stream(self.id)
+
+    async def _run_app(
+        self,
+        app: AppHandler,
+        req: HTTP2Request,
+        resp: HTTP2Response,
+        hooks: RequestHooks | None,
+    ) -> None:
+        # Close the body and trailers receive streams after the app returns.
+        async with self._req_body_out, self._trailers_out:
+            if self._tracer:
+                self._tracer.handler_started(trio.current_time())
 
-            # Close the body and trailers receive streams after the app returns.
-            async with self._req_body_out, self._trailers_out:
-                await app(req, resp)
+            if hooks and (status := hooks.request_started()) is not None:
+                await resp.headers(status, end_stream=True)
+                return
 
-            # In case the client fails to end the stream, make sure we do it.
-            if not resp.ended:
-                _logger.warning(
-                    "Application did not properly end stream."
-                    " Sending an empty DATA frame with the END_STREAM flag."
-                )
-                async with self._state.use() as state:
-                    state.end_stream(self.id)
+            await app(req, resp)
 
     def cancel(self) -> None:
         """Cancel the application logic for the stream."""
-        if not self._nursery:
-            return
-
-        self._nursery.cancel_scope.cancel()
+        self._cancel_scope.cancel()
 
     def push_data(self, data: bytes, flow_controlled_length: int) -> None:
         """Push a request body chunk to the app."""
-        assert self._nursery
-
-        ack_event = trio.Event()
-
-        async def handle_ack() -> None:
-            await ack_event.wait()
-            async with self._state.use() as state:
-                state.acknowledge_received_data(
-                    flow_controlled_length,
-                    self.id,
-                )
+        ack = DataChunkAck(
+            functools.partial(
+                self._acknowledger.acknowledge,
+                flow_controlled_length,
+                self.id,
+            )
+        )
 
         try:
-            self._req_body_in.send_nowait(DataChunk(data, ack_event))
-            self._nursery.start_soon(handle_ack)
+            self._req_body_in.send_nowait(DataChunk(data, ack))
         except trio.BrokenResourceError:
             # This means the handler will not read the rest of the body,
             # so we can simply ack the data.
-            ack_event.set()
-            return
+            ack.set()
 
     def push_trailers(self, trailers: Iterable[hpack.HeaderTuple]) -> None:
         """Push request trailers to the app."""
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import dataclasses
+import importlib
+import logging
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.process
+import signal
+import ssl
+import time
+from types import FrameType
+
+import trio
+
+from ._app_handler import AppHandler
+from ._server import serve
+
+_logger = logging.getLogger(__name__)
+
+
+# A worker that exits within this many seconds of starting is restarted
+# only after this delay, to avoid spinning on an app that fails to start.
+_RESTART_DELAY = 1.0
+
+# How long to wait for workers to exit after forwarding a shutdown signal
+# before killing them.
+_SHUTDOWN_TIMEOUT = 30.0
+
+# How long a worker lets in-flight requests finish after a shutdown signal.
+# This is shorter than _SHUTDOWN_TIMEOUT so that workers exit on their own.
+_DRAIN_TIMEOUT = 20.0
+
+
+@dataclasses.dataclass(frozen=True)
+class WorkerConfig:
+    """Everything a worker process needs to start serving."""
+
+    app: str
+    """The app handler, as "module:attribute"."""
+
+    host: str | None
+    port: int
+    certfile: str | None
+    keyfile: str | None
+    log_level: str = "INFO"
+
+
+def load_app(spec: str) -> AppHandler:
+    """Import an app handler given as "module:attribute".
+
+    Raises:
+        ValueError: If the spec is malformed.
+        ImportError: If the module cannot be imported.
+        AttributeError: If the module has no such attribute.
+    """
+    module_name, sep, attr = spec.partition(":")
+    if not sep or not module_name or not attr:
+        raise ValueError(
+            f"Expected an app of the form 'module:attribute'; got {spec!r}."
+        )
+
+    obj = importlib.import_module(module_name)
+    for name in attr.split("."):
+        obj = getattr(obj, name)
+
+    return obj  # type: ignore[return-value]
+
+
+def run_worker(config: WorkerConfig) -> None:
+    """Serve the app on a SO_REUSEPORT listener until SIGINT or SIGTERM.
+
+    On either signal, the server is drained so that requests in progress
+    can finish.
+    """
+    logging.basicConfig(level=config.log_level)
+    app = load_app(config.app)
+
+    ssl_context = None
+    if config.certfile:
+        ssl_context = ssl.create_default_context(purpose=ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(config.certfile, config.keyfile)
+        ssl_context.set_alpn_protocols(["h2"])
+
+    async def main() -> None:
+        with trio.open_signal_receiver(signal.SIGINT, signal.SIGTERM) as signals:
+            async with trio.open_nursery() as nursery:
+                server = await serve(
+                    nursery,
+                    app,
+                    host=config.host,
+                    port=config.port,
+                    ssl_context=ssl_context,
+                    reuse_port=True,
+                )
+
+                async for _ in signals:
+                    await server.drain(_DRAIN_TIMEOUT)
+                    break
+
+    trio.run(main)
+
+
+class Supervisor:
+    """Runs worker processes that share a port, restarting any that exit.
+
+    SIGINT and SIGTERM received by the supervisor are forwarded to the workers
+    as SIGTERM, after which the supervisor waits for them to exit.
+    """
+
+    def __init__(self, config: WorkerConfig, *, workers: int) -> None:
+        if workers < 1:
+            raise ValueError(f"At least one worker is required; got {workers}.")
+
+        self._config = config
+        self._workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: dict[int, multiprocessing.process.BaseProcess] = {}
+        self._started_at: dict[int, float] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        """Start the workers and supervise them until a shutdown signal."""
+        previous = {
+            signum: signal.signal(signum, self._handle_signal)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+        try:
+            for slot in range(self._workers):
+                self._start(slot)
+
+            while not self._stopping:
+                self._wait_and_restart()
+
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+            self._shut_down()
+
+    def _handle_signal(self, signum: int, frame: FrameType | None) -> None:
+        _logger.info("Received signal %d, shutting down workers.", signum)
+        self._stopping = True
+
+    def _start(self, slot: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(self._config,),
+            name=f"h2serve-worker-{slot}",
+        )
+        process.start()
+
+        self._processes[slot] = process
+        self._started_at[slot] = time.monotonic()
+        _logger.info("Started worker %d (pid %s).", slot, process.pid)
+
+    def _wait_and_restart(self) -> None:
+        # Wake up periodically so that signals are noticed promptly.
+        sentinels = {p.sentinel: slot for slot, p in self._processes.items()}
+        ready = multiprocessing.connection.wait(list(sentinels), timeout=0.5)
+
+        for sentinel in ready:
+            if self._stopping:
+                return
+
+            slot = sentinels[sentinel]  # type: ignore[index]
+            process = self._processes[slot]
+            process.join()
+            _logger.warning(
+                "Worker %d (pid %s) exited with code %s; restarting.",
+                slot,
+                process.pid,
+                process.exitcode,
+            )
+
+            if time.monotonic() - self._started_at[slot] < _RESTART_DELAY:
+                time.sleep(_RESTART_DELAY)
+            self._start(slot)
+
+    def _shut_down(self) -> None:
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + _SHUTDOWN_TIMEOUT
+        for slot, process in self._processes.items():
+            process.join(max(0, deadline - time.monotonic()))
+
+            if process.is_alive():
+                _logger.warning("Worker %d did not exit; killing it.", slot)
+                process.kill()
+                process.join()
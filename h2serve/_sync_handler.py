@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+from collections.abc import Iterable, Iterator
+from typing import Callable
+
+import trio
+
+from ._logging import ContextualLogger
+from ._request import Header, HTTP2Request
+from ._response import HTTP2Response
+
+_logger = ContextualLogger(logging.getLogger(__name__))
+
+SyncAppHandler = Callable[["SyncRequest", "SyncResponse"], None]
+"""A synchronous application handler, run in a worker thread."""
+
+# Buffer up to this much response data in the worker thread before handing it
+# to the event loop.
+DEFAULT_FLUSH_SIZE = 64 * 1024
+
+
+class SyncHandler:
+    """Adapts a synchronous handler into an `AppHandler`.
+
+    Each request runs the handler in a worker thread so that blocking or
+    CPU-bound work does not stall the event loop. At most `max_workers`
+    handlers run at a time. Requests that arrive while `max_queue` others are
+    already waiting for a worker get a 503 response without running the
+    handler. Worker threads still share the GIL with the event loop, so
+    pure-Python work slows it down, but no longer blocks it for the whole
+    duration of a handler.
+
+    Every interaction with the event loop is a thread hop, so they are
+    batched: reading the request body returns all chunks that have arrived
+    so far, and response data is buffered in the thread until `flush_size`
+    bytes accumulate, the handler calls `SyncResponse.flush`, or it returns.
+    A handler that builds its whole response at once needs no hops at all.
+    """
+
+    def __init__(
+        self,
+        handler: SyncAppHandler,
+        *,
+        max_workers: int = 10,
+        max_queue: int = 100,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+    ) -> None:
+        """Wrap a handler.
+
+        Args:
+            handler: The function to run for every request.
+            max_workers: The maximum number of handlers to run concurrently.
+            max_queue: The maximum number of requests waiting for a worker.
+            flush_size: The number of buffered response bytes after which
+                they are sent from the worker thread.
+        """
+        self._handler = handler
+        self._limiter = trio.CapacityLimiter(max_workers)
+        self._max_queue = max_queue
+        self._flush_size = flush_size
+
+    @property
+    def active(self) -> int:
+        """The number of handlers currently running in worker threads."""
+        return int(self._limiter.borrowed_tokens)
+
+    @property
+    def queued(self) -> int:
+        """The number of requests waiting for a worker thread."""
+        return self._limiter.statistics().tasks_waiting
+
+    async def __call__(self, req: HTTP2Request, resp: HTTP2Response) -> None:
+        """Handle a request by running the handler in a worker thread."""
+        if not self._limiter.available_tokens and self.queued >= self._max_queue:
+            await req.body.aclose()
+            await req.trailers.aclose()
+            await resp.headers(503, [(b"retry-after", b"1")], end_stream=True)
+            return
+
+        sync_req = SyncRequest(req)
+        sync_resp = SyncResponse(resp, flush_size=self._flush_size)
+
+        await trio.to_thread.run_sync(
+            self._handler,
+            sync_req,
+            sync_resp,
+            limiter=self._limiter,
+        )
+
+        await sync_resp.finish()
+
+
+class SyncRequest:
+    """An HTTP/2 request as seen by a `SyncAppHandler`.
+
+    Its methods may only be called from the handler's worker thread.
+    """
+
+    def __init__(self, req: HTTP2Request) -> None:
+        self._req = req
+        self.headers: list[Header] = req.headers
+        """The request headers."""
+
+    def iter_body(self) -> Iterator[bytes]:
+        """Iterate over request body chunks as they arrive.
+
+        Chunks are acknowledged as soon as they are handed to the thread.
+        """
+        while batch := trio.from_thread.run(self._receive_batch):
+            yield from batch
+
+    def read(self) -> bytes:
+        """Read the entire request body."""
+        return b"".join(self.iter_body())
+
+    def trailers(self) -> list[Header]:
+        """Read the request trailers, after the body has been read."""
+        return trio.from_thread.run(self._receive_trailers)
+
+    async def _receive_batch(self) -> list[bytes]:
+        """Wait for at least one chunk, then take all that are available."""
+        try:
+            chunk = await self._req.body.receive()
+        except (trio.EndOfChannel, trio.ClosedResourceError):
+            return []
+
+        chunk.ack.set()
+        batch = [chunk.data]
+
+        while True:
+            try:
+                chunk = self._req.body.receive_nowait()
+            except (trio.WouldBlock, trio.EndOfChannel):
+                return batch
+
+            chunk.ack.set()
+            batch.append(chunk.data)
+
+    async def _receive_trailers(self) -> list[Header]:
+        return [trailer async for trailer in self._req.trailers]
+
+
+@dataclasses.dataclass
+class _PendingWrites:
+    """Response operations buffered in a worker thread."""
+
+    headers: tuple[int, list[Header]] | None = None
+    body: list[bytes] = dataclasses.field(default_factory=list)
+    body_size: int = 0
+    trailers: list[Header] | None = None
+    end: bool = False
+
+    def is_empty(self) -> bool:
+        return not (self.headers or self.body or self.trailers is not None or self.end)
+
+
+class SyncResponse:
+    """An HTTP/2 response writer for a `SyncAppHandler`.
+
+    Writes are buffered and sent in batches. Except for `finish`, its methods
+    may only be called from the handler's worker thread.
+    """
+
+    def __init__(self, resp: HTTP2Response, *, flush_size: int) -> None:
+        self._resp = resp
+        self._flush_size = flush_size
+        self._pending = _PendingWrites()
+        self._headers_sent = False
+
+    def headers(self, status: int, headers: Iterable[tuple[bytes, bytes]]) -> None:
+        """Set the response status and headers. This must be called first."""
+        self._pending.headers = (status, list(headers))
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        """Append data to the response body."""
+        self._pending.body.append(bytes(data))
+        self._pending.body_size += len(data)
+
+        if self._pending.body_size >= self._flush_size:
+            self.flush()
+
+    def trailers(self, trailers: Iterable[tuple[bytes, bytes]]) -> None:
+        """Set response trailers, which ends the response."""
+        self._pending.trailers = list(trailers)
+        self._pending.end = True
+
+    def end(self) -> None:
+        """End the response.
+
+        This happens automatically when the handler returns.
+        """
+        self._pending.end = True
+
+    def flush(self) -> None:
+        """Send everything buffered so far, blocking until it is sent."""
+        if not self._pending.is_empty():
+            trio.from_thread.run(self._send, self._take())
+
+    async def finish(self) -> None:
+        """Send whatever is still buffered and end the response.
+
+        This is called from the event loop after the handler returns, so that
+        the remaining writes need no thread hop. If the handler never set a
+        status, a 500 response is sent.
+        """
+        pending = self._take()
+        pending.end = True
+
+        if not self._headers_sent and not pending.headers:
+            _logger.error("Sync handler returned without setting a status.")
+            pending = _PendingWrites(headers=(500, []), end=True)
+
+        await self._send(pending)
+
+    def _take(self) -> _PendingWrites:
+        pending, self._pending = self._pending, _PendingWrites()
+        return pending
+
+    async def _send(self, pending: _PendingWrites) -> None:
+        if self._resp.ended:
+            return
+
+        if not self._headers_sent and not pending.headers:
+            raise RuntimeError(
+                "SyncResponse.headers must be called before the response body."
+            )
+
+        end_body = pending.end and pending.trailers is None
+
+        if pending.headers:
+            self._headers_sent = True
+            status, headers = pending.headers
+            await self._resp.headers(
+                status,
+                headers,
+                end_stream=end_body and not pending.body,
+            )
+
+        if pending.body:
+            await self._resp.body(b"".join(pending.body), end_stream=end_body)
+
+        if pending.trailers is not None:
+            await self._resp.trailers(pending.trailers)
+        elif pending.end:
+            await self._resp.end()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Protocol
+
+from ._request import Header
+
+
+class Tracer(Protocol):
+    """Receives timing information about requests.
+
+    Pass a tracer to `serve` to break down where the time of each request
+    goes. All timestamps are in seconds from `trio.current_time`, which is
+    monotonic; only differences between them are meaningful.
+
+    Callbacks run on the event loop and must return quickly.
+    """
+
+    def start_stream(
+        self,
+        stream_id: int,
+        headers: list[Header],
+        received_at: float,
+    ) -> StreamTracer | None:
+        """Start tracing a request.
+
+        Args:
+            stream_id: The stream ID, which is unique within a connection.
+            headers: The request headers.
+            received_at: When the request headers were received.
+
+        Returns:
+            An object to receive the rest of the request's timings, or None
+            to not trace this request.
+        """
+
+
+class StreamTracer(Protocol):
+    """Receives timing information about a single request."""
+
+    def handler_started(self, at: float) -> None:
+        """Called when the application handler is invoked."""
+
+    def headers_sent(self, at: float) -> None:
+        """Called when the response headers have been queued for writing."""
+
+    def first_data_written(self, at: float) -> None:
+        """Called when the first DATA frame has been written to the socket."""
+
+    def stream_ended(self, at: float) -> None:
+        """Called when the handler is done and the stream is forgotten."""
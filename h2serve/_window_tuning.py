@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import itertools
+
+import h2.settings
+import trio
+
+from ._flow_control import ReceiveWindowAcknowledger
+from ._state import HTTP2State
+
+# Windows are grown to twice the bytes received in one round trip once those
+# bytes fill two thirds of the current window, as in gRPC's BDP estimator.
+_GROWTH_THRESHOLD = 2 / 3
+_GROWTH_FACTOR = 2
+
+# HTTP/2 windows may not exceed 2^31 - 1 bytes.
+_MAX_WINDOW = 2**31 - 1
+
+# Don't measure more than ten times a second.
+_PROBE_INTERVAL = 0.1
+
+
+class ReceiveWindowBudget:
+    """Memory shared by the autotuned receive windows of a server.
+
+    Each connection starts with its configured windows, which are not counted
+    against the budget. Growing a connection's window beyond that reserves
+    the difference. When a reservation cannot be satisfied, or when the budget
+    is lowered below what is reserved, the connections holding more than an
+    equal share of the budget are shrunk to that share.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes < 0:
+            raise ValueError(f"The budget must be nonnegative; got {max_bytes}.")
+
+        self._max_bytes = max_bytes
+        self._reserved = 0
+        self._reservations: dict[ReceiveWindowTuner, int] = {}
+
+    @property
+    def max_bytes(self) -> int:
+        """The number of bytes that may be reserved in total."""
+        return self._max_bytes
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        """Change the budget, shrinking connections if it is exceeded."""
+        if max_bytes < 0:
+            raise ValueError(f"The budget must be nonnegative; got {max_bytes}.")
+
+        self._max_bytes = max_bytes
+        if self._reserved > max_bytes:
+            self._relieve_pressure()
+
+    def register(self, tuner: ReceiveWindowTuner) -> None:
+        """Start tracking a connection with nothing reserved."""
+        self._reservations[tuner] = 0
+
+    def unregister(self, tuner: ReceiveWindowTuner) -> None:
+        """Release a connection's reservation."""
+        if tuner in self._reservations:
+            self._reserved -= self._reservations.pop(tuner)
+
+    def reserve(self, tuner: ReceiveWindowTuner, size: int) -> int:
+        """Try to grow a connection's reservation.
+
+        Args:
+            tuner: A registered connection.
+            size: The total number of bytes the connection wants reserved.
+
+        Returns:
+            The connection's new reservation. This is never less than its
+            current reservation, but may be less than requested.
+        """
+        current = self._reservations[tuner]
+        available = self._max_bytes - self._reserved + current
+        granted = min(size, available)
+
+        if granted < size:
+            self._relieve_pressure()
+
+        # Relieving pressure can shrink the requester too.
+        current = self._reservations[tuner]
+        if granted <= current:
+            return current
+
+        self._reserved += granted - current
+        self._reservations[tuner] = granted
+        return granted
+
+    def _relieve_pressure(self) -> None:
+        share = self._max_bytes // len(self._reservations)
+
+        for tuner, reservation in self._reservations.items():
+            if reservation > share:
+                self._reserved -= reservation - share
+                self._reservations[tuner] = share
+                tuner.shrink_to(share)
+
+
+class ReceiveWindowTuner:
+    """Grows a connection's receive windows toward its bandwidth-delay product.
+
+    While request data is flowing, the tuner periodically sends a PING and
+    counts the bytes received until it is acknowledged. If that fills most of
+    the current window, the window is what limits throughput, and both the
+    connection window and the initial stream window are grown to twice the
+    sample, within the server's budget.
+    """
+
+    def __init__(
+        self,
+        state: HTTP2State,
+        acknowledger: ReceiveWindowAcknowledger,
+        budget: ReceiveWindowBudget,
+    ) -> None:
+        self._state = state
+        self._acknowledger = acknowledger
+        self._budget = budget
+
+        self._base_stream_window = acknowledger.stream_window
+        self._base_conn_window = acknowledger.connection_window
+        self._reservation = 0
+        self._shrink_target: int | None = None
+
+        self._rtt: float | None = None
+        self._max_bandwidth = 0.0
+
+        self._ping_ids = itertools.count()
+        self._ping_data = b""
+        self._ping_acked = trio.Event()
+        self._probe_scope: trio.CancelScope | None = None
+        self._sample_start: float | None = None
+        self._sample = 0
+        self._next_probe = 0.0
+
+        self._wake = trio.Event()
+        self._closed = False
+
+    @property
+    def rtt(self) -> float | None:
+        """The smoothed round-trip time in seconds, if it has been measured."""
+        return self._rtt
+
+    def data_received(self, size: int) -> None:
+        """Count flow-controlled bytes received on the connection."""
+        if self._sample_start is None:
+            now = trio.current_time()
+            if now < self._next_probe:
+                return
+
+            self._sample_start = now
+            self._sample = 0
+            self._wake.set()
+
+        self._sample += size
+
+    def ping_acked(self, data: bytes) -> bool:
+        """Handle a PING acknowledgement.
+
+        Returns:
+            Whether the PING was sent by this tuner.
+        """
+        if not self._ping_data or data != self._ping_data:
+            return False
+
+        self._ping_data = b""
+        self._ping_acked.set()
+        return True
+
+    def shrink_to(self, reservation: int) -> None:
+        """Shrink the windows so that they use at most this much of the budget."""
+        self._shrink_target = reservation
+        self._wake.set()
+
+        # Don't wait for a PING that the peer may never acknowledge.
+        if self._probe_scope:
+            self._probe_scope.cancel()
+
+    def close(self) -> None:
+        """Stop tuning and make `run` return."""
+        self._closed = True
+        self._wake.set()
+        self._ping_acked.set()
+
+    async def run(self) -> None:
+        """Adjust the windows as needed, until closed."""
+        self._base_stream_window = self._acknowledger.stream_window
+        self._base_conn_window = self._acknowledger.connection_window
+        self._budget.register(self)
+
+        try:
+            while True:
+                await self._wake.wait()
+                if self._closed:
+                    return
+                self._wake = trio.Event()
+
+                if self._shrink_target is not None:
+                    self._reservation = self._shrink_target
+                    self._shrink_target = None
+                    await self._apply()
+
+                if self._sample_start is not None:
+                    await self._probe()
+
+        finally:
+            self._budget.unregister(self)
+
+    async def _probe(self) -> None:
+        self._ping_data = next(self._ping_ids).to_bytes(8, "big")
+        self._ping_acked = trio.Event()
+
+        sent_at = trio.current_time()
+        async with self._state.use() as state:
+            state.ping(self._ping_data)
+
+        with trio.CancelScope() as self._probe_scope:
+            await self._ping_acked.wait()
+        self._probe_scope = None
+
+        if self._closed:
+            return
+
+        if not self._ping_acked.is_set():
+            # Cancelled to shrink the windows. The sample is discarded.
+            self._ping_data = b""
+            self._sample_start = None
+            return
+
+        now = trio.current_time()
+        rtt = now - sent_at
+        sample = self._sample
+        self._sample_start = None
+        self._next_probe = now + _PROBE_INTERVAL
+
+        if self._rtt is None:
+            self._rtt = rtt
+        else:
+            self._rtt = 0.875 * self._rtt + 0.125 * rtt
+
+        bandwidth = sample / max(rtt, 1e-6)
+        if bandwidth <= self._max_bandwidth:
+            return
+        self._max_bandwidth = bandwidth
+
+        window = self._acknowledger.connection_window
+        if sample < _GROWTH_THRESHOLD * window or window >= _MAX_WINDOW:
+            return
+
+        target = min(_GROWTH_FACTOR * sample, _MAX_WINDOW)
+        reservation = self._budget.reserve(self, target - self._base_conn_window)
+        if reservation > self._reservation:
+            self._reservation = reservation
+            await self._apply()
+
+    async def _apply(self) -> None:
+        conn_window = self._base_conn_window + self._reservation
+        stream_window = max(self._base_stream_window, conn_window)
+        old_stream_window = self._acknowledger.stream_window
+
+        self._acknowledger.set_windows(stream_window, conn_window)
+
+        if stream_window != old_stream_window:
+            async with self._state.use() as state:
+                state.update_settings(
+                    {h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: stream_window}
+                )
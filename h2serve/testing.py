@@ -0,0 +1,330 @@
+"""Utilities for exercising an app without a network.
+
+`open_client` connects an `HTTP2Client` to an app through an in-memory
+stream. Requests go through the same connection handler, flow control and
+scheduling as with `serve`, but without sockets or TLS::
+
+    async with h2serve.testing.open_client(app) as client:
+        response = await client.request("GET", "/")
+        assert response.status == 200
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import functools
+from collections.abc import AsyncIterator, Iterable
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.settings
+import trio
+import trio.testing
+from h2.errors import ErrorCodes
+
+from ._admission import AdmissionController
+from ._app_handler import AppHandler
+from ._conn_handler import HTTP2ConnectionHandler
+from ._middleware import Middleware, MiddlewareChain
+from ._request import Header
+
+# Large windows so that the client never limits the app.
+_CLIENT_WINDOW = 2**24
+
+
+@dataclasses.dataclass(frozen=True)
+class Response:
+    """A complete HTTP/2 response."""
+
+    status: int
+    headers: list[Header]
+    """The response headers, excluding pseudo-headers."""
+
+    body: bytes
+    trailers: list[Header]
+
+    pushed: dict[bytes, Response] = dataclasses.field(default_factory=dict)
+    """Responses the server pushed with this one, by the promised path."""
+
+
+class StreamResetError(Exception):
+    """Raised when the server resets the stream of a request."""
+
+    def __init__(self, error_code: ErrorCodes | int) -> None:
+        """Create an error for a reset with the given error code."""
+        super().__init__(f"The stream was reset with {error_code!r}.")
+        self.error_code = error_code
+
+
+@dataclasses.dataclass
+class _PendingResponse:
+    done: trio.Event = dataclasses.field(default_factory=trio.Event)
+    headers: list[Header] = dataclasses.field(default_factory=list)
+    body: list[bytes] = dataclasses.field(default_factory=list)
+    trailers: list[Header] = dataclasses.field(default_factory=list)
+    reset: ErrorCodes | int | None = None
+    pushed: dict[bytes, _PendingResponse] = dataclasses.field(default_factory=dict)
+    pushed_stream_ids: list[int] = dataclasses.field(default_factory=list)
+
+
+class HTTP2Client:
+    """A minimal HTTP/2 client that multiplexes concurrent requests.
+
+    Use `open_client` to create one.
+    """
+
+    def __init__(
+        self,
+        stream: trio.abc.Stream,
+        *,
+        settings: dict[h2.settings.SettingCodes | int, int] | None = None,
+    ) -> None:
+        """Prepare a client to speak HTTP/2 over a stream.
+
+        Args:
+            stream: The stream to the server.
+            settings: HTTP/2 settings to send besides a large initial window.
+        """
+        self._stream = stream
+        self._settings = settings or {}
+        self._conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(header_encoding=None)
+        )
+        self._send_lock = trio.StrictFIFOLock()
+        self._pending: dict[int, _PendingResponse] = {}
+        self._window_changed = trio.Event()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        headers: Iterable[tuple[bytes, bytes]] = (),
+        body: bytes = b"",
+        trailers: Iterable[tuple[bytes, bytes]] = (),
+    ) -> Response:
+        """Send a request and wait for the full response.
+
+        Args:
+            method: The request method, like "GET".
+            path: The request path, including any query.
+            headers: Headers to send besides the pseudo-headers.
+            body: The request body.
+            trailers: Trailers to send after the body.
+
+        Returns:
+            The response, with any responses the server pushed with it.
+
+        Raises:
+            StreamResetError: If the server resets the stream.
+        """
+        trailers = list(trailers)
+
+        async with self._send_lock:
+            stream_id = self._conn.get_next_available_stream_id()
+            pending = _PendingResponse()
+            self._pending[stream_id] = pending
+
+            self._conn.send_headers(
+                stream_id,
+                [
+                    (b":method", method.encode()),
+                    (b":path", path.encode()),
+                    (b":authority", b"localhost"),
+                    (b":scheme", b"http"),
+                    *headers,
+                ],
+                end_stream=not body and not trailers,
+            )
+            await self._flush()
+
+        try:
+            await self._send_body(stream_id, memoryview(body), end=not trailers)
+
+            if trailers:
+                async with self._send_lock:
+                    self._conn.send_headers(stream_id, trailers, end_stream=True)
+                    await self._flush()
+
+            await pending.done.wait()
+
+            # Pushes are promised before the response ends.
+            for pushed in pending.pushed.values():
+                await pushed.done.wait()
+
+        finally:
+            del self._pending[stream_id]
+            for pushed_stream_id in pending.pushed_stream_ids:
+                del self._pending[pushed_stream_id]
+
+        return _to_response(pending)
+
+    async def _initiate(self) -> None:
+        self._conn.initiate_connection()
+        self._conn.update_settings(
+            {h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: _CLIENT_WINDOW}
+            | self._settings
+        )
+        self._conn.increment_flow_control_window(_CLIENT_WINDOW)
+        await self._flush()
+
+    async def _send_body(self, stream_id: int, data: memoryview, *, end: bool) -> None:
+        while data:
+            async with self._send_lock:
+                if self._pending[stream_id].done.is_set():
+                    return
+
+                window = min(
+                    self._conn.local_flow_control_window(stream_id),
+                    self._conn.max_outbound_frame_size,
+                )
+                if window > 0:
+                    self._conn.send_data(
+                        stream_id,
+                        data[:window],
+                        end_stream=end and window >= len(data),
+                    )
+                    data = data[window:]
+                    await self._flush()
+                    continue
+
+            await self._window_changed.wait()
+
+    async def _flush(self) -> None:
+        if data := self._conn.data_to_send():
+            await self._stream.send_all(data)
+
+    async def _loop_read(self) -> None:
+        while data := await self._stream.receive_some():
+            async with self._send_lock:
+                for event in self._conn.receive_data(data):
+                    self._process_event(event)
+                await self._flush()
+
+    def _process_event(self, event: h2.events.Event) -> None:
+        if isinstance(event, h2.events.DataReceived):
+            # Restore the windows even if nothing waits for the data.
+            self._conn.acknowledge_received_data(
+                event.flow_controlled_length,
+                event.stream_id,
+            )
+
+        if isinstance(
+            event,
+            (
+                h2.events.StreamReset,
+                h2.events.WindowUpdated,
+                h2.events.RemoteSettingsChanged,
+            ),
+        ):
+            self._notify_window_changed()
+
+        if isinstance(event, h2.events.PushedStreamReceived):
+            stream_id = event.parent_stream_id
+        else:
+            stream_id = getattr(event, "stream_id", None)
+
+        # Events for requests that were cancelled are ignored.
+        if pending := self._pending.get(stream_id):  # type: ignore[arg-type]
+            self._process_response_event(pending, event)
+
+    def _process_response_event(
+        self,
+        pending: _PendingResponse,
+        event: h2.events.Event,
+    ) -> None:
+        if isinstance(event, h2.events.ResponseReceived):
+            pending.headers.extend(event.headers)
+
+        elif isinstance(event, h2.events.PushedStreamReceived):
+            assert event.pushed_stream_id is not None
+            assert event.headers is not None
+            path = next(v for k, v in event.headers if k == b":path")
+            pushed = _PendingResponse()
+            pending.pushed[path] = pushed
+            pending.pushed_stream_ids.append(event.pushed_stream_id)
+            self._pending[event.pushed_stream_id] = pushed
+
+        elif isinstance(event, h2.events.DataReceived):
+            pending.body.append(event.data)
+
+        elif isinstance(event, h2.events.TrailersReceived):
+            pending.trailers.extend(event.headers)
+
+        elif isinstance(event, h2.events.StreamEnded):
+            pending.done.set()
+
+        elif isinstance(event, h2.events.StreamReset):
+            pending.reset = event.error_code
+            pending.done.set()
+
+    def _notify_window_changed(self) -> None:
+        self._window_changed.set()
+        self._window_changed = trio.Event()
+
+
+def _to_response(pending: _PendingResponse) -> Response:
+    if pending.reset is not None:
+        raise StreamResetError(pending.reset)
+
+    status = next(int(v) for k, v in pending.headers if k == b":status")
+    return Response(
+        status=status,
+        headers=[(k, v) for k, v in pending.headers if not k.startswith(b":")],
+        body=b"".join(pending.body),
+        trailers=pending.trailers,
+        pushed={path: _to_response(p) for path, p in pending.pushed.items()},
+    )
+
+
+@contextlib.asynccontextmanager
+async def open_client(
+    app: AppHandler,
+    *,
+    http2_settings: dict[h2.settings.SettingCodes | int, int] | None = None,
+    auto_ack: bool = False,
+    middleware: Iterable[Middleware] = (),
+    client_settings: dict[h2.settings.SettingCodes | int, int] | None = None,
+    admission: AdmissionController | None = None,
+) -> AsyncIterator[HTTP2Client]:
+    """Serve an app over an in-memory stream and connect a client to it.
+
+    The connection is closed when the context exits, cancelling any
+    handlers that are still running.
+
+    Args:
+        app: The application logic to run on every request.
+        http2_settings: Initial HTTP/2 settings for the server to send.
+        auto_ack: Whether to acknowledge request data as soon as the
+            application reads it.
+        middleware: Hooks to run around every request, in order.
+        client_settings: HTTP/2 settings for the client to send.
+        admission: Limits how many requests are handled at once.
+    """
+    client_stream, server_stream = trio.testing.memory_stream_pair()
+    handler = HTTP2ConnectionHandler(
+        server_stream,
+        app,
+        auto_ack=auto_ack,
+        middleware=MiddlewareChain(middleware) or None,
+        admission=admission,
+    )
+
+    async with client_stream, trio.open_nursery() as nursery:
+        nursery.start_soon(
+            functools.partial(
+                handler.handle_no_except,
+                initial_settings=http2_settings,
+            )
+        )
+
+        client = HTTP2Client(client_stream, settings=client_settings)
+        await client._initiate()
+        nursery.start_soon(client._loop_read)
+
+        try:
+            yield client
+        finally:
+            nursery.cancel_scope.cancel()
@@ -45,7 +45,9 @@ def start_test_server(nursery: trio.Nursery):
         app: The handler to run on the server.
         initiated: Whether to initiate the connection and handle the initial
             frames. Defaults to False.
+        cleartext: Whether to serve HTTP/2 without TLS. Defaults to False.
         http2_settings: Initial server HTTP/2 setting overrides.
+        **serve_kwargs: Other arguments to pass to `h2serve.serve`.
 
     Returns:
         An HTTP2Tester instance.
@@ -55,11 +57,13 @@ def start_test_server(nursery: trio.Nursery):
         app,
         *,
         initiated=False,
+        cleartext=False,
         http2_settings=None,
         ssl_server=None,
         ssl_client=None,
+        **serve_kwargs,
     ) -> http2tester.HTTP2Tester:
-        if not ssl_server:
+        if not ssl_server and not cleartext:
             ssl_server = ssl.create_default_context(purpose=ssl.Purpose.CLIENT_AUTH)
             ssl_server.load_cert_chain("localhost.pem")
             ssl_server.set_alpn_protocols(["h2"])
@@ -71,18 +75,24 @@ def start_test_server(nursery: trio.Nursery):
             port=0,
             ssl_context=ssl_server,
             http2_settings=http2_settings,
+            **serve_kwargs,
         )
 
-        if not ssl_client:
-            ssl_client = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
-            ssl_client.load_verify_locations("localhost.pem")
-            ssl_client.set_alpn_protocols(["h2"])
-
-        stream = await trio.open_ssl_over_tcp_stream(
-            "localhost",
-            server.localhost_port,
-            ssl_context=ssl_client,
-        )
+        stream: trio.abc.Stream
+        if cleartext:
+            stream = await trio.open_tcp_stream("localhost", server.localhost_port)
+
+        else:
+            if not ssl_client:
+                ssl_client = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
+                ssl_client.load_verify_locations("localhost.pem")
+                ssl_client.set_alpn_protocols(["h2"])
+
+            stream = await trio.open_ssl_over_tcp_stream(
+                "localhost",
+                server.localhost_port,
+                ssl_context=ssl_client,
+            )
 
         tester = http2tester.HTTP2Tester(server, stream)
 
@@ -29,12 +29,16 @@ class HTTP2Tester:
     def __init__(
         self,
         server: h2serve.Server,
-        stream: trio.SSLStream,
+        stream: trio.abc.Stream,
     ) -> None:
         self._server = server
         self.stream = stream
         self._conn = h2.connection.H2Connection()
 
+    @property
+    def server(self) -> h2serve.Server:
+        return self._server
+
     async def expect(self, frame_type: type[_FrameType]) -> _FrameType:
         """Assert that the next HTTP/2 frame has a given type.
 
@@ -66,8 +70,11 @@ class HTTP2Tester:
             body = await self._receive_exactly(body_len)
             frame.parse_body(memoryview(body))
 
-            self._conn.receive_data(header + body)
-            await self._flush()
+            # h2 rejects every frame after a GOAWAY, but a server that is
+            # draining still finishes the streams that are already open.
+            if not isinstance(frame, hyperframe.frame.GoAwayFrame):
+                self._conn.receive_data(header + body)
+                await self._flush()
 
             return frame
 
@@ -114,6 +121,14 @@ class HTTP2Tester:
         self._conn.acknowledge_received_data(acknowledged_size, stream_id)
         await self._flush()
 
+    async def increment_flow_control_window(
+        self,
+        increment: int,
+        stream_id: int | None = None,
+    ) -> None:
+        self._conn.increment_flow_control_window(increment, stream_id)
+        await self._flush()
+
     async def start_request(
         self,
         method: str,
@@ -0,0 +1,218 @@
+import functools
+
+import hyperframe.frame
+import pytest
+import trio
+import trio.testing
+from h2.errors import ErrorCodes
+
+import h2serve
+import h2serve.testing
+
+from .http2tester import HTTP2Tester
+
+
+def _priority(headers: list[h2serve.Header]) -> int:
+    return int(dict(headers).get(b"x-priority", b"0"))
+
+
+class _App:
+    """Records the paths it handles, and blocks on `/slow` until released."""
+
+    def __init__(self) -> None:
+        self.release = trio.Event()
+        self.handled: list[bytes] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(
+        self,
+        req: h2serve.HTTP2Request,
+        resp: h2serve.HTTP2Response,
+    ) -> None:
+        path = dict(req.headers)[b":path"]
+        self.handled.append(path)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if path == b"/slow":
+                await self.release.wait()
+            await resp.headers(200, end_stream=True)
+        finally:
+            self.running -= 1
+
+
+async def test_limits_concurrent_handlers() -> None:
+    app = _App()
+    admission = h2serve.AdmissionController(2, max_queue=10)
+    statuses: list[int] = []
+
+    async def request(client: h2serve.testing.HTTP2Client) -> None:
+        statuses.append((await client.request("GET", "/slow")).status)
+
+    async with h2serve.testing.open_client(app, admission=admission) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            for _ in range(5):
+                nursery.start_soon(request, client)
+            await trio.testing.wait_all_tasks_blocked()
+
+            assert admission.active == 2
+            assert admission.queued == 3
+            app.release.set()
+
+    assert statuses == [200] * 5
+    assert app.max_running == 2
+    assert admission.active == 0
+
+
+async def test_refuses_when_queue_is_full() -> None:
+    app = _App()
+    admission = h2serve.AdmissionController(1)
+
+    async with h2serve.testing.open_client(app, admission=admission) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(client.request, "GET", "/slow")
+            await trio.testing.wait_all_tasks_blocked()
+
+            with pytest.raises(h2serve.testing.StreamResetError) as e:
+                await client.request("GET", "/")
+            app.release.set()
+
+        # The refused request did not use up the slot.
+        assert (await client.request("GET", "/")).status == 200
+
+    assert e.value.error_code == ErrorCodes.REFUSED_STREAM
+    assert app.handled == [b"/slow", b"/"]
+
+
+async def test_admits_by_priority_class() -> None:
+    app = _App()
+    admission = h2serve.AdmissionController(
+        1,
+        max_queue=3,
+        priority_class=_priority,
+    )
+
+    async with h2serve.testing.open_client(app, admission=admission) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(client.request, "GET", "/slow")
+            await trio.testing.wait_all_tasks_blocked()
+
+            for path, priority in (("/low1", b"1"), ("/low2", b"1"), ("/high", b"0")):
+                nursery.start_soon(
+                    functools.partial(
+                        client.request,
+                        "GET",
+                        path,
+                        headers=[(b"x-priority", priority)],
+                    )
+                )
+                await trio.testing.wait_all_tasks_blocked()
+
+            app.release.set()
+
+    assert app.handled == [b"/slow", b"/high", b"/low1", b"/low2"]
+
+
+async def test_displaces_lower_priority_requests() -> None:
+    app = _App()
+    admission = h2serve.AdmissionController(
+        1,
+        max_queue=1,
+        priority_class=_priority,
+    )
+    refused: list[str] = []
+
+    async def request(
+        client: h2serve.testing.HTTP2Client,
+        path: str,
+        priority: bytes,
+    ) -> None:
+        try:
+            await client.request("GET", path, headers=[(b"x-priority", priority)])
+        except h2serve.testing.StreamResetError as e:
+            if e.error_code == ErrorCodes.REFUSED_STREAM:
+                refused.append(path)
+
+    async with h2serve.testing.open_client(app, admission=admission) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(client.request, "GET", "/slow")
+            await trio.testing.wait_all_tasks_blocked()
+
+            for path, priority in (("/low", b"1"), ("/high", b"0"), ("/low2", b"1")):
+                nursery.start_soon(request, client, path, priority)
+                await trio.testing.wait_all_tasks_blocked()
+
+            app.release.set()
+
+    assert refused == ["/low", "/low2"]
+    assert app.handled == [b"/slow", b"/high"]
+
+
+async def test_refuses_after_queue_timeout() -> None:
+    app = _App()
+    admission = h2serve.AdmissionController(1, max_queue=1, queue_timeout=0.01)
+
+    async with h2serve.testing.open_client(app, admission=admission) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(client.request, "GET", "/slow")
+            await trio.testing.wait_all_tasks_blocked()
+
+            with pytest.raises(h2serve.testing.StreamResetError) as e:
+                await client.request("GET", "/")
+            app.release.set()
+
+    assert e.value.error_code == ErrorCodes.REFUSED_STREAM
+    assert admission.queued == 0
+    assert app.handled == [b"/slow"]
+
+
+async def test_forgets_priority_of_refused_streams(start_test_server) -> None:
+    app = _App()
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        admission=h2serve.AdmissionController(1),
+    )
+    priority = [("priority", "u=1")]
+
+    slow_id = await tester.start_request(
+        "GET", "/slow", extra_headers=priority, end_stream=True
+    )
+    refused_id = await tester.start_request(
+        "GET", "/", extra_headers=priority, end_stream=True
+    )
+    reset = await tester.expect(hyperframe.frame.RstStreamFrame)
+    assert reset.stream_id == refused_id
+
+    (conn,) = tester.server._connections
+    assert list(conn._scheduler._priorities) == [slow_id]
+
+    app.release.set()
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await trio.testing.wait_all_tasks_blocked()
+
+    assert conn._scheduler._priorities == {}
+
+
+async def test_measures_admission_wait(start_test_server) -> None:
+    app = _App()
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        admission=h2serve.AdmissionController(1, max_queue=1),
+    )
+
+    await tester.start_request("GET", "/slow", end_stream=True)
+    await tester.start_request("GET", "/", end_stream=True)
+    await tester.ping_and_expect_pong()
+    await trio.sleep(0.05)
+    app.release.set()
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await trio.testing.wait_all_tasks_blocked()
+
+    # The first request was admitted at once and is not counted.
+    wait = tester.server.metrics().admission_wait
+    assert wait.count == 1
+    assert wait.sum >= 0.05
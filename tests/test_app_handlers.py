@@ -1,7 +1,10 @@
+import h2.errors
 import hyperframe.frame
 import trio
+import trio.testing
 
 import h2serve
+import h2serve.testing
 
 from .http2tester import HTTP2Tester
 
@@ -52,6 +55,25 @@ async def test_passes_request_to_app(start_test_server) -> None:
     assert received_req_trailers == [(b"x_test_trailer", b"321")]
 
 
+async def test_waits_for_chunk_acks() -> None:
+    async def app(req, resp):
+        chunk = await req.body.receive()
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(chunk.ack.wait)
+            await trio.testing.wait_all_tasks_blocked()
+            chunk.ack.set()
+
+        # Waiting again returns at once.
+        await chunk.ack.wait()
+        await req.body.aclose()
+        await resp.headers(200 if chunk.ack.is_set() else 500, end_stream=True)
+
+    async with h2serve.testing.open_client(app) as client:
+        response = await client.request("POST", "/", body=b"data")
+
+    assert response.status == 200
+
+
 async def test_response_before_receiving_full_request(start_test_server) -> None:
     async def app(req, resp):
         await req.body.aclose()
@@ -139,3 +161,76 @@ async def test_resets_stream_on_app_exception(
 
     # Expect we can still use the connection.
     await tester.ping_and_expect_pong()
+
+
+async def test_reads_whole_body(start_test_server) -> None:
+    bodies: list[bytearray] = []
+
+    async def app(req, resp):
+        bodies.append(await req.read(max_bytes=100))
+        await resp.headers(200, headers=[], end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+
+    for extra_headers in ([], [("content-length", "10")]):
+        stream_id = await tester.start_request(
+            "POST",
+            "/",
+            extra_headers=extra_headers,
+            end_stream=False,
+        )
+        await tester.send_data(stream_id, b"01234", end_stream=False)
+        await tester.send_data(stream_id, b"56789", end_stream=True)
+        await tester.expect(hyperframe.frame.HeadersFrame)
+
+    assert bodies == [b"0123456789", b"0123456789"]
+
+
+async def test_reads_body_into_buffer(start_test_server) -> None:
+    buffer = bytearray(16)
+    length = 0
+
+    async def app(req, resp):
+        nonlocal length
+        length = await req.readinto(buffer)
+        await resp.headers(200, headers=[], end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+
+    stream_id = await tester.start_request("POST", "/", end_stream=False)
+    await tester.send_data(stream_id, b"testing", end_stream=True)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+
+    assert buffer[:length] == b"testing"
+
+
+async def test_resets_stream_if_body_too_large(start_test_server) -> None:
+    async def app(req, resp):
+        await req.read(max_bytes=4)
+        await resp.headers(200, headers=[], end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+
+    stream_id = await tester.start_request("POST", "/", end_stream=False)
+    await tester.send_data(stream_id, b"too large", end_stream=True)
+    reset = await tester.expect(hyperframe.frame.RstStreamFrame)
+
+    assert reset.error_code == h2.errors.ErrorCodes.CANCEL
+
+
+async def test_rejects_large_content_length_early(start_test_server) -> None:
+    async def app(req, resp):
+        await req.read(max_bytes=4)
+        await resp.headers(200, headers=[], end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+
+    await tester.start_request(
+        "POST",
+        "/",
+        extra_headers=[("content-length", "1000000")],
+        end_stream=False,
+    )
+    reset = await tester.expect(hyperframe.frame.RstStreamFrame)
+
+    assert reset.error_code == h2.errors.ErrorCodes.CANCEL
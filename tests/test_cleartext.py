@@ -0,0 +1,41 @@
+import hyperframe.frame
+
+from .http2tester import HTTP2Tester
+
+
+async def test_serves_prior_knowledge_connection(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=False)
+        await resp.body(b"hello", end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        cleartext=True,
+    )
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    body = await tester.expect(hyperframe.frame.DataFrame)
+    assert body.data == b"hello"
+
+
+async def test_fails_without_preface(
+    start_test_server,
+    caplog,
+    expect_soon,
+) -> None:
+    async def app(req, resp):
+        pass
+
+    tester: HTTP2Tester = await start_test_server(app, cleartext=True)
+
+    await tester.stream.send_all(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+
+    # Check that the server closes the connection and logs an error.
+    assert not await tester.stream.receive_some()
+
+    def assert_message():
+        assert "Invalid HTTP/2 connection preface." in caplog.text
+
+    await expect_soon(assert_message)
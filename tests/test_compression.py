@@ -0,0 +1,157 @@
+import gzip
+import zlib
+
+import pytest
+
+import h2serve
+import h2serve.testing
+from h2serve._compression import negotiate_encoding
+
+_TEXT = b"hello world, " * 1000
+
+
+def _app(cache: h2serve.CompressionCache | None = None) -> h2serve.AppHandler:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        compressed = h2serve.CompressedResponse(req, resp, cache=cache)
+        path = dict(req.headers)[b":path"]
+
+        if path == b"/image":
+            await compressed.headers(200, [(b"content-type", b"image/png")])
+            await compressed.body(_TEXT, end_stream=True)
+
+        elif path == b"/small":
+            await compressed.headers(200, [(b"content-type", b"text/plain")])
+            await compressed.body(b"hi", end_stream=True)
+
+        elif path == b"/stream":
+            await compressed.headers(200, [(b"content-type", b"text/plain")])
+            for chunk in (_TEXT, _TEXT * 10, b"!"):
+                await compressed.body(chunk)
+            await compressed.end()
+
+        else:
+            await compressed.headers(
+                200,
+                [
+                    (b"content-type", b"text/css"),
+                    (b"content-length", str(len(_TEXT)).encode()),
+                    (b"etag", b'"v1"'),
+                ],
+            )
+            await compressed.body(_TEXT, end_stream=True, cache_key=path)
+
+    return app
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        (None, None),
+        (b"gzip, deflate, br", "gzip"),
+        (b"deflate", "deflate"),
+        (b"gzip;q=0.5, deflate", "deflate"),
+        (b"gzip;q=0", None),
+        (b"*", "gzip"),
+        (b"br", None),
+        (b"identity;q=1, gzip;q=0.5", None),
+    ],
+)
+def test_negotiates_encoding(accept_encoding, expected) -> None:
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+async def test_compresses_with_gzip() -> None:
+    async with h2serve.testing.open_client(_app()) as client:
+        response = await client.request(
+            "GET",
+            "/style.css",
+            headers=[(b"accept-encoding", b"gzip")],
+        )
+
+    headers = dict(response.headers)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"accept-encoding"
+    assert headers[b"etag"] == b'W/"v1"'
+    assert b"content-length" not in headers
+    assert gzip.decompress(response.body) == _TEXT
+
+
+async def test_pushes_through_compressed_responses() -> None:
+    styles = _app()
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        if dict(req.headers)[b":path"] != b"/":
+            await styles(req, resp)
+            return
+
+        compressed = h2serve.CompressedResponse(req, resp)
+        await compressed.push("/style.css", [(b"accept-encoding", b"gzip")])
+        await compressed.headers(200, [(b"content-type", b"text/html")])
+        await compressed.body(b"<link rel=stylesheet href=/style.css>", end_stream=True)
+
+    async with h2serve.testing.open_client(app) as client:
+        response = await client.request("GET", "/")
+
+    pushed = response.pushed[b"/style.css"]
+    assert dict(pushed.headers)[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(pushed.body) == _TEXT
+
+
+async def test_streams_with_deflate() -> None:
+    async with h2serve.testing.open_client(_app()) as client:
+        response = await client.request(
+            "GET",
+            "/stream",
+            headers=[(b"accept-encoding", b"deflate")],
+        )
+
+    assert dict(response.headers)[b"content-encoding"] == b"deflate"
+    assert zlib.decompress(response.body) == _TEXT + _TEXT * 10 + b"!"
+
+
+@pytest.mark.parametrize(
+    ("path", "accept_encoding"),
+    [
+        ("/style.css", b"identity"),
+        ("/image", b"gzip"),
+        ("/small", b"gzip"),
+    ],
+)
+async def test_sends_uncompressed(path, accept_encoding) -> None:
+    async with h2serve.testing.open_client(_app()) as client:
+        response = await client.request(
+            "GET",
+            path,
+            headers=[(b"accept-encoding", accept_encoding)],
+        )
+
+    assert b"content-encoding" not in dict(response.headers)
+
+
+async def test_caches_compressed_payloads() -> None:
+    cache = h2serve.CompressionCache()
+
+    async with h2serve.testing.open_client(_app(cache)) as client:
+        for _ in range(3):
+            response = await client.request(
+                "GET",
+                "/style.css",
+                headers=[(b"accept-encoding", b"gzip")],
+            )
+            assert gzip.decompress(response.body) == _TEXT
+
+    assert (cache.misses, cache.hits) == (1, 2)
+    assert cache.size == len(response.body)
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache = h2serve.CompressionCache(max_bytes=10)
+    cache.put("a", "gzip", b"x" * 4)
+    cache.put("b", "gzip", b"x" * 4)
+    assert cache.get("a", "gzip")
+
+    cache.put("c", "gzip", b"x" * 4)
+
+    assert cache.get("a", "gzip")
+    assert cache.get("b", "gzip") is None
+    assert cache.size == 8
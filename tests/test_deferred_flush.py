@@ -0,0 +1,55 @@
+import hyperframe.frame
+from h2.settings import SettingCodes
+
+from .http2tester import HTTP2Tester
+
+
+async def test_sends_full_response(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=False)
+        await resp.body(b"abc")
+        await resp.body(b"def")
+        await resp.trailers([("x-trailer", "1")])
+
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        deferred_flush=True,
+    )
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    body1 = await tester.expect(hyperframe.frame.DataFrame)
+    body2 = await tester.expect(hyperframe.frame.DataFrame)
+    trailers = await tester.expect(hyperframe.frame.HeadersFrame)
+
+    assert body1.data == b"abc"
+    assert body2.data == b"def"
+    assert "END_STREAM" in trailers.flags
+
+    await tester.ping_and_expect_pong()
+
+
+async def test_respects_flow_control(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=False)
+        await resp.body(b"1234567890", end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        deferred_flush=True,
+    )
+    await tester.update_settings({SettingCodes.INITIAL_WINDOW_SIZE: 5})
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.SettingsFrame)  # settings ack
+    await tester.expect(hyperframe.frame.HeadersFrame)  # response start
+
+    body1 = await tester.expect(hyperframe.frame.DataFrame)
+    assert body1.data == b"12345"
+
+    await tester.acknowledge_received_data(5, body1.stream_id)
+    body2 = await tester.expect(hyperframe.frame.DataFrame)
+    assert body2.data == b"67890"
+    assert "END_STREAM" in body2.flags
@@ -0,0 +1,83 @@
+import hyperframe.frame
+import pytest
+import trio
+import trio.testing
+from h2.errors import ErrorCodes
+
+import h2serve
+
+from .http2tester import HTTP2Tester
+
+
+@pytest.mark.parametrize("deferred_flush", [False, True])
+async def test_finishes_open_streams(start_test_server, deferred_flush) -> None:
+    release = trio.Event()
+    results: list[h2serve.DrainResult] = []
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await release.wait()
+        await resp.headers(200, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        deferred_flush=deferred_flush,
+    )
+    stream_id = await tester.start_request("GET", "/", end_stream=True)
+    await tester.ping_and_expect_pong()
+
+    async def drain() -> None:
+        results.append(await tester.server.drain(5))
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(drain)
+
+        goaway = await tester.expect(hyperframe.frame.GoAwayFrame)
+        assert goaway.last_stream_id == stream_id
+        assert goaway.error_code == ErrorCodes.NO_ERROR
+
+        # Streams the client opens after the GOAWAY are refused.
+        late_id = await tester.start_request("GET", "/", end_stream=True)
+        reset = await tester.expect(hyperframe.frame.RstStreamFrame)
+        assert reset.stream_id == late_id
+        assert reset.error_code == ErrorCodes.REFUSED_STREAM
+
+        release.set()
+        headers = await tester.expect(hyperframe.frame.HeadersFrame)
+        assert headers.stream_id == stream_id
+
+    assert results == [h2serve.DrainResult(completed=1, cancelled=0)]
+    assert await tester.stream.receive_some() == b""
+
+
+async def test_cancels_streams_after_timeout(start_test_server) -> None:
+    cancelled = trio.Event()
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        try:
+            await trio.sleep_forever()
+        finally:
+            cancelled.set()
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+    await tester.ping_and_expect_pong()
+
+    result = await tester.server.drain(0.01)
+
+    assert result == h2serve.DrainResult(completed=0, cancelled=1)
+    assert cancelled.is_set()
+
+
+async def test_stops_accepting_connections(start_test_server) -> None:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await resp.headers(200, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True, cleartext=True)
+    port = tester.server.localhost_port
+
+    result = await tester.server.drain(1)
+
+    assert result == h2serve.DrainResult(completed=0, cancelled=0)
+    with pytest.raises(OSError):  # noqa: PT011
+        await trio.open_tcp_stream("localhost", port)
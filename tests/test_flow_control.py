@@ -1,6 +1,12 @@
 import hyperframe.frame
+import trio
 from h2.settings import SettingCodes
 
+from h2serve._flow_control import ReceiveWindowAcknowledger
+from h2serve._notifying_channel import notifying_channel
+from h2serve._state import HTTP2State
+from h2serve._window_tuning import ReceiveWindowBudget
+
 from .http2tester import HTTP2Tester
 
 
@@ -49,3 +55,221 @@ async def test_respects_flow_control(start_test_server) -> None:
     body3 = await tester.expect(hyperframe.frame.DataFrame)
     assert body3.data == b"890"
     assert "END_STREAM" in body3.flags
+
+
+async def test_window_update_wakes_blocked_stream(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=False)
+        await resp.body(b"1234567890", end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.update_settings({SettingCodes.INITIAL_WINDOW_SIZE: 5})
+    await tester.expect(hyperframe.frame.SettingsFrame)  # settings ack
+
+    stream1 = await tester.start_request("GET", "/", end_stream=True)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await tester.expect(hyperframe.frame.DataFrame)
+
+    stream2 = await tester.start_request("GET", "/", end_stream=True)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await tester.expect(hyperframe.frame.DataFrame)
+
+    # Only the updated stream may continue.
+    await tester.increment_flow_control_window(5, stream2)
+    body = await tester.expect(hyperframe.frame.DataFrame)
+    assert body.stream_id == stream2
+    assert "END_STREAM" in body.flags
+    await tester.ping_and_expect_pong()
+
+    await tester.increment_flow_control_window(5, stream1)
+    body = await tester.expect(hyperframe.frame.DataFrame)
+    assert body.stream_id == stream1
+    assert "END_STREAM" in body.flags
+
+
+async def test_respects_connection_flow_control(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=False)
+        await resp.body(b"x" * 70000, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.update_settings({SettingCodes.INITIAL_WINDOW_SIZE: 100000})
+    await tester.expect(hyperframe.frame.SettingsFrame)  # settings ack
+
+    await tester.start_request("GET", "/", end_stream=True)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+
+    # The default connection window is 65535 bytes.
+    received = 0
+    while received < 65535:
+        received += len((await tester.expect(hyperframe.frame.DataFrame)).data)
+    assert received == 65535
+    await tester.ping_and_expect_pong()
+
+    await tester.increment_flow_control_window(70000 - 65535)
+    body = await tester.expect(hyperframe.frame.DataFrame)
+    assert len(body.data) == 70000 - 65535
+    assert "END_STREAM" in body.flags
+
+
+async def _start_with_window(start_test_server, app, window: int, **kwargs):
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        http2_settings={SettingCodes.INITIAL_WINDOW_SIZE: window},
+        **kwargs,
+    )
+    await tester.initiate_connection()
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Server defaults
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Server overrides
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Client ack
+    return tester
+
+
+async def test_coalesces_window_updates(start_test_server) -> None:
+    async def app(req, resp):
+        async for chunk in req.body:
+            chunk.ack.set()
+
+        await resp.headers(200, headers=[], end_stream=True)
+
+    tester = await _start_with_window(start_test_server, app, 100)
+
+    stream_id = await tester.start_request("POST", "/", end_stream=False)
+    for _ in range(4):
+        await tester.send_data(stream_id, b"x" * 10, end_stream=False)
+
+    # Less than half of the window is acknowledged so far.
+    await tester.ping_and_expect_pong()
+
+    await tester.send_data(stream_id, b"x" * 10, end_stream=False)
+    update = await tester.expect(hyperframe.frame.WindowUpdateFrame)
+    assert update.stream_id == stream_id
+    assert update.window_increment == 50
+
+    await tester.end_stream(stream_id)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+
+
+async def test_auto_ack(start_test_server) -> None:
+    async def app(req, resp):
+        async for _ in req.body:
+            pass
+
+        await resp.headers(200, headers=[], end_stream=True)
+
+    tester = await _start_with_window(start_test_server, app, 100, auto_ack=True)
+
+    stream_id = await tester.start_request("POST", "/", end_stream=False)
+    await tester.send_data(stream_id, b"x" * 60, end_stream=False)
+
+    update = await tester.expect(hyperframe.frame.WindowUpdateFrame)
+    assert update.stream_id == stream_id
+    assert update.window_increment == 60
+
+
+def test_ignores_stream_acks_after_forget() -> None:
+    out, _ = notifying_channel(1)
+    acknowledger = ReceiveWindowAcknowledger(
+        HTTP2State(out),
+        stream_window=100,
+        ratio=0.5,
+    )
+    acknowledger.track(1)
+    acknowledger.acknowledge(10, 1)
+    acknowledger.forget(1)
+
+    # For example, the app acknowledges a chunk after its handler returned.
+    acknowledger.acknowledge(60, 1)
+
+    assert acknowledger._stream_pending == {}
+
+
+class _FakeTuner:
+    def __init__(self) -> None:
+        self.shrunk_to: int | None = None
+
+    def shrink_to(self, reservation: int) -> None:
+        self.shrunk_to = reservation
+
+
+def test_window_budget_shares_memory() -> None:
+    budget = ReceiveWindowBudget(100)
+    tuner1 = _FakeTuner()
+    tuner2 = _FakeTuner()
+    budget.register(tuner1)
+    budget.register(tuner2)
+
+    assert budget.reserve(tuner1, 80) == 80
+    assert budget.reserve(tuner2, 40) == 20
+
+    # The second request could not be satisfied, so the first connection
+    # is shrunk to half the budget.
+    assert tuner1.shrunk_to == 50
+    assert tuner2.shrunk_to is None
+    assert budget.reserve(tuner2, 40) == 40
+
+    budget.set_max_bytes(60)
+    assert tuner1.shrunk_to == 30
+    assert tuner2.shrunk_to == 30
+
+
+async def test_autotunes_receive_windows(start_test_server) -> None:
+    async def app(req, resp):
+        await trio.sleep_forever()
+
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        receive_window_budget=2**20,
+    )
+
+    stream_id = await tester.start_request("POST", "/", end_stream=False)
+    for _ in range(4):
+        await tester.send_data(stream_id, b"x" * 12000, end_stream=False)
+
+    # The client acknowledges the PING after sending the data, so the
+    # server sees 48000 bytes, most of its 65535 byte window, in one RTT.
+    await tester.expect(hyperframe.frame.PingFrame)
+    settings = await tester.expect(hyperframe.frame.SettingsFrame)
+    assert settings.settings[SettingCodes.INITIAL_WINDOW_SIZE] == 96000
+
+    [info] = tester.server.connections()
+    assert info.stream_receive_window == 96000
+    assert info.connection_receive_window == 96000
+    assert info.rtt is not None
+
+    tester.server.set_receive_window_budget(0)
+    settings = await tester.expect(hyperframe.frame.SettingsFrame)
+    assert settings.settings[SettingCodes.INITIAL_WINDOW_SIZE] == 65535
+
+    [info] = tester.server.connections()
+    assert info.connection_receive_window == 65535
+
+
+async def test_shrinks_while_ping_is_unacknowledged(start_test_server) -> None:
+    async def app(req, resp):
+        await trio.sleep_forever()
+
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        receive_window_budget=2**20,
+    )
+
+    stream_id = await tester.start_request("POST", "/", end_stream=False)
+    for _ in range(4):
+        await tester.send_data(stream_id, b"x" * 12000, end_stream=False)
+    await tester.expect(hyperframe.frame.PingFrame)
+    await tester.expect(hyperframe.frame.SettingsFrame)
+
+    # Start another measurement, and read its PING without passing it to h2
+    # so that it is never acknowledged.
+    await trio.sleep(0.1)
+    await tester.send_data(stream_id, b"x", end_stream=False)
+    ping = hyperframe.frame.PingFrame(0, b"\0" * 7 + b"\1").serialize()
+    with trio.fail_after(1):
+        assert await tester.stream.receive_some(len(ping)) == ping
+
+    tester.server.set_receive_window_budget(0)
+    settings = await tester.expect(hyperframe.frame.SettingsFrame)
+    assert settings.settings[SettingCodes.INITIAL_WINDOW_SIZE] == 65535
@@ -0,0 +1,96 @@
+import h2.settings
+import hpack
+import hyperframe.frame
+import pytest
+
+import h2serve
+import h2serve.testing
+
+from .http2tester import HTTP2Tester
+
+_PREPARED = h2serve.PreparedHeaders(
+    [
+        (b"Content-Type", b"text/plain"),
+        (b"cache-control", b"no-store"),
+    ]
+)
+
+
+async def test_sends_prepared_headers() -> None:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        path = dict(req.headers)[b":path"]
+        if path == b"/extra":
+            await resp.headers(
+                200,
+                [(b"x-extra", b"1")],
+                prepared=_PREPARED,
+                end_stream=True,
+            )
+        else:
+            await resp.headers(int(path[1:]), prepared=_PREPARED, end_stream=True)
+
+    async with h2serve.testing.open_client(app) as client:
+        not_found = await client.request("GET", "/404")
+        ok = await client.request("GET", "/200")
+        extra = await client.request("GET", "/extra")
+
+    assert not_found.status == 404
+    assert ok.status == 200
+    assert ok.headers == [
+        (b"content-type", b"text/plain"),
+        (b"cache-control", b"no-store"),
+    ]
+    assert extra.headers == [*ok.headers, (b"x-extra", b"1")]
+
+
+async def test_sends_unusual_statuses() -> None:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        if dict(req.headers)[b":path"] == b"/prepared":
+            await resp.headers(999, prepared=_PREPARED, end_stream=True)
+        else:
+            await resp.headers(999, end_stream=True)
+
+    async with h2serve.testing.open_client(app) as client:
+        plain = await client.request("GET", "/")
+        prepared = await client.request("GET", "/prepared")
+
+    assert plain.status == prepared.status == 999
+
+
+def test_prepared_headers_reject_pseudo_headers() -> None:
+    with pytest.raises(ValueError, match="cannot contain"):
+        h2serve.PreparedHeaders([(b":status", b"200")])
+
+
+async def test_advertises_header_table_size(start_test_server) -> None:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await resp.headers(204, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, header_table_size=256)
+    await tester.initiate_connection()
+
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Defaults
+    settings = await tester.expect(hyperframe.frame.SettingsFrame)
+    assert settings.settings[h2.settings.SettingCodes.HEADER_TABLE_SIZE] == 256
+
+
+async def test_limits_response_header_table(start_test_server) -> None:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await resp.headers(204, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, header_table_size=256)
+    await tester.initiate_connection()
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Defaults
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Table size
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Client ack
+
+    await tester.update_settings({h2.settings.SettingCodes.HEADER_TABLE_SIZE: 65536})
+    await tester.expect(hyperframe.frame.SettingsFrame)  # Server ack
+
+    await tester.start_request("GET", "/", end_stream=True)
+    headers = await tester.expect(hyperframe.frame.HeadersFrame)
+
+    decoder = hpack.Decoder()
+    decoder.max_allowed_table_size = 65536
+    decoder.decode(headers.data)
+    assert decoder.header_table_size == 256
@@ -0,0 +1,96 @@
+import hyperframe.frame
+import trio
+from h2.errors import ErrorCodes
+
+import h2serve
+
+from .http2tester import HTTP2Tester
+
+
+async def _ok(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await resp.headers(200, end_stream=True)
+
+
+async def _read_until_closed(stream: trio.abc.Stream) -> bytes:
+    data = b""
+    with trio.fail_after(1):
+        while chunk := await stream.receive_some():
+            data += chunk
+    return data
+
+
+async def test_closes_idle_connections(start_test_server) -> None:
+    tester: HTTP2Tester = await start_test_server(
+        _ok,
+        initiated=True,
+        cleartext=True,
+        idle_timeout=0.05,
+    )
+    stream_id = await tester.start_request("GET", "/", end_stream=True)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+
+    goaway = await tester.expect(hyperframe.frame.GoAwayFrame)
+
+    assert goaway.last_stream_id == stream_id
+    assert goaway.error_code == ErrorCodes.NO_ERROR
+    assert await _read_until_closed(tester.stream) == b""
+
+
+async def test_does_not_count_open_streams_as_idle(start_test_server) -> None:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await trio.sleep(0.1)
+        await resp.headers(200, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(
+        app,
+        initiated=True,
+        cleartext=True,
+        idle_timeout=0.05,
+    )
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await tester.expect(hyperframe.frame.GoAwayFrame)
+
+
+async def test_closes_connections_that_are_not_set_up(start_test_server) -> None:
+    tester: HTTP2Tester = await start_test_server(
+        _ok,
+        cleartext=True,
+        idle_timeout=0.05,
+    )
+
+    assert await _read_until_closed(tester.stream) == b""
+
+
+async def test_sends_keepalive_pings(start_test_server) -> None:
+    tester: HTTP2Tester = await start_test_server(
+        _ok,
+        initiated=True,
+        cleartext=True,
+        keepalive_interval=0.05,
+        keepalive_timeout=0.05,
+    )
+
+    # The tester acknowledges the PINGs, so the connection stays open.
+    for _ in range(3):
+        ping = await tester.expect(hyperframe.frame.PingFrame)
+        assert ping.opaque_data == b"keepaliv"
+        assert "ACK" not in ping.flags
+
+    assert len(tester.server.connections()) == 1
+
+
+async def test_closes_unresponsive_connections(start_test_server) -> None:
+    tester: HTTP2Tester = await start_test_server(
+        _ok,
+        initiated=True,
+        cleartext=True,
+        keepalive_interval=0.05,
+        keepalive_timeout=0.05,
+    )
+
+    # Reading the PING without passing it to h2 does not acknowledge it.
+    data = await _read_until_closed(tester.stream)
+
+    assert data.endswith(hyperframe.frame.PingFrame(0, b"keepaliv").serialize())
@@ -0,0 +1,90 @@
+import hyperframe.frame
+import trio.testing
+from h2.settings import SettingCodes
+
+import h2serve
+
+from .http2tester import HTTP2Tester
+
+
+class _TestError(Exception):
+    """An expected error in a test."""
+
+
+async def test_counts_streams_and_bytes(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await trio.testing.wait_all_tasks_blocked()
+
+    metrics = tester.server.metrics()
+    assert metrics.connections_active == 1
+    assert metrics.connections_total == 1
+    assert metrics.streams_active == 0
+    assert metrics.streams_total == 1
+    assert metrics.bytes_received > 0
+    assert metrics.bytes_sent > 0
+    assert metrics.stream_duration.count == 1
+
+
+async def test_counts_resets(start_test_server) -> None:
+    async def app(req, resp):
+        if dict(req.headers)[b":path"] == b"/fail":
+            raise _TestError()
+
+        await trio.sleep_forever()
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/fail", end_stream=True)
+    await tester.expect(hyperframe.frame.RstStreamFrame)
+
+    stream_id = await tester.start_request("GET", "/", end_stream=True)
+    await tester.reset_stream(stream_id)
+    await tester.ping_and_expect_pong()
+
+    metrics = tester.server.metrics()
+    assert metrics.resets_sent == {"INTERNAL_ERROR": 1}
+    assert metrics.resets_received == {"NO_ERROR": 1}
+
+
+async def test_measures_flow_control_blocking(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=False)
+        await resp.body(b"1234567890", end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.update_settings({SettingCodes.INITIAL_WINDOW_SIZE: 5})
+    await tester.expect(hyperframe.frame.SettingsFrame)
+
+    stream_id = await tester.start_request("GET", "/", end_stream=True)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await tester.expect(hyperframe.frame.DataFrame)
+
+    await trio.sleep(0.05)
+    await tester.increment_flow_control_window(5, stream_id)
+    await tester.expect(hyperframe.frame.DataFrame)
+
+    assert tester.server.metrics().flow_control_blocked_seconds >= 0.05
+
+
+async def test_prometheus_handler(start_test_server) -> None:
+    registry = h2serve.MetricsRegistry()
+
+    tester: HTTP2Tester = await start_test_server(
+        h2serve.PrometheusHandler(registry),
+        initiated=True,
+        metrics=registry,
+    )
+    await tester.start_request("GET", "/metrics", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    body = await tester.expect(hyperframe.frame.DataFrame)
+    text = body.data.decode()
+
+    assert "# TYPE h2serve_connections_active gauge\n" in text
+    assert "h2serve_connections_active 1\n" in text
+    assert "h2serve_streams_active 1\n" in text
+    assert 'h2serve_stream_duration_seconds_bucket{le="+Inf"} 0\n' in text
@@ -0,0 +1,111 @@
+import contextlib
+
+import h2serve
+import h2serve.testing
+
+
+class _Recorder(h2serve.Middleware):
+    """Records its hook calls in a shared log and tags responses."""
+
+    def __init__(self, name: str, log: list[str]) -> None:
+        self._name = name
+        self._log = log
+
+    def on_request(self, req: h2serve.HTTP2Request) -> int | None:
+        self._log.append(f"{self._name} request")
+        return None
+
+    def on_response_start(
+        self,
+        req: h2serve.HTTP2Request,
+        status: int,
+        headers: list[h2serve.Header],
+    ) -> None:
+        self._log.append(f"{self._name} start {status}")
+        headers.append((b"x-middleware", self._name.encode()))
+
+    def on_response_end(self, req: h2serve.HTTP2Request, status: int | None) -> None:
+        self._log.append(f"{self._name} end {status}")
+
+
+class _Reject(h2serve.Middleware):
+    def on_request(self, req: h2serve.HTTP2Request) -> int | None:
+        if (b"authorization", b"secret") not in req.headers:
+            return 401
+        return None
+
+
+_PREPARED = h2serve.PreparedHeaders([(b"content-type", b"text/plain")])
+
+
+def _app(log: list[str]) -> h2serve.AppHandler:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        log.append("app")
+        await req.body.aclose()
+        await req.trailers.aclose()
+        await resp.headers(200, prepared=_PREPARED)
+        await resp.body(b"hi", end_stream=True)
+
+    return app
+
+
+async def test_runs_hooks_in_order() -> None:
+    log: list[str] = []
+    middleware = [_Recorder("outer", log), _Recorder("inner", log)]
+
+    async with h2serve.testing.open_client(_app(log), middleware=middleware) as client:
+        response = await client.request("GET", "/")
+
+    assert log == [
+        "outer request",
+        "inner request",
+        "app",
+        "inner start 200",
+        "outer start 200",
+        "inner end 200",
+        "outer end 200",
+    ]
+    assert response.headers == [
+        (b"content-type", b"text/plain"),
+        (b"x-middleware", b"inner"),
+        (b"x-middleware", b"outer"),
+    ]
+    assert response.body == b"hi"
+
+
+async def test_rejects_requests() -> None:
+    log: list[str] = []
+    middleware = [_Recorder("outer", log), _Reject(), _Recorder("inner", log)]
+
+    async with h2serve.testing.open_client(_app(log), middleware=middleware) as client:
+        rejected = await client.request("GET", "/")
+        accepted = await client.request(
+            "GET", "/", headers=[(b"authorization", b"secret")]
+        )
+
+    assert rejected.status == 401
+    assert rejected.body == b""
+    assert (b"x-middleware", b"outer") in rejected.headers
+    assert accepted.status == 200
+    assert log.count("app") == 1
+    assert log[:4] == [
+        "outer request",
+        "inner start 401",
+        "outer start 401",
+        "inner end 401",
+    ]
+
+
+async def test_reports_missing_response() -> None:
+    log: list[str] = []
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        raise RuntimeError("oops")
+
+    async with h2serve.testing.open_client(
+        app, middleware=[_Recorder("only", log)]
+    ) as client:
+        with contextlib.suppress(h2serve.testing.StreamResetError):
+            await client.request("GET", "/")
+
+    assert log == ["only request", "only end None"]
@@ -0,0 +1,48 @@
+import pytest
+import trio
+
+from h2serve._notifying_channel import notifying_channel
+
+
+async def test_receive_batch_coalesces_queued_data() -> None:
+    send, recv = notifying_channel(10)
+    event1 = trio.Event()
+    event2 = trio.Event()
+
+    await send.send(b"abc", event1)
+    await send.send(b"def", None)
+    await send.send(b"ghi", event2)
+
+    data, events = await recv.receive_batch(1024)
+
+    assert data == b"abcdefghi"
+    assert events == [event1, event2]
+    assert not event1.is_set()
+    assert not event2.is_set()
+
+
+async def test_receive_batch_stops_at_max_bytes() -> None:
+    send, recv = notifying_channel(10)
+
+    await send.send(b"abc", None)
+    await send.send(b"def", None)
+    await send.send(b"ghi", None)
+
+    data1, _ = await recv.receive_batch(4)
+    data2, _ = await recv.receive_batch(0)
+
+    assert data1 == b"abcdef"
+    assert data2 == b"ghi"
+
+
+async def test_receive_batch_end_of_channel() -> None:
+    send, recv = notifying_channel(10)
+
+    await send.send(b"abc", None)
+    send.close()
+
+    data, _ = await recv.receive_batch(1024)
+    assert data == b"abc"
+
+    with pytest.raises(trio.EndOfChannel):
+        await recv.receive_batch(1024)
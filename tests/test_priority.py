@@ -0,0 +1,88 @@
+import hyperframe.frame
+import pytest
+import trio
+import trio.testing
+
+from h2serve._priority import (
+    Priority,
+    PriorityScheduler,
+    parse_priority,
+    parse_priority_update,
+)
+
+from .http2tester import HTTP2Tester
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (b"", Priority(3, False)),
+        (b"u=0", Priority(0, False)),
+        (b"u=5, i", Priority(5, True)),
+        (b"i=?1;x=y, u=1", Priority(1, True)),
+        (b"i=?0", Priority(3, False)),
+        (b"u=9, i=1, unknown=3", Priority(3, False)),
+    ],
+)
+def test_parse_priority(value, expected) -> None:
+    assert parse_priority(value) == expected
+
+
+def test_parse_priority_update() -> None:
+    assert parse_priority_update(b"\x00\x00\x00\x05u=1") == (5, Priority(1, False))
+    assert parse_priority_update(b"\x00\x00\x00\x00u=1") is None
+    assert parse_priority_update(b"\x00\x01") is None
+
+
+async def test_scheduler_orders_by_urgency(nursery) -> None:
+    scheduler = PriorityScheduler()
+    scheduler.set_priority(3, Priority(urgency=7))
+    scheduler.set_priority(5, Priority(urgency=0))
+    order: list[int] = []
+
+    async def take_turn(stream_id: int) -> None:
+        async with scheduler.turn(stream_id):
+            order.append(stream_id)
+
+    async with scheduler.turn(1):
+        nursery.start_soon(take_turn, 3)
+        nursery.start_soon(take_turn, 5)
+        await trio.testing.wait_all_tasks_blocked()
+
+    await trio.testing.wait_all_tasks_blocked()
+    assert order == [5, 3]
+
+
+async def test_scheduler_serves_tasks_on_the_same_stream(nursery) -> None:
+    scheduler = PriorityScheduler()
+    order: list[str] = []
+
+    async def take_turn(name: str) -> None:
+        async with scheduler.turn(3):
+            order.append(name)
+
+    async with scheduler.turn(1):
+        nursery.start_soon(take_turn, "first")
+        await trio.testing.wait_all_tasks_blocked()
+        nursery.start_soon(take_turn, "second")
+        await trio.testing.wait_all_tasks_blocked()
+
+    await trio.testing.wait_all_tasks_blocked()
+    assert order == ["first", "second"]
+
+
+async def test_splits_body_into_frames(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[], end_stream=False)
+        await resp.body(b"x" * 20000, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    body1 = await tester.expect(hyperframe.frame.DataFrame)
+    body2 = await tester.expect(hyperframe.frame.DataFrame)
+
+    assert len(body1.data) == 16384
+    assert len(body2.data) == 20000 - 16384
+    assert "END_STREAM" in body2.flags
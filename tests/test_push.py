@@ -0,0 +1,118 @@
+import h2.settings
+import hyperframe.frame
+import trio
+import trio.testing
+
+import h2serve
+import h2serve.testing
+
+from .http2tester import HTTP2Tester
+
+
+async def _style(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    await resp.headers(200, [(b"content-type", b"text/css")])
+    await resp.body(b"body {}", end_stream=True)
+
+
+async def test_pushes_responses() -> None:
+    promised: list[list[h2serve.Header]] = []
+    pushed: list[bool] = []
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        if dict(req.headers)[b":path"] == b"/app.js":
+            promised.append(req.headers)
+            pushed.append(await resp.push("/nested.js"))
+            await resp.headers(200)
+            await resp.body(b"alert(1)", end_stream=True)
+            return
+
+        pushed.append(await resp.push("/style.css", handler=_style))
+        pushed.append(await resp.push(b"/app.js", [(b"accept", b"*/*")]))
+        await resp.headers(200)
+        await resp.body(b"<html>", end_stream=True)
+
+    async with h2serve.testing.open_client(app) as client:
+        response = await client.request("GET", "/")
+
+    assert response.body == b"<html>"
+    assert sorted(response.pushed) == [b"/app.js", b"/style.css"]
+    assert response.pushed[b"/style.css"].body == b"body {}"
+    assert response.pushed[b"/app.js"].body == b"alert(1)"
+    assert promised == [
+        [
+            (b":method", b"GET"),
+            (b":authority", b"localhost"),
+            (b":scheme", b"http"),
+            (b":path", b"/app.js"),
+            (b"accept", b"*/*"),
+        ]
+    ]
+    # Pushed responses cannot push.
+    assert pushed == [True, True, False]
+
+
+async def test_respects_disabled_push() -> None:
+    pushed: list[bool] = []
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        pushed.append(await resp.push("/style.css", handler=_style))
+        await resp.headers(200, end_stream=True)
+
+    async with h2serve.testing.open_client(
+        app,
+        client_settings={h2.settings.SettingCodes.ENABLE_PUSH: 0},
+    ) as client:
+        response = await client.request("GET", "/")
+
+    assert response.pushed == {}
+    assert pushed == [False]
+
+
+async def test_respects_concurrency_limit() -> None:
+    release = trio.Event()
+    pushed: list[bool] = []
+
+    async def slow(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await release.wait()
+        await _style(req, resp)
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        pushed.append(await resp.push("/a.css", handler=slow))
+        pushed.append(await resp.push("/b.css", handler=slow))
+        release.set()
+        await resp.headers(200, end_stream=True)
+
+    async with h2serve.testing.open_client(
+        app,
+        client_settings={h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1},
+    ) as client:
+        response = await client.request("GET", "/")
+
+    assert pushed == [True, False]
+    assert list(response.pushed) == [b"/a.css"]
+
+
+async def test_cancels_reset_pushes(start_test_server) -> None:
+    cancelled = trio.Event()
+
+    async def pushed(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        try:
+            await trio.sleep_forever()
+        finally:
+            cancelled.set()
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await resp.push("/pushed", handler=pushed)
+        await resp.headers(200, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+    promise = await tester.expect(hyperframe.frame.PushPromiseFrame)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+
+    await tester.stream.send_all(
+        hyperframe.frame.RstStreamFrame(promise.promised_stream_id).serialize()
+    )
+
+    with trio.fail_after(1):
+        await cancelled.wait()
@@ -0,0 +1,161 @@
+import trio
+import trio.testing
+
+import h2serve
+import h2serve.testing
+
+
+class _CountingApp:
+    """Responds with the path and a call count, once released."""
+
+    def __init__(self, headers: list[tuple[bytes, bytes]] | None = None) -> None:
+        self.calls = 0
+        self.release = trio.Event()
+        self.release.set()
+        self._headers = headers or []
+
+    async def __call__(
+        self,
+        req: h2serve.HTTP2Request,
+        resp: h2serve.HTTP2Response,
+    ) -> None:
+        self.calls += 1
+        calls = self.calls
+        await self.release.wait()
+
+        await resp.headers(200, self._headers)
+        await resp.body(dict(req.headers)[b":path"] + b" %d" % calls)
+        await resp.trailers([(b"x-calls", str(calls).encode())])
+
+
+async def test_replays_cached_responses() -> None:
+    app = _CountingApp()
+    cache = h2serve.ResponseCache(app, ttl=60)
+
+    async with h2serve.testing.open_client(cache) as client:
+        first = await client.request("GET", "/a")
+        second = await client.request("GET", "/a")
+        other = await client.request("GET", "/b")
+
+    assert first.body == second.body == b"/a 1"
+    assert second.trailers == [(b"x-calls", b"1")]
+    assert dict(second.headers)[b"age"] == b"0"
+    assert other.body == b"/b 2"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+async def test_expires_responses(mock_clock: trio.testing.MockClock) -> None:
+    app = _CountingApp()
+
+    async with h2serve.testing.open_client(
+        h2serve.ResponseCache(app, ttl=10)
+    ) as client:
+        await client.request("GET", "/")
+        mock_clock.jump(5)
+        cached = await client.request("GET", "/")
+        mock_clock.jump(5)
+        expired = await client.request("GET", "/")
+
+    assert dict(cached.headers)[b"age"] == b"5"
+    assert expired.body == b"/ 2"
+
+
+async def test_coalesces_concurrent_misses() -> None:
+    app = _CountingApp()
+    app.release = trio.Event()
+    cache = h2serve.ResponseCache(app)
+    bodies: list[bytes] = []
+
+    async def request(client: h2serve.testing.HTTP2Client) -> None:
+        bodies.append((await client.request("GET", "/")).body)
+
+    async with h2serve.testing.open_client(cache) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            for _ in range(5):
+                nursery.start_soon(request, client)
+            await trio.testing.wait_all_tasks_blocked()
+            app.release.set()
+
+    assert bodies == [b"/ 1"] * 5
+    assert app.calls == 1
+
+
+async def test_does_not_share_uncacheable_responses() -> None:
+    app = _CountingApp([(b"cache-control", b"private")])
+    app.release = trio.Event()
+    cache = h2serve.ResponseCache(app)
+    bodies: list[bytes] = []
+
+    async def request(client: h2serve.testing.HTTP2Client) -> None:
+        bodies.append((await client.request("GET", "/")).body)
+
+    async with h2serve.testing.open_client(cache) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            for _ in range(3):
+                nursery.start_soon(request, client)
+            await trio.testing.wait_all_tasks_blocked()
+            app.release.set()
+
+    assert sorted(bodies) == [b"/ 1", b"/ 2", b"/ 3"]
+
+
+async def test_varies_by_headers() -> None:
+    app = _CountingApp()
+    cache = h2serve.ResponseCache(app, vary=[b"accept-language"])
+
+    async with h2serve.testing.open_client(cache) as client:
+        english = await client.request(
+            "GET", "/", headers=[(b"accept-language", b"en")]
+        )
+        french = await client.request("GET", "/", headers=[(b"accept-language", b"fr")])
+        again = await client.request("GET", "/", headers=[(b"accept-language", b"en")])
+
+    assert english.body == again.body == b"/ 1"
+    assert french.body == b"/ 2"
+
+
+async def test_passes_through_other_methods() -> None:
+    app = _CountingApp()
+
+    async with h2serve.testing.open_client(h2serve.ResponseCache(app)) as client:
+        await client.request("POST", "/")
+        await client.request("POST", "/")
+
+    assert app.calls == 2
+
+
+async def test_evicts_least_recently_used() -> None:
+    app = _CountingApp()
+    cache = h2serve.ResponseCache(app, ttl=60, max_bytes=700)
+
+    async with h2serve.testing.open_client(cache) as client:
+        for path in ("/a", "/b", "/a", "/c", "/a", "/b"):
+            await client.request("GET", path)
+
+    # /b was evicted when /c was stored, since /a had been used more recently.
+    assert app.calls == 4
+    assert cache.size <= 700
+
+
+async def test_does_not_cache_responses_with_pushes() -> None:
+    paths: list[bytes] = []
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        paths.append(dict(req.headers)[b":path"])
+        if paths[-1] == b"/style.css":
+            await resp.headers(200, [(b"content-type", b"text/css")])
+            await resp.body(b"body {}", end_stream=True)
+            return
+
+        await resp.push("/style.css")
+        await resp.headers(200)
+        await resp.body(b"<link rel=stylesheet href=/style.css>", end_stream=True)
+
+    async with h2serve.testing.open_client(h2serve.ResponseCache(app)) as client:
+        first = await client.request("GET", "/")
+        second = await client.request("GET", "/")
+
+    assert first.pushed[b"/style.css"].body == b"body {}"
+    assert second.pushed[b"/style.css"].body == b"body {}"
+    # The pushed response itself is cached.
+    assert paths == [b"/", b"/style.css", b"/"]
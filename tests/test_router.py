@@ -0,0 +1,117 @@
+import pytest
+
+import h2serve
+import h2serve.testing
+
+
+def _handler(name: str) -> h2serve.AppHandler:
+    """Returns a handler that responds with its name and path parameters."""
+
+    async def handler(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await req.body.aclose()
+        await req.trailers.aclose()
+
+        params = sorted(h2serve.path_params().items())
+        await resp.headers(200)
+        await resp.body(f"{name} {params}".encode(), end_stream=True)
+
+    return handler
+
+
+@pytest.fixture
+def router() -> h2serve.Router:
+    router = h2serve.Router()
+    router.add("GET", "/", _handler("root"))
+    router.add("GET", "/users", _handler("users"))
+    router.add("GET", "/users/me", _handler("me"))
+    router.add("GET", "/users/{id:int}", _handler("user"))
+    router.add("DELETE", "/users/{uid:int}", _handler("delete"))
+    router.add("GET", "/users/{name}", _handler("named"))
+    router.add("GET", "/users/{id:int}/posts/{post}", _handler("post"))
+    router.add(None, "/files/{file:path}", _handler("files"))
+    router.add("GET", "/files/readme/{line:int}", _handler("readme"))
+    return router
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "body"),
+    [
+        ("GET", "/", "root []"),
+        ("GET", "/users?page=2", "users []"),
+        ("GET", "/users/me", "me []"),
+        ("GET", "/users/42", "user [('id', 42)]"),
+        ("DELETE", "/users/42", "delete [('uid', 42)]"),
+        ("GET", "/users/bob", "named [('name', 'bob')]"),
+        ("GET", "/users/b%2Fo%20b", "named [('name', 'b/o b')]"),
+        ("GET", "/users/7/posts/x", "post [('id', 7), ('post', 'x')]"),
+        ("PUT", "/files/a/b.txt", "files [('file', 'a/b.txt')]"),
+        ("GET", "/files/", "files [('file', '')]"),
+        ("GET", "/files/readme/3", "readme [('line', 3)]"),
+        # The more specific route does not match, so the path route does.
+        ("GET", "/files/readme/x", "files [('file', 'readme/x')]"),
+    ],
+)
+async def test_dispatches(router, method, path, body) -> None:
+    async with h2serve.testing.open_client(router) as client:
+        response = await client.request(method, path)
+
+    assert response.status == 200
+    assert response.body.decode() == body
+
+
+@pytest.mark.parametrize("path", ["/nope", "/users/", "/users/7/posts", "/users/7/x/y"])
+async def test_not_found(router, path) -> None:
+    async with h2serve.testing.open_client(router) as client:
+        response = await client.request("GET", path)
+
+    assert response.status == 404
+
+
+async def test_custom_not_found() -> None:
+    router = h2serve.Router(not_found=_handler("fallback"))
+
+    async with h2serve.testing.open_client(router) as client:
+        response = await client.request("GET", "/anything")
+
+    assert response.body == b"fallback []"
+
+
+async def test_method_not_allowed(router) -> None:
+    async with h2serve.testing.open_client(router) as client:
+        response = await client.request("POST", "/users/42")
+
+    assert response.status == 405
+    assert dict(response.headers)[b"allow"] == b"DELETE, GET"
+
+
+async def test_route_decorator() -> None:
+    router = h2serve.Router()
+    router.route("/items/{id:int}", methods=["GET", "put"])(_handler("item"))
+
+    async with h2serve.testing.open_client(router) as client:
+        get = await client.request("GET", "/items/1")
+        put = await client.request("PUT", "/items/1")
+
+    assert get.body == put.body == b"item [('id', 1)]"
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "users",
+        "/users/{id",
+        "/users/x{id}",
+        "/users/{}",
+        "/users/{id}/{id}",
+        "/users/{id:float}",
+        "/files/{file:path}/x",
+        "/users/{id:int}",
+    ],
+)
+def test_rejects_invalid_patterns(router, pattern) -> None:
+    with pytest.raises(ValueError):  # noqa: PT011
+        router.add("GET", pattern, _handler("invalid"))
+
+
+def test_path_params_outside_router() -> None:
+    assert h2serve.path_params() == {}
@@ -0,0 +1,124 @@
+import io
+import os
+
+import hyperframe.frame
+import trio
+
+from .http2tester import HTTP2Tester
+
+
+async def _receive_body(tester: HTTP2Tester) -> bytes:
+    body = b""
+    while True:
+        frame = await tester.expect(hyperframe.frame.DataFrame)
+        body += frame.data
+        if "END_STREAM" in frame.flags:
+            return body
+
+
+async def test_sends_file_from_path(start_test_server, tmp_path) -> None:
+    content = bytes(range(256)) * 160
+    path = tmp_path / "file.bin"
+    path.write_bytes(content)
+
+    async def app(req, resp):
+        await resp.headers(200, headers=[])
+        await resp.send_file(path, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    assert await _receive_body(tester) == content
+
+
+async def test_sends_file_range(start_test_server, tmp_path) -> None:
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"0123456789")
+
+    async def app(req, resp):
+        await resp.headers(200, headers=[])
+        await resp.send_file(path, offset=2, length=5)
+        await resp.send_file(path, offset=8, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    assert await _receive_body(tester) == b"2345689"
+
+
+async def test_sends_unmappable_file(start_test_server) -> None:
+    content = b"abcdef" * 10000
+
+    async def app(req, resp):
+        await resp.headers(200, headers=[])
+        await resp.send_file(io.BytesIO(content), offset=6, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    assert await _receive_body(tester) == content[6:]
+
+
+async def test_resets_stream_if_file_too_short(start_test_server, tmp_path) -> None:
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"0123456789")
+
+    async def app(req, resp):
+        await resp.headers(200, headers=[])
+        await resp.send_file(path, offset=5, length=10, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await tester.expect(hyperframe.frame.RstStreamFrame)
+
+
+async def test_sends_empty_range_at_end(start_test_server, tmp_path) -> None:
+    path = tmp_path / "file.bin"
+    path.write_bytes(b"x" * 4096)
+
+    async def app(req, resp):
+        await resp.headers(200, headers=[])
+        await resp.send_file(path, offset=4096, length=0, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    assert await _receive_body(tester) == b""
+
+
+async def test_sends_pipe(start_test_server) -> None:
+    content = b"abcdef" * 10000
+
+    async def app(req, resp):
+        read_end, write_end = _open_pipe()
+        with read_end:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(
+                    trio.to_thread.run_sync, _write_all, write_end, content
+                )
+                await resp.headers(200, headers=[])
+                await resp.send_file(read_end, end_stream=True)
+
+    tester: HTTP2Tester = await start_test_server(app, initiated=True)
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    assert await _receive_body(tester) == content
+
+
+def _open_pipe() -> tuple[io.FileIO, io.FileIO]:
+    read_fd, write_fd = os.pipe()
+    return io.FileIO(read_fd, "rb"), io.FileIO(write_fd, "wb")
+
+
+def _write_all(f: io.FileIO, data: bytes) -> None:
+    with f:
+        view = memoryview(data)
+        while view:
+            view = view[f.write(view) or 0 :]
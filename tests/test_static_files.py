@@ -0,0 +1,198 @@
+import os
+
+import pytest
+import trio
+import trio.testing
+
+import h2serve
+import h2serve.testing
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / "index.html").write_bytes(b"<h1>hi</h1>")
+    (tmp_path / "small.txt").write_bytes(b"0123456789")
+    (tmp_path / "large.bin").write_bytes(bytes(range(256)) * 1024)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "file.css").write_bytes(b"body {}")
+    return tmp_path
+
+
+async def _get(
+    app: h2serve.AppHandler,
+    path: str,
+    headers: list[tuple[bytes, bytes]] | None = None,
+    method: str = "GET",
+) -> h2serve.testing.Response:
+    async with h2serve.testing.open_client(app) as client:
+        return await client.request(method, path, headers=headers or [])
+
+
+@pytest.mark.parametrize("max_cached_file_size", [1024 * 1024, 0])
+async def test_serves_files(directory, max_cached_file_size) -> None:
+    app = h2serve.StaticFiles(directory, max_cached_file_size=max_cached_file_size)
+
+    small = await _get(app, "/small.txt")
+    large = await _get(app, "/large.bin")
+    nested = await _get(app, "/sub/file.css?v=1")
+
+    assert small.status == 200
+    assert small.body == b"0123456789"
+    headers = dict(small.headers)
+    assert headers[b"content-type"] == b"text/plain"
+    assert headers[b"content-length"] == b"10"
+    assert headers[b"accept-ranges"] == b"bytes"
+    assert large.body == (directory / "large.bin").read_bytes()
+    assert nested.body == b"body {}"
+
+
+async def test_serves_index(directory) -> None:
+    app = h2serve.StaticFiles(directory, prefix="/static")
+
+    response = await _get(app, "/static/")
+
+    assert response.body == b"<h1>hi</h1>"
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/missing", "/../etc/passwd", "/%2e%2e/x", "/sub/../small.txt", "/sub"],
+)
+async def test_not_found(directory, path) -> None:
+    app = h2serve.StaticFiles(directory, index=None)
+
+    assert (await _get(app, path)).status == 404
+
+
+async def test_rejects_other_methods(directory) -> None:
+    response = await _get(h2serve.StaticFiles(directory), "/small.txt", method="POST")
+
+    assert response.status == 405
+
+
+async def test_head(directory) -> None:
+    response = await _get(h2serve.StaticFiles(directory), "/small.txt", method="HEAD")
+
+    assert response.status == 200
+    assert dict(response.headers)[b"content-length"] == b"10"
+    assert response.body == b""
+
+
+async def test_conditional_requests(directory) -> None:
+    app = h2serve.StaticFiles(directory)
+    headers = dict((await _get(app, "/small.txt")).headers)
+
+    by_etag = await _get(app, "/small.txt", [(b"if-none-match", headers[b"etag"])])
+    by_date = await _get(
+        app,
+        "/small.txt",
+        [(b"if-modified-since", headers[b"last-modified"])],
+    )
+    stale = await _get(app, "/small.txt", [(b"if-none-match", b'"other"')])
+
+    assert by_etag.status == 304
+    assert by_date.status == 304
+    assert by_etag.body == by_date.body == b""
+    assert stale.status == 200
+
+
+@pytest.mark.parametrize(
+    ("range_header", "status", "body", "content_range"),
+    [
+        (b"bytes=2-4", 206, b"234", b"bytes 2-4/10"),
+        (b"bytes=7-", 206, b"789", b"bytes 7-9/10"),
+        (b"bytes=-2", 206, b"89", b"bytes 8-9/10"),
+        (b"bytes=5-100", 206, b"56789", b"bytes 5-9/10"),
+        (b"bytes=0-1,4-5", 200, b"0123456789", None),
+        (b"bytes=10-", 416, b"", b"bytes */10"),
+        (b"bytes=5-3", 200, b"0123456789", None),
+    ],
+)
+async def test_ranges(directory, range_header, status, body, content_range) -> None:
+    app = h2serve.StaticFiles(directory)
+
+    response = await _get(app, "/small.txt", [(b"range", range_header)])
+
+    assert response.status == status
+    assert response.body == body
+    assert dict(response.headers).get(b"content-range") == content_range
+
+
+async def test_ignores_range_for_changed_file(directory) -> None:
+    response = await _get(
+        h2serve.StaticFiles(directory),
+        "/small.txt",
+        [(b"range", b"bytes=2-4"), (b"if-range", b'"old"')],
+    )
+
+    assert response.status == 200
+
+
+async def test_revalidates_changed_files(directory) -> None:
+    app = h2serve.StaticFiles(directory, revalidate_after=0)
+    await _get(app, "/small.txt")
+
+    replacement = directory / "new.txt"
+    replacement.write_bytes(b"changed")
+    os.replace(replacement, directory / "small.txt")
+
+    assert (await _get(app, "/small.txt")).body == b"changed"
+
+
+async def test_caches_files(directory) -> None:
+    app = h2serve.StaticFiles(directory, revalidate_after=60)
+    await _get(app, "/small.txt")
+
+    # Within revalidate_after, the file system is not consulted.
+    (directory / "small.txt").unlink()
+
+    assert (await _get(app, "/small.txt")).body == b"0123456789"
+
+
+async def test_evicts_files_over_budget(directory) -> None:
+    app = h2serve.StaticFiles(directory, cache_bytes=600, revalidate_after=60)
+    await _get(app, "/small.txt")
+    await _get(app, "/sub/file.css")
+
+    (directory / "small.txt").unlink()
+
+    assert (await _get(app, "/small.txt")).status == 404
+
+
+async def test_keeps_evicted_files_mapped_for_responses(directory) -> None:
+    (directory / "other.bin").write_bytes(b"x" * 1024)
+    files = h2serve.StaticFiles(
+        directory,
+        max_cached_file_size=0,
+        max_mapped_files=1,
+    )
+    release = trio.Event()
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        if dict(req.headers)[b":path"] == b"/large.bin":
+            # Hold the response in headers() while the other request evicts
+            # large.bin from the cache.
+            headers = resp.headers
+
+            async def blocked_headers(*args, **kwargs) -> None:
+                await release.wait()
+                await headers(*args, **kwargs)
+
+            resp.headers = blocked_headers  # type: ignore[method-assign]
+        await files(req, resp)
+
+    async with h2serve.testing.open_client(app) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            responses: list[h2serve.testing.Response] = []
+
+            async def get_large() -> None:
+                responses.append(await client.request("GET", "/large.bin"))
+
+            nursery.start_soon(get_large)
+            await trio.testing.wait_all_tasks_blocked()
+
+            assert (await client.request("GET", "/other.bin")).status == 200
+            release.set()
+
+    assert responses[0].status == 200
+    assert responses[0].body == bytes(range(256)) * 1024
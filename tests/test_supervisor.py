@@ -0,0 +1,86 @@
+import signal
+import socket
+import sys
+
+import hyperframe.frame
+import pytest
+import trio
+
+import h2serve
+from h2serve._supervisor import load_app
+
+from .http2tester import HTTP2Tester
+
+
+async def app(req, resp):
+    await resp.headers(200, headers=[], end_stream=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def test_load_app() -> None:
+    assert load_app("tests.test_supervisor:app") is app
+    assert load_app("h2serve:Server.stop") is h2serve.Server.stop
+
+    with pytest.raises(ValueError, match="module:attribute"):
+        load_app("tests.test_supervisor")
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="SO_REUSEPORT")
+async def test_reuse_port(nursery) -> None:
+    port = _free_port()
+
+    for _ in range(2):
+        server = await h2serve.serve(
+            nursery,
+            app,
+            host="localhost",
+            port=port,
+            ssl_context=None,
+            reuse_port=True,
+        )
+        assert server.localhost_port == port
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="SO_REUSEPORT")
+async def test_supervisor_serves_and_shuts_down() -> None:
+    port = _free_port()
+    process = await trio.lowlevel.open_process(
+        [
+            sys.executable,
+            "-m",
+            "h2serve",
+            "tests.test_supervisor:app",
+            "--host=localhost",
+            f"--port={port}",
+            "--workers=2",
+        ]
+    )
+
+    try:
+        with trio.fail_after(20):
+            while True:
+                try:
+                    stream = await trio.open_tcp_stream("localhost", port)
+                    break
+                except OSError:
+                    await trio.sleep(0.1)
+
+        async with stream:
+            tester = HTTP2Tester(None, stream)
+            await tester.initiate_connection()
+            await tester.start_request("GET", "/", end_stream=True)
+            await tester.expect(hyperframe.frame.SettingsFrame)  # Server
+            await tester.expect(hyperframe.frame.SettingsFrame)  # Client ack
+            await tester.expect(hyperframe.frame.HeadersFrame)
+
+        process.send_signal(signal.SIGTERM)
+        with trio.fail_after(20):
+            assert await process.wait() == 0
+
+    finally:
+        process.kill()
@@ -0,0 +1,101 @@
+import threading
+
+import hyperframe.frame
+import trio
+import trio.testing
+
+import h2serve
+import h2serve.testing
+
+from .http2tester import HTTP2Tester
+
+
+async def _receive_body(tester: HTTP2Tester) -> bytes:
+    body = b""
+    while True:
+        frame = await tester.expect(hyperframe.frame.DataFrame)
+        body += frame.data
+        if "END_STREAM" in frame.flags:
+            return body
+
+
+async def test_runs_handler_in_thread(start_test_server) -> None:
+    loop_thread = threading.current_thread()
+    handler_threads: list[threading.Thread] = []
+
+    def handler(req: h2serve.SyncRequest, resp: h2serve.SyncResponse) -> None:
+        handler_threads.append(threading.current_thread())
+        body = req.read()
+
+        resp.headers(200, [])
+        resp.write(body)
+        resp.write(b"!")
+
+    tester: HTTP2Tester = await start_test_server(
+        h2serve.SyncHandler(handler),
+        initiated=True,
+    )
+    stream_id = await tester.start_request("POST", "/", end_stream=False)
+    await tester.send_data(stream_id, b"hello", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    assert await _receive_body(tester) == b"hello!"
+    assert handler_threads[0] is not loop_thread
+
+
+async def test_flushes_large_responses(start_test_server) -> None:
+    def handler(req: h2serve.SyncRequest, resp: h2serve.SyncResponse) -> None:
+        resp.headers(200, [])
+        for _ in range(4):
+            resp.write(b"x" * 5)
+        resp.trailers([(b"x-done", b"1")])
+
+    tester: HTTP2Tester = await start_test_server(
+        h2serve.SyncHandler(handler, flush_size=10),
+        initiated=True,
+    )
+    await tester.start_request("GET", "/", end_stream=True)
+
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    assert (await tester.expect(hyperframe.frame.DataFrame)).data == b"x" * 10
+    assert (await tester.expect(hyperframe.frame.DataFrame)).data == b"x" * 10
+    trailers = await tester.expect(hyperframe.frame.HeadersFrame)
+    assert "END_STREAM" in trailers.flags
+
+
+async def test_rejects_requests_when_queue_full(start_test_server) -> None:
+    release = threading.Event()
+
+    def handler(req: h2serve.SyncRequest, resp: h2serve.SyncResponse) -> None:
+        release.wait()
+        resp.headers(200, [])
+
+    sync_handler = h2serve.SyncHandler(handler, max_workers=1, max_queue=1)
+    tester: HTTP2Tester = await start_test_server(sync_handler, initiated=True)
+
+    await tester.start_request("GET", "/", end_stream=True)
+    await tester.start_request("GET", "/", end_stream=True)
+    await tester.ping_and_expect_pong()
+    await trio.testing.wait_all_tasks_blocked()
+    assert sync_handler.active == 1
+    assert sync_handler.queued == 1
+
+    rejected = await tester.start_request("GET", "/", end_stream=True)
+    headers = await tester.expect(hyperframe.frame.HeadersFrame)
+    assert headers.stream_id == rejected
+    assert "END_STREAM" in headers.flags
+
+    release.set()
+    await tester.expect(hyperframe.frame.HeadersFrame)
+    await tester.expect(hyperframe.frame.HeadersFrame)
+
+
+async def test_sends_500_without_status() -> None:
+    def handler(req: h2serve.SyncRequest, resp: h2serve.SyncResponse) -> None:
+        pass
+
+    async with h2serve.testing.open_client(h2serve.SyncHandler(handler)) as client:
+        response = await client.request("GET", "/")
+
+    assert response.status == 500
+    assert response.body == b""
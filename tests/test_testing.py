@@ -0,0 +1,98 @@
+import h2.errors
+import pytest
+import trio
+
+import h2serve
+import h2serve.testing
+
+
+async def _echo(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+    body = await req.read(max_bytes=2**24)
+    trailers = [trailer async for trailer in req.trailers]
+
+    await resp.headers(200, [(b"x-path", dict(req.headers)[b":path"])])
+    if trailers:
+        await resp.body(bytes(body))
+        await resp.trailers(trailers)
+    else:
+        await resp.body(bytes(body), end_stream=True)
+
+
+async def test_sends_requests_in_memory() -> None:
+    async with h2serve.testing.open_client(_echo) as client:
+        response = await client.request(
+            "POST",
+            "/echo",
+            body=b"hello",
+            trailers=[(b"x-trailer", b"1")],
+        )
+
+    assert response.status == 200
+    assert response.headers == [(b"x-path", b"/echo")]
+    assert response.body == b"hello"
+    assert response.trailers == [(b"x-trailer", b"1")]
+
+
+async def test_respects_flow_control() -> None:
+    body = b"x" * 1_000_000
+
+    async with h2serve.testing.open_client(_echo) as client:
+        response = await client.request("POST", "/", body=body)
+
+    assert response.body == body
+
+
+async def test_multiplexes_requests() -> None:
+    both_started = trio.Event()
+    started = 0
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        nonlocal started
+        started += 1
+        if started == 2:
+            both_started.set()
+        await both_started.wait()
+
+        await resp.headers(204, [], end_stream=True)
+
+    statuses: list[int] = []
+
+    async def request(client: h2serve.testing.HTTP2Client) -> None:
+        statuses.append((await client.request("GET", "/")).status)
+
+    async with h2serve.testing.open_client(app) as client:  # noqa: SIM117
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(request, client)
+            nursery.start_soon(request, client)
+
+    assert statuses == [204, 204]
+
+
+async def test_raises_on_reset() -> None:
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        await req.read(max_bytes=1)
+
+    async with h2serve.testing.open_client(app) as client:
+        with pytest.raises(h2serve.testing.StreamResetError) as exc_info:
+            await client.request("POST", "/", body=b"too large")
+
+    assert exc_info.value.error_code == h2.errors.ErrorCodes.CANCEL
+
+
+async def test_ignores_responses_to_cancelled_requests() -> None:
+    release = trio.Event()
+
+    async def app(req: h2serve.HTTP2Request, resp: h2serve.HTTP2Response) -> None:
+        if dict(req.headers)[b":path"] == b"/slow":
+            await release.wait()
+        await resp.headers(200)
+        await resp.body(b"late", end_stream=True)
+
+    async with h2serve.testing.open_client(app) as client:
+        with trio.move_on_after(0.01):
+            await client.request("GET", "/slow")
+        release.set()
+
+        response = await client.request("GET", "/")
+
+    assert response.status == 200
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import hyperframe.frame
+import trio.testing
+
+from .http2tester import HTTP2Tester
+
+
+class _RecordingTracer:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, float]] = []
+        self.paths: list[bytes] = []
+
+    def start_stream(self, stream_id, headers, received_at):
+        path = dict(headers)[b":path"]
+        self.paths.append(path)
+        if path == b"/untraced":
+            return None
+
+        self.events.append(("received", received_at))
+        return self
+
+    def handler_started(self, at: float) -> None:
+        self.events.append(("handler_started", at))
+
+    def headers_sent(self, at: float) -> None:
+        self.events.append(("headers_sent", at))
+
+    def first_data_written(self, at: float) -> None:
+        self.events.append(("first_data_written", at))
+
+    def stream_ended(self, at: float) -> None:
+        self.events.append(("stream_ended", at))
+
+
+async def test_traces_request_phases(start_test_server) -> None:
+    async def app(req, resp):
+        await resp.headers(200, headers=[])
+        await resp.body(b"a")
+        await resp.body(b"b", end_stream=True)
+
+    tracer = _RecordingTracer()
+    tester: HTTP2Tester = await start_test_server(app, initiated=True, tracer=tracer)
+
+    for path in ("/untraced", "/"):
+        await tester.start_request("GET", path, end_stream=True)
+        await tester.expect(hyperframe.frame.HeadersFrame)
+        await tester.expect(hyperframe.frame.DataFrame)
+        await tester.expect(hyperframe.frame.DataFrame)
+    await trio.testing.wait_all_tasks_blocked()
+
+    assert tracer.paths == [b"/untraced", b"/"]
+    assert [name for name, _ in tracer.events] == [
+        "received",
+        "handler_started",
+        "headers_sent",
+        "first_data_written",
+        "stream_ended",
+    ]
+
+    timestamps = [at for _, at in tracer.events]
+    assert timestamps == sorted(timestamps)